@@ -1,14 +1,20 @@
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 
-import psycopg2
+import ssl
 import tempfile
 import time
-from sqlalchemy import create_engine
-from sqlalchemy.exc import OperationalError
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 import os
 
+from app.utils.disjuntor import Disjuntor
+from app.utils.metricas import metricas
+
 
 # Configurações de certificado
 CERTIFICADO_SSL = os.getenv("AZURE_POSTGRES_CERT")
@@ -30,53 +36,174 @@ if CERTIFICADO_SSL:
 
 
 DATABASE_URL = os.getenv('DATABASE_URL')
-MAX_RETRIES = 3
-RETRY_DELAY = 5
+
+# Configurações do pool de conexões (valem para cada engine, síncrona e assíncrona)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "600"))
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", str(DB_POOL_SIZE)))
+DB_ASYNC_MAX_OVERFLOW = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", str(DB_MAX_OVERFLOW)))
+
+# Configurações do disjuntor: após N falhas de conexão seguidas as requisições recebem 503
+# sem tocar no banco; a espera dobra a cada nova falha do teste até o máximo
+DB_DISJUNTOR_FALHAS = int(os.getenv("DB_DISJUNTOR_FALHAS", "5"))
+DB_DISJUNTOR_ABERTO_SEGUNDOS = float(os.getenv("DB_DISJUNTOR_ABERTO_SEGUNDOS", "5"))
+DB_DISJUNTOR_ABERTO_MAX_SEGUNDOS = float(os.getenv("DB_DISJUNTOR_ABERTO_MAX_SEGUNDOS", "60"))
+
+disjuntor_banco = Disjuntor("banco", DB_DISJUNTOR_FALHAS, DB_DISJUNTOR_ABERTO_SEGUNDOS, DB_DISJUNTOR_ABERTO_MAX_SEGUNDOS)
+
+
+class MedicaoCheckout:
+    rotulo = ""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except PoolTimeoutError:
+            metricas.incrementar("db_pool_timeout", self.rotulo)
+            raise
+        metricas.registrar_tempo("db_pool_espera", self.rotulo, time.perf_counter() - inicio)
+        metricas.incrementar("db_checkouts", self.rotulo)
+        return conexao
+
+
+class PoolMedido(MedicaoCheckout, QueuePool):
+    rotulo = "sincrono"
+
+
+class PoolMedidoAsync(MedicaoCheckout, AsyncAdaptedQueuePool):
+    rotulo = "assincrono"
+
+
+def monitorar_engine(engine_monitorada, rotulo: str):
+    @event.listens_for(engine_monitorada, "handle_error")
+    def registrar_erro(contexto):
+        metricas.incrementar("db_erros", rotulo)
+        # Conexões antigas descartadas pelo pre_ping são substituídas pelo pool, não indicam queda
+        if contexto.is_pre_ping:
+            return
+        # Só quedas e falhas ao abrir conexão contam para o disjuntor (deadlocks e timeouts de consulta não)
+        if contexto.is_disconnect or (contexto.connection is None and isinstance(contexto.sqlalchemy_exception, OperationalError)):
+            metricas.incrementar("db_erros_conexao", rotulo)
+            disjuntor_banco.registrar_falha()
+
+    @event.listens_for(engine_monitorada, "checkout")
+    def registrar_checkout(conexao_dbapi, registro, proxy):
+        disjuntor_banco.registrar_sucesso()
+
 
 engine = create_engine(
     DATABASE_URL,
     connect_args={"sslmode": "verify-full"},
-    pool_size=10,
-    max_overflow=20,
-    pool_timeout=30,
-    pool_recycle=600
+    poolclass=PoolMedido,
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE
 )
+monitorar_engine(engine, "sincrono")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def criar_contexto_ssl():
+    # Equivalente ao sslmode=verify-full do psycopg2 para o asyncpg
+    contexto = ssl.create_default_context(cafile=os.getenv("PGSSLROOTCERT"))
+    contexto.check_hostname = True
+    contexto.verify_mode = ssl.CERT_REQUIRED
+    return contexto
+
+
+ASYNC_DATABASE_URL = make_url(DATABASE_URL).set(drivername="postgresql+asyncpg")
+ASYNC_DATABASE_URL = ASYNC_DATABASE_URL.difference_update_query(["sslmode", "sslrootcert"])
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args={"ssl": criar_contexto_ssl()},
+    poolclass=PoolMedidoAsync,
+    pool_pre_ping=True,
+    pool_size=DB_ASYNC_POOL_SIZE,
+    max_overflow=DB_ASYNC_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE
+)
+monitorar_engine(async_engine.sync_engine, "assincrono")
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
 def obter_sessao():
-    tentativas = 0
-    while tentativas < MAX_RETRIES:
-        db = SessionLocal()
-        try:
-            yield db
-            return
-        except (psycopg2.OperationalError, OperationalError) as e:
-            db.rollback()
-            print(f"Erro de conexão com o banco: {e}. Tentativa {tentativas + 1} de {MAX_RETRIES}")
-            tentativas += 1
-            time.sleep(RETRY_DELAY)
-            engine.dispose()
-        finally:
-            db.close()
-    raise Exception("Não foi possível estabelecer conexão com o banco após várias tentativas.")
+    disjuntor_banco.verificar()
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 
 
 @contextmanager
 def retornar_sessao():
-    tentativas = 0
-    while tentativas < MAX_RETRIES:
-        db = SessionLocal()
-        try:
-            yield db
-            return
-        except (psycopg2.OperationalError, OperationalError) as e:
-            db.rollback()
-            print(f"Erro de conexão com o banco: {e}. Tentativa {tentativas + 1} de {MAX_RETRIES}")
-            tentativas += 1
-            time.sleep(RETRY_DELAY)
-            engine.dispose()
-        finally:
-            db.close()
-    raise Exception("Não foi possível estabelecer conexão com o banco após várias tentativas.")
+    disjuntor_banco.verificar()
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def obter_sessao_async():
+    disjuntor_banco.verificar()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+@asynccontextmanager
+async def retornar_sessao_async():
+    disjuntor_banco.verificar()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def resumo_banco():
+    return {
+        "pool_sincrono": engine.pool.status(),
+        "pool_assincrono": async_engine.pool.status(),
+        "disjuntor": disjuntor_banco.resumo()
+    }
+
+
+# Funções de apoio para os serviços que atendem tanto às rotas (AsyncSession)
+# quanto aos trabalhos agendados (Session)
+async def executar(db: Session | AsyncSession, consulta):
+    if isinstance(db, AsyncSession):
+        return await db.execute(consulta)
+    return db.execute(consulta)
+
+
+async def buscar(db: Session | AsyncSession, modelo, id):
+    if isinstance(db, AsyncSession):
+        return await db.get(modelo, id)
+    return db.get(modelo, id)
+
+
+async def confirmar(db: Session | AsyncSession):
+    if isinstance(db, AsyncSession):
+        await db.commit()
+    else:
+        db.commit()
+
+
+async def desfazer(db: Session | AsyncSession):
+    if isinstance(db, AsyncSession):
+        await db.rollback()
+    else:
+        db.rollback()
+
+
+async def recarregar(db: Session | AsyncSession, instancia):
+    if isinstance(db, AsyncSession):
+        await db.refresh(instancia)
+    else:
+        db.refresh(instancia)
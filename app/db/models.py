@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Float, JSON, UniqueConstraint, Index, func, text
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
@@ -19,6 +19,12 @@ class Usuario(Base):
 
 class Contato(Base):
     __tablename__ = "contatos"
+    __table_args__ = (
+        Index("ix_contatos_contactId_id_empresa", "contactId", "id_empresa"),
+        Index("ix_contatos_id_empresa_lastMessage", "id_empresa", "lastMessage"),
+        Index("ix_contatos_recall", "id_empresa", "recallCount", "lastMessage",
+              postgresql_where=text("receber_respostas_ia = true AND aguardando_humano = false")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     contactId = Column(String, index=True)
@@ -82,6 +88,7 @@ class Empresa(Base):
     recall_quant = Column(Integer)
     recall_ativo = Column(Boolean)
     recall_confirmacao_ativo = Column(Boolean)
+    janela_agrupamento_segundos = Column(Integer)
     confirmar_agendamentos_ativo = Column(Boolean)
     lembrar_vencimentos_ativo = Column(Boolean)
     enviar_boleto_lembrar_vencimento = Column(Boolean)
@@ -91,8 +98,15 @@ class Empresa(Base):
     duracao_evento = Column(Integer)
     hora_inicio_agenda = Column(String)
     hora_final_agenda = Column(String)
+    regras_extracao_evento = Column(JSON)
+    modelo_confirmacao = Column(String)
     openai_api_key = Column(String)
     elevenlabs_api_key = Column(String)
+    retry_base_segundos = Column(Float)
+    retry_max_segundos = Column(Float)
+    retry_limite_taxa_max = Column(Integer)
+    retry_falha_max = Column(Integer)
+    retry_erro_max = Column(Integer)
     assistentePadrao = Column(Integer, ForeignKey("assistentes.id"))
 
     assistente = relationship("Assistente", backref="assistente_padrao", foreign_keys=[assistentePadrao])
@@ -244,3 +258,81 @@ class ExemploPrompt(Base):
     id = Column(Integer, primary_key=True, index=True)
     tipo_assistente = Column(String)
     prompt = Column(String)
+
+
+class FilaMensagem(Base):
+    __tablename__ = "fila_mensagens"
+    __table_args__ = (
+        UniqueConstraint("provedor", "id_mensagem", name="uq_fila_mensagens_provedor_id_mensagem"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    provedor = Column(String, nullable=False)
+    id_mensagem = Column(String, nullable=False)
+    chave_contato = Column(String, index=True, nullable=False)
+    slug = Column(String, nullable=False)
+    token = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, index=True, default="pendente", nullable=False)
+    tentativas = Column(Integer, default=0, nullable=False)
+    respondida = Column(Boolean, default=False, server_default=text("false"), nullable=False)
+    erro = Column(String)
+    processar_apos = Column(DateTime)
+    reservado_ate = Column(DateTime)
+    criado_em = Column(DateTime, server_default=func.now())
+    atualizado_em = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class BloqueioTrabalho(Base):
+    __tablename__ = "bloqueios_trabalho"
+
+    nome = Column(String, primary_key=True)
+    dono = Column(String, nullable=False)
+    expira_em = Column(DateTime, nullable=False)
+
+
+class ExecucaoTrabalho(Base):
+    __tablename__ = "execucoes_trabalho"
+
+    id = Column(Integer, primary_key=True, index=True)
+    nome = Column(String, index=True, nullable=False)
+    instancia = Column(String)
+    status = Column(String, nullable=False)
+    iniciado_em = Column(DateTime, server_default=func.now())
+    finalizado_em = Column(DateTime)
+    duracao_segundos = Column(Float)
+    resumo = Column(JSON)
+    erro = Column(String)
+
+
+class EventoAgendado(Base):
+    __tablename__ = "eventos_agendados"
+    __table_args__ = (
+        Index("ix_eventos_agendados_id_contato_thread_id", "id_contato", "thread_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    id_empresa = Column(Integer, ForeignKey("empresas.id"), nullable=False)
+    id_contato = Column(Integer, ForeignKey("contatos.id"), nullable=False)
+    thread_id = Column(String, nullable=False)
+    endereco_agenda = Column(String, nullable=False)
+    id_evento = Column(String)
+    titulo = Column(String)
+    data_hora_inicio = Column(String)
+    criado_em = Column(DateTime, server_default=func.now())
+
+
+class ConfirmacaoEnviada(Base):
+    __tablename__ = "confirmacoes_enviadas"
+    __table_args__ = (
+        UniqueConstraint("id_empresa", "endereco_agenda", "chave_evento", name="uq_confirmacoes_enviadas_evento"),
+        Index("ix_confirmacoes_enviadas_id_empresa_data_evento", "id_empresa", "data_evento"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    id_empresa = Column(Integer, ForeignKey("empresas.id"), nullable=False)
+    id_contato = Column(Integer, ForeignKey("contatos.id"))
+    endereco_agenda = Column(String, nullable=False)
+    chave_evento = Column(String, nullable=False)
+    data_evento = Column(String, nullable=False)
+    criado_em = Column(DateTime, server_default=func.now())
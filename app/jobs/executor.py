@@ -0,0 +1,77 @@
+import asyncio
+import time
+from collections import defaultdict
+
+
+class ResumoExecucao:
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.processados = 0
+        self.ignorados = 0
+        self.falhas = 0
+        self.inicio = time.monotonic()
+        self.fim = None
+
+    def registrar(self, status: str | None):
+        if status == "processado":
+            self.processados += 1
+        elif status == "falha":
+            self.falhas += 1
+        else:
+            self.ignorados += 1
+
+    def finalizar(self):
+        self.fim = time.monotonic()
+        return self
+
+    def duracao(self):
+        return (self.fim or time.monotonic()) - self.inicio
+
+    def to_dict(self):
+        return {
+            "trabalho": self.nome,
+            "processados": self.processados,
+            "ignorados": self.ignorados,
+            "falhas": self.falhas,
+            "duracao_segundos": round(self.duracao(), 2)
+        }
+
+    def __str__(self):
+        return (f"[{self.nome}] processados={self.processados} ignorados={self.ignorados} "
+                f"falhas={self.falhas} duracao={self.duracao():.1f}s")
+
+
+class ExecutorLimitado:
+    def __init__(self, nome: str, concorrencia_global: int, concorrencia_empresa: int, tarefas_pendentes: int | None = None):
+        self.semaforo_global = asyncio.Semaphore(max(1, concorrencia_global))
+        self.semaforos_empresa = defaultdict(lambda: asyncio.Semaphore(max(1, concorrencia_empresa)))
+        self.vagas = asyncio.Semaphore(max(1, tarefas_pendentes or concorrencia_global * 2))
+        self.resumo = ResumoExecucao(nome)
+        self.tarefas = set()
+
+    async def agendar(self, id_empresa: int, funcao, *args):
+        # A tarefa só é criada quando há vaga, assim quem produz os itens avança no ritmo em que eles terminam
+        await self.vagas.acquire()
+        tarefa = asyncio.create_task(self.executar(id_empresa, funcao, *args))
+        self.tarefas.add(tarefa)
+        tarefa.add_done_callback(self.tarefas.discard)
+
+    async def executar(self, id_empresa: int, funcao, *args):
+        try:
+            async with self.semaforos_empresa[id_empresa]:
+                async with self.semaforo_global:
+                    try:
+                        status = await funcao(*args)
+                    except Exception as e:
+                        print(f"Erro ao executar tarefa do trabalho [{self.resumo.nome}]: {e}")
+                        status = "falha"
+            self.resumo.registrar(status)
+        finally:
+            self.vagas.release()
+
+    async def aguardar(self):
+        await asyncio.gather(*self.tarefas)
+        self.tarefas = set()
+        self.resumo.finalizar()
+        print(self.resumo)
+        return self.resumo
@@ -1,71 +1,76 @@
 from datetime import datetime, timedelta
-import asyncio
+import os
 import pytz
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, func, select
 
 from app.db.database import retornar_sessao
 from app.db.models import Empresa, Contato
+from app.jobs.executor import ExecutorLimitado, ResumoExecucao
 from app.jobs.sub_jobs import enviar_retomada_conversa, enviar_confirmacao_consulta, enviar_aviso_vencimento, \
     enviar_cobranca_inadimplente
 
 
-def rodar_retomar_conversa():
-    asyncio.run(retomar_conversa())
-
-def rodar_confirmar_agendamento():
-    asyncio.run(confirmar_agendamento())
-
-def rodar_avisar_vencimento():
-    asyncio.run(avisar_vencimento())
-
-def rodar_cobrar_inadimplentes():
-    asyncio.run(cobrar_inadimplentes())
+RETOMADA_CONCORRENCIA_GLOBAL = int(os.getenv("RETOMADA_CONCORRENCIA_GLOBAL", "10"))
+RETOMADA_CONCORRENCIA_EMPRESA = int(os.getenv("RETOMADA_CONCORRENCIA_EMPRESA", "3"))
+RETOMADA_TAMANHO_LOTE = int(os.getenv("RETOMADA_TAMANHO_LOTE", "500"))
+CONFIRMACAO_JANELA_DIAS = max(1, int(os.getenv("CONFIRMACAO_JANELA_DIAS", "1")))
 
 
 async def retomar_conversa():
     agora = datetime.now()
+    executor = ExecutorLimitado("retomar_conversas", RETOMADA_CONCORRENCIA_GLOBAL, RETOMADA_CONCORRENCIA_EMPRESA)
+
+    limite_padrao = agora - func.make_interval(0, 0, 0, 0, 0, func.coalesce(Empresa.recall_timeout_minutes, 60))
+    limite_final = agora - func.make_interval(0, 0, 0, 0, 0, func.coalesce(Empresa.final_recall_timeout_minutes, 1440))
+
+    consulta = (
+        select(Contato.id, Contato.id_empresa)
+        .join(Empresa, Empresa.id == Contato.id_empresa)
+        .where(
+            Empresa.recall_ativo == True,
+            Empresa.empresa_ativa == True,
+            Contato.receber_respostas_ia == True,
+            Contato.aguardando_humano == False,
+            or_(
+                and_(
+                    Contato.lastMessage <= limite_padrao,
+                    Contato.recallCount < Empresa.recall_quant - 1
+                ),
+                and_(
+                    Contato.lastMessage <= limite_final,
+                    Contato.recallCount == Empresa.recall_quant - 1
+                )
+            ),
+            or_(
+                Empresa.recall_confirmacao_ativo == True,
+                Contato.appointmentConfirmation == False
+            )
+        )
+        .execution_options(yield_per=RETOMADA_TAMANHO_LOTE)
+    )
 
     with retornar_sessao() as db:
         try:
-            empresas = db.query(Empresa).filter_by(recall_ativo=True, empresa_ativa=True).all()
-
-            for empresa in empresas:
-                timeout_padrao = empresa.recall_timeout_minutes or 60
-                timeout_padrao_time = agora - timedelta(minutes=timeout_padrao)
-
-                timeout_final = empresa.final_recall_timeout_minutes or 1440
-                timeout_final_time = agora - timedelta(minutes=timeout_final)
-
-                query = db.query(Contato).filter(
-                    Contato.id_empresa == empresa.id,
-                    or_(
-                        and_(
-                            Contato.lastMessage <= timeout_padrao_time,
-                            Contato.recallCount < empresa.recall_quant - 1,
-                            Contato.receber_respostas_ia == True,
-                            Contato.aguardando_humano == False
-                        ),
-                        and_(
-                            Contato.lastMessage <= timeout_final_time,
-                            Contato.recallCount == empresa.recall_quant - 1,
-                            Contato.receber_respostas_ia == True,
-                            Contato.aguardando_humano == False
-                        )
-                    )
-                )
+            for lote in db.execute(consulta).partitions():
+                for id_contato, id_empresa in lote:
+                    await executor.agendar(id_empresa, retomar_conversa_contato, id_contato, id_empresa)
+        except Exception as e:
+            print(f"Erro ao processar: {e}")
 
-                if not empresa.recall_confirmacao_ativo:
-                    query = query.filter_by(appointmentConfirmation=False)
+    return await executor.aguardar()
 
-                interacoes_inativas = query.all()
 
-                for contato in interacoes_inativas:
-                    await enviar_retomada_conversa(contato, empresa, db)
-        except Exception as e:
-            print(f"Erro ao processar: {e}")
+async def retomar_conversa_contato(id_contato: int, id_empresa: int):
+    with retornar_sessao() as db:
+        contato = db.get(Contato, id_contato)
+        empresa = db.get(Empresa, id_empresa)
+        if contato is None or empresa is None:
+            return "ignorado"
+        return await enviar_retomada_conversa(contato, empresa, db)
 
 
 async def confirmar_agendamento():
+    resumo = ResumoExecucao("confirmar_agendamentos")
     with retornar_sessao() as db:
         try:
             empresas = db.query(Empresa).filter_by(confirmar_agendamentos_ativo=True, empresa_ativa=True).all()
@@ -77,13 +82,19 @@ async def confirmar_agendamento():
                 data_atual = datetime.now(tz)
                 data_atual_formatada = data_atual.strftime("%Y-%m-%dT%H:%M:%S")
                 dia_seguinte = (data_atual + timedelta(days=1)).strftime("%Y-%m-%d")
+                ultimo_dia = (data_atual + timedelta(days=CONFIRMACAO_JANELA_DIAS)).strftime("%Y-%m-%d")
 
-                await enviar_confirmacao_consulta(dia_seguinte, data_atual_formatada, empresa, db)
+                await enviar_confirmacao_consulta(dia_seguinte, ultimo_dia, data_atual_formatada, empresa, db, resumo)
         except Exception as e:
+            resumo.registrar("falha")
             print(f"Erro ao processar: {e}")
 
+    print(resumo.finalizar())
+    return resumo
+
 
 async def avisar_vencimento():
+    resumo = ResumoExecucao("avisar_vencimentos")
     with retornar_sessao() as db:
         try:
             empresas = db.query(Empresa).filter_by(lembrar_vencimentos_ativo=True, empresa_ativa=True).all()
@@ -97,13 +108,18 @@ async def avisar_vencimento():
                 dia_seguinte = (data_atual + timedelta(days=1)).strftime("%Y-%m-%d")
                 dia_adiante = (data_atual + timedelta(days=3)).strftime("%Y-%m-%d")
 
-                await enviar_aviso_vencimento(dia_seguinte, data_atual_formatada, empresa, db)
-                await enviar_aviso_vencimento(dia_adiante, data_atual_formatada, empresa, db)
+                await enviar_aviso_vencimento(dia_seguinte, data_atual_formatada, empresa, db, resumo)
+                await enviar_aviso_vencimento(dia_adiante, data_atual_formatada, empresa, db, resumo)
         except Exception as e:
+            resumo.registrar("falha")
             print(f"Erro ao processar: {e}")
 
+    print(resumo.finalizar())
+    return resumo
+
 
 async def cobrar_inadimplentes():
+    resumo = ResumoExecucao("cobrar_inadimplentes")
     with retornar_sessao() as db:
         try:
             empresas = db.query(Empresa).filter_by(cobrar_inadimplentes_ativo=True, empresa_ativa=True).all()
@@ -114,6 +130,10 @@ async def cobrar_inadimplentes():
 
                 data_atual = datetime.now(tz).strftime("%Y-%m-%d")
 
-                await enviar_cobranca_inadimplente(data_atual, empresa, db)
+                await enviar_cobranca_inadimplente(data_atual, empresa, db, resumo)
         except Exception as e:
+            resumo.registrar("falha")
             print(f"Erro ao processar: {e}")
+
+    print(resumo.finalizar())
+    return resumo
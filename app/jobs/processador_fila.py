@@ -0,0 +1,148 @@
+import asyncio
+import os
+
+from app.db.database import retornar_sessao, disjuntor_banco
+from app.db.models import FilaMensagem
+from app.services.fila_service import reservar_mensagens, renovar_reserva, concluir_mensagens, falhar_mensagens, \
+    limpar_fila, reconstruir_requisicao, marcar_respondidas, RESERVA_SEGUNDOS
+from app.services.resposta_service import preparar_resposta, responder_mensagens, notificar_erro_ia
+from app.utils.metricas import metricas
+
+
+QUANTIDADE_WORKERS = int(os.getenv("FILA_WORKERS", "4"))
+INTERVALO_SEGUNDOS = float(os.getenv("FILA_INTERVALO_SEGUNDOS", "2"))
+INTERVALO_LIMPEZA_SEGUNDOS = 3600
+
+
+class ProcessadorFila:
+    def __init__(self, quantidade_workers: int = QUANTIDADE_WORKERS):
+        self.quantidade_workers = quantidade_workers
+        self.evento = asyncio.Event()
+        self.tarefas = []
+        self.ativo = False
+
+    def notificar(self):
+        self.evento.set()
+
+    async def iniciar(self):
+        if self.ativo:
+            return
+        self.ativo = True
+        self.evento = asyncio.Event()
+        self.tarefas = [asyncio.create_task(self.executar_worker(i)) for i in range(self.quantidade_workers)]
+        self.tarefas.append(asyncio.create_task(self.executar_limpeza()))
+
+    async def parar(self):
+        self.ativo = False
+        self.evento.set()
+        for tarefa in self.tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self.tarefas, return_exceptions=True)
+        self.tarefas = []
+
+    async def aguardar(self):
+        try:
+            await asyncio.wait_for(self.evento.wait(), timeout=INTERVALO_SEGUNDOS)
+        except asyncio.TimeoutError:
+            pass
+        self.evento.clear()
+
+    async def executar_worker(self, numero: int):
+        with retornar_sessao() as sessao_fila:
+            while self.ativo:
+                try:
+                    disjuntor_banco.verificar()
+                    mensagens = reservar_mensagens(sessao_fila)
+                    if not mensagens:
+                        await self.aguardar()
+                        continue
+
+                    await self.processar_lote(mensagens, sessao_fila)
+                    self.evento.set()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    sessao_fila.rollback()
+                    print(f"Erro no worker {numero} da fila de mensagens: {e}")
+                    await asyncio.sleep(max(INTERVALO_SEGUNDOS, disjuntor_banco.tempo_restante()))
+
+    async def renovar_reserva_periodicamente(self, ids: list[int], sessao_fila):
+        while True:
+            await asyncio.sleep(RESERVA_SEGUNDOS / 3)
+            try:
+                renovar_reserva(ids, sessao_fila)
+            except Exception as e:
+                sessao_fila.rollback()
+                print(f"Erro ao renovar a reserva das mensagens {ids}: {e}")
+
+    async def processar_lote(self, mensagens: list[FilaMensagem], sessao_fila):
+        ids = [mensagem.id for mensagem in mensagens]
+        renovacao = asyncio.create_task(self.renovar_reserva_periodicamente(ids, sessao_fila))
+        inicio = asyncio.get_running_loop().time()
+
+        # Mensagens já respondidas numa tentativa anterior não são enviadas de novo
+        pendentes = [mensagem for mensagem in mensagens if not mensagem.respondida]
+        ids_pendentes = [mensagem.id for mensagem in pendentes]
+        enviado = False
+
+        def registrar_envio():
+            # Chamado logo após o primeiro envio ao contato, antes de transferir, encerrar ou mover o lead
+            nonlocal enviado
+            if not enviado and ids_pendentes:
+                marcar_respondidas(ids_pendentes, sessao_fila)
+            enviado = True
+
+        try:
+            with retornar_sessao() as db:
+                contexto = None
+                requisicao = None
+                textos = []
+                imagens = []
+                try:
+                    for mensagem in pendentes:
+                        requisicao = reconstruir_requisicao(mensagem)
+                        contexto_mensagem = await preparar_resposta(requisicao, mensagem.slug, mensagem.token, db)
+                        if contexto_mensagem is None:
+                            continue
+
+                        contexto = contexto_mensagem
+                        if contexto.mensagem:
+                            textos.append(contexto.mensagem)
+                        if contexto.imagem:
+                            imagens.append(contexto.imagem)
+
+                    if contexto is not None:
+                        await responder_mensagens(contexto, textos, imagens, contexto.audio, db, registrar_envio)
+                except Exception as e:
+                    if "AIResponseError" not in str(e) or enviado:
+                        raise
+                    print(f"Ocorreu um erro: {e}")
+                    await notificar_erro_ia(requisicao, pendentes[-1].slug, pendentes[-1].token, db, registrar_envio)
+        except Exception as e:
+            renovacao.cancel()
+            if not enviado:
+                print(f"Erro ao processar as mensagens {ids} da fila: {e}")
+                falhar_mensagens(mensagens, str(e), sessao_fila)
+                metricas.incrementar("fila_mensagens", "falha", len(mensagens))
+                return
+
+            # A resposta já chegou ao contato; repetir o lote enviaria uma segunda resposta
+            print(f"Erro após o envio da resposta às mensagens {ids} da fila: {e}")
+            metricas.incrementar("fila_mensagens", "falha_apos_envio", len(mensagens))
+
+        renovacao.cancel()
+        concluir_mensagens(ids, sessao_fila)
+        metricas.incrementar("fila_mensagens", "concluida", len(mensagens))
+        metricas.registrar_tempo("fila_processamento", None, asyncio.get_running_loop().time() - inicio)
+
+    async def executar_limpeza(self):
+        while self.ativo:
+            try:
+                with retornar_sessao() as db:
+                    limpar_fila(db)
+            except Exception as e:
+                print(f"Erro ao limpar a fila de mensagens: {e}")
+            await asyncio.sleep(INTERVALO_LIMPEZA_SEGUNDOS)
+
+
+processador_fila = ProcessadorFila()
@@ -0,0 +1,178 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.database import retornar_sessao
+from app.db.models import BloqueioTrabalho, ExecucaoTrabalho
+
+
+TRABALHO_RESERVA_SEGUNDOS = int(os.getenv("TRABALHO_RESERVA_SEGUNDOS", "300"))
+TRABALHO_HISTORICO_LIMITE = 50
+
+
+class GerenciadorTrabalhos:
+    def __init__(self):
+        self.instancia = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.tarefas = {}
+
+    def iniciar(self, nome: str, funcao):
+        if nome in self.tarefas:
+            return False
+
+        self.tarefas[nome] = asyncio.create_task(self.executar(nome, funcao))
+        return True
+
+    async def executar(self, nome: str, funcao):
+        try:
+            if not self.adquirir_bloqueio(nome):
+                self.registrar_execucao(nome, "ignorado", 0.0, None, "Trabalho em execução em outra instância")
+                print(f"Trabalho [{nome}] já está em execução em outra instância")
+                return
+
+            id_execucao = self.registrar_execucao(nome, "executando", None, None, None)
+            inicio = time.monotonic()
+            trabalho = asyncio.create_task(funcao())
+            renovacao = asyncio.create_task(self.renovar_bloqueio_periodicamente(nome, trabalho))
+            try:
+                resultado = await trabalho
+                resumo = resultado.to_dict() if hasattr(resultado, "to_dict") else None
+                self.finalizar_execucao(id_execucao, "concluido", time.monotonic() - inicio, resumo, None)
+            except asyncio.CancelledError:
+                # A renovação só termina sozinha quando o bloqueio foi perdido e o trabalho foi interrompido por ela
+                if renovacao.done() and not renovacao.cancelled():
+                    print(f"Trabalho [{nome}] interrompido após perder o bloqueio")
+                    self.finalizar_execucao(id_execucao, "falha", time.monotonic() - inicio, None, "Bloqueio perdido")
+                else:
+                    self.finalizar_execucao(id_execucao, "cancelado", time.monotonic() - inicio, None, None)
+                    raise
+            except Exception as e:
+                print(f"Erro ao executar o trabalho [{nome}]: {e}")
+                self.finalizar_execucao(id_execucao, "falha", time.monotonic() - inicio, None, str(e))
+            finally:
+                renovacao.cancel()
+                self.liberar_bloqueio(nome)
+        except Exception as e:
+            print(f"Erro ao gerenciar o trabalho [{nome}]: {e}")
+        finally:
+            self.tarefas.pop(nome, None)
+
+    def adquirir_bloqueio(self, nome: str):
+        expira_em = func.now() + timedelta(seconds=TRABALHO_RESERVA_SEGUNDOS)
+
+        with retornar_sessao() as db:
+            resultado = db.execute(
+                insert(BloqueioTrabalho)
+                .values(nome=nome, dono=self.instancia, expira_em=expira_em)
+                .on_conflict_do_update(
+                    index_elements=[BloqueioTrabalho.nome],
+                    set_={"dono": self.instancia, "expira_em": expira_em},
+                    where=BloqueioTrabalho.expira_em < func.now()
+                )
+                .returning(BloqueioTrabalho.nome)
+            ).first()
+            db.commit()
+        return resultado is not None
+
+    async def renovar_bloqueio_periodicamente(self, nome: str, trabalho: asyncio.Task):
+        ultima_renovacao = time.monotonic()
+        while True:
+            await asyncio.sleep(TRABALHO_RESERVA_SEGUNDOS / 3)
+            try:
+                with retornar_sessao() as db:
+                    renovados = db.query(BloqueioTrabalho).filter_by(nome=nome, dono=self.instancia).update(
+                        {BloqueioTrabalho.expira_em: func.now() + timedelta(seconds=TRABALHO_RESERVA_SEGUNDOS)},
+                        synchronize_session=False
+                    )
+                    db.commit()
+                if renovados:
+                    ultima_renovacao = time.monotonic()
+                    continue
+                print(f"O bloqueio do trabalho [{nome}] passou para outra instância")
+            except Exception as e:
+                print(f"Erro ao renovar o bloqueio do trabalho [{nome}]: {e}")
+                if time.monotonic() - ultima_renovacao < TRABALHO_RESERVA_SEGUNDOS:
+                    continue
+                print(f"O bloqueio do trabalho [{nome}] expirou sem ser renovado")
+
+            # Sem o bloqueio outra instância pode assumir o trabalho, então esta execução para
+            trabalho.cancel()
+            return
+
+    def liberar_bloqueio(self, nome: str):
+        with retornar_sessao() as db:
+            db.query(BloqueioTrabalho).filter_by(nome=nome, dono=self.instancia).delete(synchronize_session=False)
+            db.commit()
+
+    def registrar_execucao(self, nome: str, status: str, duracao: float | None, resumo: dict | None, erro: str | None):
+        with retornar_sessao() as db:
+            execucao = ExecucaoTrabalho(
+                nome=nome,
+                instancia=self.instancia,
+                status=status,
+                duracao_segundos=duracao,
+                resumo=resumo,
+                erro=erro,
+                finalizado_em=func.now() if status != "executando" else None
+            )
+            db.add(execucao)
+            db.commit()
+            return execucao.id
+
+    def finalizar_execucao(self, id_execucao: int, status: str, duracao: float, resumo: dict | None, erro: str | None):
+        with retornar_sessao() as db:
+            db.query(ExecucaoTrabalho).filter_by(id=id_execucao).update({
+                ExecucaoTrabalho.status: status,
+                ExecucaoTrabalho.finalizado_em: func.now(),
+                ExecucaoTrabalho.duracao_segundos: round(duracao, 2),
+                ExecucaoTrabalho.resumo: resumo,
+                ExecucaoTrabalho.erro: erro[:1000] if erro else None
+            }, synchronize_session=False)
+            db.commit()
+
+    def obter_status(self):
+        with retornar_sessao() as db:
+            execucoes = (
+                db.query(ExecucaoTrabalho)
+                .order_by(ExecucaoTrabalho.id.desc())
+                .limit(TRABALHO_HISTORICO_LIMITE)
+                .all()
+            )
+            bloqueios = db.query(BloqueioTrabalho).filter(BloqueioTrabalho.expira_em >= func.now()).all()
+
+            return {
+                "instancia": self.instancia,
+                "em_execucao_local": list(self.tarefas.keys()),
+                "bloqueios": [
+                    {"nome": bloqueio.nome, "dono": bloqueio.dono, "expira_em": bloqueio.expira_em}
+                    for bloqueio in bloqueios
+                ],
+                "execucoes": [
+                    {
+                        "id": execucao.id,
+                        "nome": execucao.nome,
+                        "instancia": execucao.instancia,
+                        "status": execucao.status,
+                        "iniciado_em": execucao.iniciado_em,
+                        "finalizado_em": execucao.finalizado_em,
+                        "duracao_segundos": execucao.duracao_segundos,
+                        "resumo": execucao.resumo,
+                        "erro": execucao.erro
+                    }
+                    for execucao in execucoes
+                ]
+            }
+
+    async def parar(self):
+        tarefas = list(self.tarefas.values())
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+
+
+gerenciador_trabalhos = GerenciadorTrabalhos()
@@ -1,7 +1,13 @@
+import asyncio
+import os
+
+from cachetools import LRUCache
 from sqlalchemy.orm import Session
 
 from app.db.models import Contato, Empresa, Agenda
-from app.services.agendamento_service import extrair_dados_evento, criar_agenda_client
+from app.jobs.executor import ResumoExecucao
+from app.services.agendamento_service import extrair_dados_evento, criar_agenda_client, registrar_evento_agendado, \
+    obter_chave_evento, obter_chave_evento_sem_id, obter_confirmacoes_enviadas, registrar_confirmacao_enviada
 from app.services.cobranca_service import extrair_dados_cobranca, criar_financial_client
 from app.services.contato_service import redefinir_contato, obter_criar_contato, atualizar_thread_contato, \
     atualizar_assistente_atual_contato, transferir_contato, obter_id_contato
@@ -14,106 +20,160 @@ from app.utils.financial_client import FinancialClient
 from app.utils.message_client import MessageClient
 
 
+CACHE_CLIENTES_COBRANCA_TAMANHO = int(os.getenv("CACHE_CLIENTES_COBRANCA_TAMANHO", "10000"))
+CONFIRMACAO_CONCORRENCIA = int(os.getenv("CONFIRMACAO_CONCORRENCIA", "5"))
+
+
 async def enviar_retomada_conversa(contato: Contato, empresa: Empresa, db: Session):
     try:
         assistente, _ = await obter_assistente(empresa, "retomar", None, db)
 
         if not assistente:
-            return
+            return "ignorado"
 
         if contato.recallCount < empresa.recall_quant - 1:
             acao = "retomar_atendimento"
         else:
             acao = "encerrar_conversa"
 
-        message_client = criar_message_client(empresa, db)
+        message_client = await criar_message_client(empresa, db)
         if isinstance(message_client, Digisac):
-            ticket_id, last_message_id = message_client.obter_ticket_ultima_mensagem(contato.contactId)
+            ticket_id, last_message_id = await message_client.obter_ticket_ultima_mensagem(contato.contactId)
             if ticket_id is None:
                 await redefinir_contato(contato, db)
-                return
+                return "ignorado"
             else:
                 if last_message_id is None:
-                    return
-                origem_mensagem = message_client.obter_origem_mensagem(last_message_id)
+                    return "ignorado"
+                origem_mensagem = await message_client.obter_origem_mensagem(last_message_id)
                 if origem_mensagem is None or origem_mensagem == "user":
                     await redefinir_contato(contato, db)
-                    return
+                    return "ignorado"
         resposta = await executar_thread(acao, None, contato, None, assistente, db)
         await direcionar(resposta, False, message_client, None, None, empresa, contato, assistente, db)
 
         if resposta.atividade != "E":
             contato.recallCount += 1
         db.commit()
-        return
+        return "processado"
     except Exception as e:
         db.rollback()
         print(f"Erro ao enviar retomada de conversa para o contato de ID {contato.id}: {e}")
+        return "falha"
 
 
-async def enviar_confirmacao_consulta(data: str, data_atual: str, empresa: Empresa, db: Session):
-    agenda_client = criar_agenda_client(empresa, db)
+async def enviar_confirmacao_consulta(data_inicio: str, data_fim: str, data_atual: str, empresa: Empresa, db: Session,
+                                     resumo: ResumoExecucao | None = None):
+    agenda_client = await criar_agenda_client(empresa, db)
     agendas = db.query(Agenda).filter_by(id_empresa=empresa.id).all()
 
-    message_client = criar_message_client(empresa, db)
-    respostas = await agenda_client.obter_horarios(agendas=[agenda.endereco for agenda in agendas], data=data)
-
-    for resposta in respostas:
-        for evento in resposta.schedule_items:
-            try:
-                resposta_extracao, thread_id = await extrair_dados_evento(resposta.schedule_id, evento, data_atual, empresa, db)
-                if resposta_extracao:
-                    if resposta_extracao.telefone:
-                        try:
-                            id_contato = await obter_id_contato(message_client, resposta_extracao.telefone, resposta_extracao.cliente)
-                            if id_contato:
-                                contato = (await obter_criar_contato(None, id_contato, empresa, message_client, None, db))[0]
-                                assistente, assistente_db_id = await obter_assistente(empresa, "confirmar", None, db)
-                                if assistente:
-                                    if not contato.appointmentConfirmation:
-                                        contato.appointmentConfirmation = True
-                                        db.commit()
-                                        await atualizar_assistente_atual_contato(contato, assistente_db_id, db)
-                                    if isinstance(message_client, Digisac):
-                                        message_client.encerrar_chamado(contactId=contato.contactId, ticketTopicIds=[], comments="Chamado encerrado para confirmação de consulta", byUserId=None)
-                                        departamento = await obter_departamento(empresa, None, True, db)
-                                        if departamento:
-                                            await transferir_contato(message_client, contato, departamento)
-                                    await direcionar(resposta_extracao.resposta_confirmacao, False, message_client, None, None, empresa, contato, assistente, db)
-                                    await atualizar_thread_contato(contato, thread_id, db)
-                        except Exception as e:
-                            db.rollback()
-                            print(f"Erro ao processar contato {resposta_extracao.cliente} - {resposta_extracao.telefone}: {e}")
-            except Exception as e:
-                db.rollback()
-                print(f"Erro ao processar evento {evento}: {e}")
-
-
-async def enviar_aviso_vencimento(data_cobranca: str, data_atual: str, empresa: Empresa, db: Session):
-    message_client = criar_message_client(empresa, db)
+    message_client = await criar_message_client(empresa, db)
+
+    # A janela inteira é consultada uma única vez e serve de retrato das agendas para toda a execução
+    horarios = await agenda_client.obter_horarios_periodo(agendas=[agenda.endereco for agenda in agendas], data_inicio=data_inicio, data_fim=data_fim)
+    enviadas = await obter_confirmacoes_enviadas(empresa, data_inicio, data_fim, db)
+
+    eventos = []
+    for data_evento, respostas in sorted(horarios.items()):
+        for resposta in respostas or []:
+            if resposta is None:
+                continue
+            for evento in resposta.schedule_items:
+                chave = (resposta.schedule_id, obter_chave_evento(evento))
+                # Confirmações antigas do Outlook foram registradas pelo início e pelo título
+                if chave not in enviadas and (resposta.schedule_id, obter_chave_evento_sem_id(evento)) not in enviadas:
+                    enviadas.add(chave)
+                    eventos.append((data_evento, resposta.schedule_id, chave[1], evento))
+
+    semaforo = asyncio.Semaphore(max(1, CONFIRMACAO_CONCORRENCIA))
+
+    async def extrair(agenda: str, evento: dict):
+        async with semaforo:
+            return await extrair_dados_evento(agenda, evento, data_atual, empresa, db)
+
+    extracoes = await asyncio.gather(*[extrair(agenda, evento) for _, agenda, _, evento in eventos], return_exceptions=True)
+
+    for (data_evento, agenda, chave_evento, evento), extracao in zip(eventos, extracoes):
+        status = "ignorado"
+        try:
+            if isinstance(extracao, Exception):
+                raise extracao
+            resposta_extracao, thread_id = extracao
+            if resposta_extracao:
+                if resposta_extracao.telefone:
+                    try:
+                        id_contato = await obter_id_contato(message_client, resposta_extracao.telefone, resposta_extracao.cliente)
+                        if id_contato:
+                            contato = (await obter_criar_contato(None, id_contato, empresa, message_client, None, db))[0]
+                            # Contatos com uma confirmação em andamento ficam para a próxima execução
+                            if contato.appointmentConfirmation:
+                                continue
+                            assistente, assistente_db_id = await obter_assistente(empresa, "confirmar", None, db)
+                            if assistente:
+                                contato.appointmentConfirmation = True
+                                db.commit()
+                                await atualizar_assistente_atual_contato(contato, assistente_db_id, db)
+                                if isinstance(message_client, Digisac):
+                                    await message_client.encerrar_chamado(contactId=contato.contactId, ticketTopicIds=[], comments="Chamado encerrado para confirmação de consulta", byUserId=None)
+                                    departamento = await obter_departamento(empresa, None, True, db)
+                                    if departamento:
+                                        await transferir_contato(message_client, contato, departamento)
+                                await direcionar(resposta_extracao.resposta_confirmacao, False, message_client, None, None, empresa, contato, assistente, db)
+                                await atualizar_thread_contato(contato, thread_id, db)
+                                await registrar_evento_agendado(contato, thread_id, agenda, evento.get("id"),
+                                                                evento.get("subject", ""), evento.get("start").get("date_time"), db)
+                                await registrar_confirmacao_enviada(contato, agenda, chave_evento, data_evento, db)
+                                status = "processado"
+                    except Exception as e:
+                        db.rollback()
+                        status = "falha"
+                        print(f"Erro ao processar contato {resposta_extracao.cliente} - {resposta_extracao.telefone}: {e}")
+        except Exception as e:
+            db.rollback()
+            status = "falha"
+            print(f"Erro ao processar evento {evento}: {e}")
+        finally:
+            if resumo is not None:
+                resumo.registrar(status)
+
+
+async def enviar_aviso_vencimento(data_cobranca: str, data_atual: str, empresa: Empresa, db: Session,
+                                  resumo: ResumoExecucao | None = None):
+    message_client = await criar_message_client(empresa, db)
     financial_clients = criar_financial_client(empresa, db)
 
     for financial_client in financial_clients:
-        resposta = financial_client.listar_cobrancas(due_date_le=data_cobranca, due_date_ge=data_cobranca, status="PENDING", limit="100")
-        if resposta.get("totalCount", 0) > 0:
-            for cobranca in resposta.get("data", []):
-                await processar_cobranca("extrair_dados_aviso_vencimento", cobranca, data_atual, empresa.enviar_boleto_lembrar_vencimento, empresa, message_client, financial_client, db)
+        clientes = LRUCache(maxsize=CACHE_CLIENTES_COBRANCA_TAMANHO)
+        async for cobranca in financial_client.iterar_cobrancas(due_date_le=data_cobranca, due_date_ge=data_cobranca, status="PENDING"):
+            status = await processar_cobranca("extrair_dados_aviso_vencimento", cobranca, data_atual, empresa.enviar_boleto_lembrar_vencimento, empresa, message_client, financial_client, db, clientes)
+            if resumo is not None:
+                resumo.registrar(status)
 
 
-async def enviar_cobranca_inadimplente(data: str, empresa: Empresa, db: Session):
-    message_client = criar_message_client(empresa, db)
+async def enviar_cobranca_inadimplente(data: str, empresa: Empresa, db: Session, resumo: ResumoExecucao | None = None):
+    message_client = await criar_message_client(empresa, db)
     financial_clients = criar_financial_client(empresa, db)
 
     for financial_client in financial_clients:
-        resposta = financial_client.listar_cobrancas(status="OVERDUE", limit="100")
-        if resposta.get("totalCount", 0) > 0:
-            for cobranca in resposta.get("data", []):
-                await processar_cobranca("extrair_dados_inadimplencia", cobranca, data, False, empresa, message_client, financial_client, db)
+        clientes = LRUCache(maxsize=CACHE_CLIENTES_COBRANCA_TAMANHO)
+        async for cobranca in financial_client.iterar_cobrancas(status="OVERDUE"):
+            status = await processar_cobranca("extrair_dados_inadimplencia", cobranca, data, False, empresa, message_client, financial_client, db, clientes)
+            if resumo is not None:
+                resumo.registrar(status)
+
+
+async def obter_cliente_cobranca(financial_client: FinancialClient, id_cliente: str, clientes: LRUCache | None):
+    if clientes is None:
+        return await financial_client.obter_cliente(id_cliente=id_cliente)
+
+    if id_cliente not in clientes:
+        clientes[id_cliente] = await financial_client.obter_cliente(id_cliente=id_cliente)
+    return clientes[id_cliente]
 
 
-async def processar_cobranca(acao: str, cobranca: dict, data_atual: str, enviar_boleto: bool, empresa: Empresa, message_client: MessageClient, financial_client: FinancialClient, db: Session):
+async def processar_cobranca(acao: str, cobranca: dict, data_atual: str, enviar_boleto: bool, empresa: Empresa, message_client: MessageClient, financial_client: FinancialClient, db: Session, clientes: LRUCache | None = None):
     try:
-        cliente = financial_client.obter_cliente(id_cliente=cobranca.get("customer", ""))
+        cliente = await obter_cliente_cobranca(financial_client, cobranca.get("customer", ""), clientes)
         if cliente:
             telefone = cliente.get("mobilePhone", "")
             nome = cliente.get("name", "")
@@ -133,26 +193,29 @@ async def processar_cobranca(acao: str, cobranca: dict, data_atual: str, enviar_
                 if enviar_boleto:
                     url_boleto = cobranca.get("bankSlipUrl", "")
                     if url_boleto:
-                        boleto = message_client.baixar_arquivo(url_boleto)
+                        boleto = await message_client.baixar_arquivo(url_boleto)
                         if boleto:
                             mediatype = "application/pdf" if isinstance(message_client, Digisac) else "document"
-                            message_client.enviar_mensagem(mensagem="", base64=boleto, mediatype=mediatype, nome_arquivo="boleto.pdf", contact_id=contato.contactId, userId=None, origin="bot", nome_assistente=assistente.nome)
+                            await message_client.enviar_mensagem(mensagem="", base64=boleto, mediatype=mediatype, nome_arquivo="boleto.pdf", contact_id=contato.contactId, userId=None, origin="bot", nome_assistente=assistente.nome)
 
                 await atualizar_thread_contato(contato, thread_id, db)
+                return "processado"
     except Exception as e:
         db.rollback()
         print(f"Erro ao processar cobrança da empresa de ID {empresa.id}: {e}")
+        return "falha"
+    return "ignorado"
 
 
 async def processar_nf(acao: str, nota: dict, data_atual: str, empresa: Empresa, message_client: MessageClient, financial_client: FinancialClient, db: Session):
     try:
-        cliente = financial_client.obter_cliente(id_cliente=nota.get("customer", ""))
+        cliente = await financial_client.obter_cliente(id_cliente=nota.get("customer", ""))
         if cliente:
             telefone = cliente.get("mobilePhone", "")
             nome = cliente.get("name", "")
             url_nota = nota.get("pdfUrl", "")
             if url_nota:
-                documento = message_client.baixar_arquivo(url_nota)
+                documento = await message_client.baixar_arquivo(url_nota)
                 if documento:
                     resposta_vencimento, thread_id = await extrair_dados_cobranca(acao, nome, telefone, data_atual, "",
                                                                                   "", empresa, db)
@@ -165,7 +228,7 @@ async def processar_nf(acao: str, nota: dict, data_atual: str, empresa: Empresa,
                                          assistente, db)
 
                         mediatype = "application/pdf" if isinstance(message_client, Digisac) else "document"
-                        message_client.enviar_mensagem(mensagem="", base64=documento, mediatype=mediatype, nome_arquivo="nota_fiscal.pdf", contact_id=contato.contactId, userId=None, origin="bot", nome_assistente=assistente.nome)
+                        await message_client.enviar_mensagem(mensagem="", base64=documento, mediatype=mediatype, nome_arquivo="nota_fiscal.pdf", contact_id=contato.contactId, userId=None, origin="bot", nome_assistente=assistente.nome)
 
                         await atualizar_thread_contato(contato, thread_id, db)
     except Exception as e:
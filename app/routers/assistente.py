@@ -12,6 +12,7 @@ from app.routers.empresa import verificar_permissao_empresa
 from app.schemas.integrations_schemas import AssistenteSchema
 from app.schemas.empresa_schema import AssistenteSchema as AssistenteSchemaEmpresa
 from app.utils.assistant import CustomHTTPClient, Ferramentas
+from app.utils.cache_empresa import cache_empresas
 
 
 def obter_openai_client(empresa: Empresa = Depends(verificar_permissao_empresa)):
@@ -94,6 +95,7 @@ async def editar_assistente(
         assistente_db.id_voz = request.voz
 
         db.commit()
+        cache_empresas.invalidar(empresa.id)
         return assistente_db
     return None
 
@@ -118,10 +120,12 @@ async def excluir_assistente(
             if assistente.id:
                 db.delete(assistente_db)
                 db.commit()
+                cache_empresas.invalidar(empresa.id)
                 return True
         except openai.NotFoundError as e:
             print(f"Erro ao excluir o assistente da OpenAI: {e}")
             db.delete(assistente_db)
             db.commit()
+            cache_empresas.invalidar(empresa.id)
             return True
     return False
@@ -7,6 +7,7 @@ from app.routers.empresa import verificar_permissao_empresa
 from app.schemas.integrations_schemas import DigisacClientSchema, DigisacDepartmentSchema
 from app.schemas.empresa_schema import DigisacClientSchema as DigisacClientSchemaEmpresa, DepartamentoSchema as DigisacDepartmentSchemaEmpresa
 from app.utils.digisac import Digisac
+from app.utils.cache_empresa import cache_empresas
 
 
 router = APIRouter()
@@ -96,6 +97,7 @@ async def adicionar_departamento(
 
     db.add(departamento)
     db.commit()
+    cache_empresas.invalidar(empresa.id)
     db.refresh(departamento)
     return departamento
 
@@ -121,6 +123,7 @@ async def editar_departamento(
     departamento.userId = request.user_id
     departamento.departamento_confirmacao = request.departamento_confirmacao
     db.commit()
+    cache_empresas.invalidar(empresa.id)
     return departamento
 
 @router.delete("/{slug}/departamentos/{id}")
@@ -138,6 +141,7 @@ async def excluir_departamento(
     if departamento:
         db.delete(departamento)
         db.commit()
+        cache_empresas.invalidar(empresa.id)
         return True
     return False
 
@@ -162,6 +166,7 @@ async def criar_digisac_client(
 
     db.add(digisac_client)
     db.commit()
+    cache_empresas.invalidar(empresa.id)
     db.refresh(digisac_client)
     return digisac_client
 
@@ -181,4 +186,5 @@ async def editar_digisac_client(
     digisac_client.digisacDefaultUser = request.user_id
     digisac_client.service_id = request.service_id
     db.commit()
+    cache_empresas.invalidar(empresa.id)
     return digisac_client
@@ -3,24 +3,28 @@ from typing import List
 
 from fastapi import APIRouter, HTTPException
 from fastapi.params import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.db.database import obter_sessao
-from app.db.models import Empresa, Assistente, RDStationCRMClient, RDStationCRMDealStage, AsaasClient, Usuario, Colaborador
+from app.db.database import obter_sessao_async
+from app.db.models import Empresa, Assistente, DigisacClient, RDStationCRMClient, RDStationCRMDealStage, AsaasClient, Usuario, Colaborador
 from app.routers.usuario import obter_usuario_logado
 from app.schemas.atualizacao_empresa_schema import InformacoesBasicas, InformacoesMensagens, InformacoesAgenda, InformacoesAssistentes, \
     InformacoesCRM, InformacoesRDStationCRMClient, InformacoesRDStationDealStage, InformacoesFinanceiras, InformacoesAsaas, \
-    InformacoesCriarEmpresa, InformacoesColaborador
+    InformacoesCriarEmpresa, InformacoesColaborador, InformacoesRetentativa
 from app.schemas.empresa_schema import EmpresaSchema, RDStationCRMClientSchema, RDStationCRMDealStageSchema, AsaasClientSchema, \
     EmpresaMinSchema, ColaboradorSchema
+from app.utils.cache_contexto_ferramentas import cache_contexto_ferramentas
+from app.utils.cache_empresa import cache_empresas
 
 
 async def verificar_permissao_empresa(
     slug: str,
-    db: Session = Depends(obter_sessao),
+    db: AsyncSession = Depends(obter_sessao_async),
     usuario: Usuario = Depends(obter_usuario_logado)
 ):
-    empresa = db.query(Empresa).filter_by(slug=slug).first()
+    empresa = (await db.execute(select(Empresa).filter_by(slug=slug))).scalars().first()
     if not empresa:
         raise HTTPException(status_code=404, detail="Empresa não encontrada")
 
@@ -30,24 +34,47 @@ async def verificar_permissao_empresa(
     return empresa
 
 
+async def carregar_empresa_completa(empresa: Empresa, db: AsyncSession):
+    # Relacionamentos serializados pelo EmpresaSchema, carregados antecipadamente para a AsyncSession
+    consulta = (
+        select(Empresa)
+        .where(Empresa.id == empresa.id)
+        .options(
+            selectinload(Empresa.assistentes).selectinload(Assistente.voz),
+            selectinload(Empresa.colaboradores),
+            selectinload(Empresa.midias),
+            selectinload(Empresa.vozes),
+            selectinload(Empresa.agenda),
+            selectinload(Empresa.digisac_client).selectinload(DigisacClient.departamentos),
+            selectinload(Empresa.evolutionapi_client),
+            selectinload(Empresa.outlook_client),
+            selectinload(Empresa.googlecalendar_client),
+            selectinload(Empresa.rdstationcrm_client).selectinload(RDStationCRMClient.estagios),
+            selectinload(Empresa.asaas_client)
+        )
+        .execution_options(populate_existing=True)
+    )
+    return (await db.execute(consulta)).scalars().one()
+
+
 router = APIRouter(dependencies=[Depends(obter_usuario_logado)])
 
 @router.get("/", response_model=List[EmpresaMinSchema])
-async def obter_todas_empresas(usuario: Usuario = Depends(obter_usuario_logado), db: Session = Depends(obter_sessao)):
+async def obter_todas_empresas(usuario: Usuario = Depends(obter_usuario_logado), db: AsyncSession = Depends(obter_sessao_async)):
     if not usuario.id_empresa:
-        empresas = db.query(Empresa).all()
+        empresas = (await db.execute(select(Empresa))).scalars().all()
     else:
-        empresas = db.query(Empresa).filter_by(id=usuario.id_empresa, empresa_ativa=True).all()
+        empresas = (await db.execute(select(Empresa).filter_by(id=usuario.id_empresa, empresa_ativa=True))).scalars().all()
     return empresas
 
 @router.post("/")
 async def criar_empresa(
         request: InformacoesCriarEmpresa,
         usuario: Usuario = Depends(obter_usuario_logado),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
     if not usuario.id_empresa:
-        empresa = db.query(Empresa).filter_by(slug=request.slug).first()
+        empresa = (await db.execute(select(Empresa).filter_by(slug=request.slug))).scalars().first()
         if not empresa:
             token = secrets.token_hex(32)
             empresa = Empresa(
@@ -60,8 +87,8 @@ async def criar_empresa(
                 empresa_ativa=request.empresa_ativa
             )
             db.add(empresa)
-            db.commit()
-            db.refresh(empresa)
+            await db.commit()
+            await db.refresh(empresa)
             return empresa
     return None
 
@@ -69,31 +96,33 @@ async def criar_empresa(
 async def obter_empresa(
         slug: str,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
-    return empresa
+    return await carregar_empresa_completa(empresa, db)
 
 @router.put("/{slug}/informacoes_basicas", response_model=EmpresaSchema)
 async def alterar_informacoes_basicas(
         slug: str,
         request: InformacoesBasicas,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
     empresa.nome = request.nome
     empresa.fuso_horario = request.fuso_horario
     empresa.empresa_ativa = request.empresa_ativa
     empresa.openai_api_key = request.openai_api_key
     empresa.elevenlabs_api_key = request.elevenlabs_api_key
-    db.commit()
-    return empresa
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
+    cache_contexto_ferramentas.invalidar(empresa.id)
+    return await carregar_empresa_completa(empresa, db)
 
 @router.post("/{slug}/informacoes_basicas/colaborador")
 async def adicionar_colaborador(
         slug: str,
         request: InformacoesColaborador,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
     colaborador = Colaborador(
         nome=request.nome,
@@ -103,8 +132,10 @@ async def adicionar_colaborador(
     )
 
     db.add(colaborador)
-    db.commit()
-    db.refresh(colaborador)
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
+    cache_contexto_ferramentas.invalidar(empresa.id)
+    await db.refresh(colaborador)
     return colaborador
 
 @router.put("/{slug}/informacoes_basicas/colaborador", response_model=ColaboradorSchema)
@@ -112,16 +143,18 @@ async def alterar_colaborador(
         slug: str,
         request: InformacoesColaborador,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
-    colaborador = db.query(Colaborador).filter_by(id=request.id, id_empresa=empresa.id).first()
+    colaborador = (await db.execute(select(Colaborador).filter_by(id=request.id, id_empresa=empresa.id))).scalars().first()
     if not colaborador:
         raise HTTPException(status_code=404, detail="Colaborador não encontrado para essa empresa")
 
     colaborador.nome = request.nome
     colaborador.apelido = request.apelido
     colaborador.departamento = request.departamento
-    db.commit()
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
+    cache_contexto_ferramentas.invalidar(empresa.id)
     return colaborador
 
 @router.delete("/{slug}/informacoes_basicas/colaborador/{id}")
@@ -129,12 +162,14 @@ async def remover_colaborador(
         slug: str,
         id: int,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
-    colaborador = db.query(Colaborador).filter_by(id=id, id_empresa=empresa.id).first()
+    colaborador = (await db.execute(select(Colaborador).filter_by(id=id, id_empresa=empresa.id))).scalars().first()
     if colaborador:
-        db.delete(colaborador)
-        db.commit()
+        await db.delete(colaborador)
+        await db.commit()
+        cache_empresas.invalidar(empresa.id)
+        cache_contexto_ferramentas.invalidar(empresa.id)
         return True
     return False
 
@@ -143,23 +178,40 @@ async def alterar_informacoes_assistentes(
         slug: str,
         request: InformacoesAssistentes,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
     if request.assistente_padrao:
-        assistente = db.query(Assistente).filter_by(id=request.assistente_padrao, id_empresa=empresa.id, proposito="responder").first()
+        assistente = (await db.execute(select(Assistente).filter_by(id=request.assistente_padrao, id_empresa=empresa.id, proposito="responder"))).scalars().first()
         if not assistente:
             raise HTTPException(status_code=404, detail="Assistente não encontrado para essa empresa")
 
         empresa.assistentePadrao = request.assistente_padrao
-        db.commit()
-    return empresa
+        await db.commit()
+        cache_empresas.invalidar(empresa.id)
+    return await carregar_empresa_completa(empresa, db)
+
+@router.put("/{slug}/informacoes_retentativa", response_model=EmpresaSchema)
+async def alterar_informacoes_retentativa(
+        slug: str,
+        request: InformacoesRetentativa,
+        empresa: Empresa = Depends(verificar_permissao_empresa),
+        db: AsyncSession = Depends(obter_sessao_async)
+):
+    empresa.retry_base_segundos = request.base_segundos
+    empresa.retry_max_segundos = request.max_segundos
+    empresa.retry_limite_taxa_max = request.limite_taxa_max
+    empresa.retry_falha_max = request.falha_max
+    empresa.retry_erro_max = request.erro_max
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
+    return await carregar_empresa_completa(empresa, db)
 
 @router.put("/{slug}/informacoes_mensagens", response_model=EmpresaSchema)
 async def alterar_informacoes_mensagens(
         slug: str,
         request: InformacoesMensagens,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
     empresa.message_client_type = request.tipo_cliente
     empresa.recall_timeout_minutes = request.tempo_recall_min
@@ -168,15 +220,17 @@ async def alterar_informacoes_mensagens(
     empresa.recall_ativo = request.ativar_recall
     empresa.recall_confirmacao_ativo = request.ativar_recall_confirmacao
     empresa.mensagem_erro_ia = request.mensagem_erro_ia
-    db.commit()
-    return empresa
+    empresa.janela_agrupamento_segundos = request.janela_agrupamento_segundos
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
+    return await carregar_empresa_completa(empresa, db)
 
 @router.put("/{slug}/informacoes_agenda", response_model=EmpresaSchema)
 async def alterar_informacoes_agenda(
         slug: str,
         request: InformacoesAgenda,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
     empresa.agenda_client_type = request.tipo_cliente
     empresa.tipo_cancelamento_evento = request.tipo_cancelamento_evento
@@ -184,28 +238,32 @@ async def alterar_informacoes_agenda(
     empresa.duracao_evento = request.duracao_evento
     empresa.hora_inicio_agenda = request.hora_inicio_agenda
     empresa.hora_final_agenda = request.hora_final_agenda
-    db.commit()
-    return empresa
+    empresa.regras_extracao_evento = request.regras_extracao_evento
+    empresa.modelo_confirmacao = request.modelo_confirmacao
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
+    return await carregar_empresa_completa(empresa, db)
 
 @router.put("/{slug}/informacoes_crm", response_model=EmpresaSchema)
 async def alterar_informacoes_crm(
         slug: str,
         request: InformacoesCRM,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
     empresa.crm_client_type = request.tipo_cliente
-    db.commit()
-    return empresa
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
+    return await carregar_empresa_completa(empresa, db)
 
 @router.post("/{slug}/informacoes_crm/rdstation")
 async def adicionar_cliente_rdstation(
         slug: str,
         request: InformacoesRDStationCRMClient,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
-    rdstationcrm_client = db.query(RDStationCRMClient).filter_by(id_empresa=empresa.id).first()
+    rdstationcrm_client = (await db.execute(select(RDStationCRMClient).filter_by(id_empresa=empresa.id))).scalars().first()
     if rdstationcrm_client:
         raise HTTPException(status_code=404, detail="Essa empresa já possui um cliente do RD Station CRM")
 
@@ -216,8 +274,9 @@ async def adicionar_cliente_rdstation(
     )
 
     db.add(rdstationcrm_client)
-    db.commit()
-    db.refresh(rdstationcrm_client)
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
+    await db.refresh(rdstationcrm_client)
     return rdstationcrm_client
 
 @router.put("/{slug}/informacoes_crm/rdstation", response_model=RDStationCRMClientSchema)
@@ -225,15 +284,17 @@ async def alterar_informacoes_rdstation(
         slug: str,
         request: InformacoesRDStationCRMClient,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
-    rdstationcrm_client = db.query(RDStationCRMClient).filter_by(id_empresa=empresa.id).first()
+    rdstationcrm_client = (await db.execute(select(RDStationCRMClient).filter_by(id_empresa=empresa.id))).scalars().first()
     if not rdstationcrm_client:
         raise HTTPException(status_code=404, detail="Cliente do RD Station CRM não encontrado para essa empresa")
 
     rdstationcrm_client.token = request.token
     rdstationcrm_client.id_fonte_padrao = request.id_fonte_padrao
-    db.commit()
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
+    await db.refresh(rdstationcrm_client, ["estagios"])
     return rdstationcrm_client
 
 @router.post("/{slug}/informacoes_crm/rdstation/estagio")
@@ -241,9 +302,9 @@ async def adicionar_estagio(
         slug: str,
         request: InformacoesRDStationDealStage,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
-    rdstationcrm_client = db.query(RDStationCRMClient).filter_by(id_empresa=empresa.id).first()
+    rdstationcrm_client = (await db.execute(select(RDStationCRMClient).filter_by(id_empresa=empresa.id))).scalars().first()
     if not rdstationcrm_client:
         raise HTTPException(status_code=404, detail="Cliente do RD Station CRM não encontrado para essa empresa")
 
@@ -256,8 +317,9 @@ async def adicionar_estagio(
     )
 
     db.add(estagio)
-    db.commit()
-    db.refresh(estagio)
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
+    await db.refresh(estagio)
     return estagio
 
 @router.put("/{slug}/informacoes_crm/rdstation/estagio", response_model=RDStationCRMDealStageSchema)
@@ -265,13 +327,13 @@ async def alterar_informacoes_estagio(
         slug: str,
         request: InformacoesRDStationDealStage,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
-    rdstationcrm_client = db.query(RDStationCRMClient).filter_by(id_empresa=empresa.id).first()
+    rdstationcrm_client = (await db.execute(select(RDStationCRMClient).filter_by(id_empresa=empresa.id))).scalars().first()
     if not rdstationcrm_client:
         raise HTTPException(status_code=404, detail="Cliente do RD Station CRM não encontrado para essa empresa")
 
-    estagio = db.query(RDStationCRMDealStage).filter_by(id=request.id, id_rdstationcrm_client=rdstationcrm_client.id).first()
+    estagio = (await db.execute(select(RDStationCRMDealStage).filter_by(id=request.id, id_rdstationcrm_client=rdstationcrm_client.id))).scalars().first()
     if not estagio:
         raise HTTPException(status_code=404, detail="Estágio não encontrado para esse cliente do RD Station CRM")
 
@@ -279,7 +341,8 @@ async def alterar_informacoes_estagio(
     estagio.deal_stage_id = request.deal_stage_id
     estagio.user_id = request.user_id
     estagio.deal_stage_inicial = request.estagio_inicial
-    db.commit()
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
     return estagio
 
 @router.delete("/{slug}/informacoes_crm/rdstation/estagio/{id}")
@@ -287,16 +350,17 @@ async def remover_estagio(
         slug: str,
         id: int,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
-    rdstationcrm_client = db.query(RDStationCRMClient).filter_by(id_empresa=empresa.id).first()
+    rdstationcrm_client = (await db.execute(select(RDStationCRMClient).filter_by(id_empresa=empresa.id))).scalars().first()
     if not rdstationcrm_client:
         raise HTTPException(status_code=404, detail="Cliente do RD Station CRM não encontrado para essa empresa")
 
-    estagio = db.query(RDStationCRMDealStage).filter_by(id=id, id_rdstationcrm_client=rdstationcrm_client.id).first()
+    estagio = (await db.execute(select(RDStationCRMDealStage).filter_by(id=id, id_rdstationcrm_client=rdstationcrm_client.id))).scalars().first()
     if estagio:
-        db.delete(estagio)
-        db.commit()
+        await db.delete(estagio)
+        await db.commit()
+        cache_empresas.invalidar(empresa.id)
         return True
     return False
 
@@ -305,23 +369,24 @@ async def alterar_informacoes_financeiras(
         slug: str,
         request: InformacoesFinanceiras,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
     empresa.financial_client_type = request.tipo_cliente
     empresa.lembrar_vencimentos_ativo = request.lembrar_vencimentos
     empresa.enviar_boleto_lembrar_vencimento = request.enviar_boletos_vencimentos
     empresa.cobrar_inadimplentes_ativo = request.cobrar_inadimplentes
-    db.commit()
-    return empresa
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
+    return await carregar_empresa_completa(empresa, db)
 
 @router.post("/{slug}/informacoes_financeiras/asaas")
 async def adicionar_cliente_asaas(
         slug: str,
         request: InformacoesAsaas,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
-    asaas_client = db.query(AsaasClient).filter_by(id_empresa=empresa.id, client_number=request.numero_cliente).first()
+    asaas_client = (await db.execute(select(AsaasClient).filter_by(id_empresa=empresa.id, client_number=request.numero_cliente))).scalars().first()
     if asaas_client:
         raise HTTPException(status_code=409, detail="Essa empresa já possui um cliente do Asaas com esse número de cliente")
 
@@ -333,8 +398,9 @@ async def adicionar_cliente_asaas(
     )
 
     db.add(asaas_client)
-    db.commit()
-    db.refresh(asaas_client)
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
+    await db.refresh(asaas_client)
     return asaas_client
 
 @router.put("/{slug}/informacoes_financeiras/asaas", response_model=AsaasClientSchema)
@@ -342,15 +408,16 @@ async def alterar_informacoes_cliente_asaas(
         slug: str,
         request: InformacoesAsaas,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
-    asaas_client = db.query(AsaasClient).filter_by(id_empresa=empresa.id, client_number=request.numero_cliente).first()
+    asaas_client = (await db.execute(select(AsaasClient).filter_by(id_empresa=empresa.id, client_number=request.numero_cliente))).scalars().first()
     if not asaas_client:
         raise HTTPException(status_code=404, detail="Cliente do Asaas não encontrado para essa empresa")
 
     asaas_client.token = request.token
     asaas_client.rotulo = request.rotulo
-    db.commit()
+    await db.commit()
+    cache_empresas.invalidar(empresa.id)
     return asaas_client
 
 @router.delete("/{slug}/informacoes_financeiras/asaas/{id}")
@@ -358,11 +425,12 @@ async def remover_cliente_asaas(
         slug: str,
         id: int,
         empresa: Empresa = Depends(verificar_permissao_empresa),
-        db: Session = Depends(obter_sessao)
+        db: AsyncSession = Depends(obter_sessao_async)
 ):
-    asaas_client = db.query(AsaasClient).filter_by(id=id, id_empresa=empresa.id).first()
+    asaas_client = (await db.execute(select(AsaasClient).filter_by(id=id, id_empresa=empresa.id))).scalars().first()
     if asaas_client:
-        db.delete(asaas_client)
-        db.commit()
+        await db.delete(asaas_client)
+        await db.commit()
+        cache_empresas.invalidar(empresa.id)
         return True
     return False
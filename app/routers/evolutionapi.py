@@ -8,6 +8,7 @@ from app.db.models import Empresa, EvolutionAPIClient
 from app.routers.empresa import verificar_permissao_empresa
 from app.schemas.integrations_schemas import EvolutionInstanceSchema, EvolutionWebhookSchema
 from app.utils.evolutionapi import EvolutionAPI
+from app.utils.cache_empresa import cache_empresas
 
 
 router = APIRouter()
@@ -34,6 +35,7 @@ async def criar_instancia(
 
             db.add(evolutionapi_client)
             db.commit()
+            cache_empresas.invalidar(empresa.id)
             db.refresh(evolutionapi_client)
             return evolutionapi_client
     return None
@@ -12,6 +12,8 @@ from app.routers.empresa import verificar_permissao_empresa
 from app.schemas.atualizacao_empresa_schema import InformacoesFusoHorario
 from app.schemas.empresa_schema import GoogleCalendarClientSchema as GoogleCalendarClientSchemaEmpresa
 from app.services.agendamento_service import criar_agenda_client
+from app.utils.cache_empresa import cache_empresas
+from app.utils.google_calendar import credenciais_google
 
 router = APIRouter()
 
@@ -67,6 +69,7 @@ async def callback(
             google_calendar_client_db.client_x509_cert_url = refresh_token
             google_calendar_client_db.client_id = str(expires_in)
             google_calendar_client_db.client_email = user_email
+            credenciais_google.invalidar(google_calendar_client_db.id)
         else:
             google_calendar_client = GoogleCalendarClient(
                 project_id="",
@@ -87,6 +90,7 @@ async def callback(
             )
             db.add(google_calendar_client)
         db.commit()
+        cache_empresas.invalidar(empresa.id)
         return RedirectResponse(url=os.getenv("SUCCESS_AUTH_URL"))
     return RedirectResponse(url=os.getenv("FAILED_AUTH_URL"))
 
@@ -130,4 +134,5 @@ async def alterar_informacoes_googlecalendar(
 
     googlecalendar_client.timezone = request.fuso_horario
     db.commit()
+    cache_empresas.invalidar(empresa.id)
     return googlecalendar_client
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.params import Depends
+
+from app.db.database import resumo_banco
+from app.routers.trabalho import verificar_chave_secreta
+from app.utils.metricas import metricas
+
+
+router = APIRouter(dependencies=[Depends(verificar_chave_secreta)])
+
+@router.get("/")
+async def obter_metricas():
+    return {**metricas.resumo(), "banco": resumo_banco()}
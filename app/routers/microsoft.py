@@ -14,7 +14,8 @@ from app.routers.empresa import verificar_permissao_empresa
 from app.schemas.atualizacao_empresa_schema import InformacoesFusoHorario
 from app.schemas.empresa_schema import OutlookClientSchema as OutlookClientSchemaEmpresa
 from app.services.agendamento_service import criar_agenda_client
-from app.utils.outlook import Outlook
+from app.utils.outlook import Outlook, clientes_graph
+from app.utils.cache_empresa import cache_empresas
 
 
 router = APIRouter()
@@ -70,6 +71,7 @@ async def callback(
             outlook_client_db.refresh_token = refresh_token
             outlook_client_db.expires_at = expires_at
             outlook_client_db.usuarioPadrao = user_email
+            clientes_graph.invalidar(outlook_client_db.id)
         else:
             outlook = OutlookClient(
                 clientId="",
@@ -88,6 +90,7 @@ async def callback(
             )
             db.add(outlook)
         db.commit()
+        cache_empresas.invalidar(empresa.id)
         return RedirectResponse(url=os.getenv("SUCCESS_AUTH_URL"))
     return RedirectResponse(url=os.getenv("FAILED_AUTH_URL"))
 
@@ -118,7 +121,7 @@ async def obter_timezones(
         empresa: Empresa = Depends(verificar_permissao_empresa),
         db: Session = Depends(obter_sessao)
 ):
-    outlook_client = criar_agenda_client(empresa, db)
+    outlook_client = await criar_agenda_client(empresa, db)
     if outlook_client:
         timezones = await outlook_client.listar_timezones()
         return timezones
@@ -137,4 +140,5 @@ async def alterar_timezone(
 
     outlook_client.timeZone = request.fuso_horario
     db.commit()
+    cache_empresas.invalidar(empresa.id)
     return outlook_client
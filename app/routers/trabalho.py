@@ -1,13 +1,12 @@
 import os
-import multiprocessing
 
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.params import Depends
 from sqlalchemy.orm import Session
 
 from app.db.database import obter_sessao
-from app.jobs.jobs import rodar_confirmar_agendamento, rodar_avisar_vencimento, rodar_cobrar_inadimplentes, \
-    rodar_retomar_conversa
+from app.jobs.jobs import confirmar_agendamento, avisar_vencimento, cobrar_inadimplentes, retomar_conversa
+from app.jobs.runner import gerenciador_trabalhos
 from app.jobs.sub_jobs import processar_cobranca, processar_nf
 from app.schemas.asaas_schema import AsaasPaymentRequest, AsaasInvoiceRequest
 from app.services.cobranca_service import criar_financial_client
@@ -24,32 +23,32 @@ def verificar_chave_secreta(request: Request):
 
 router = APIRouter(dependencies=[Depends(verificar_chave_secreta)])
 
+@router.get("/status")
+async def obter_status_trabalhos():
+    return gerenciador_trabalhos.obter_status()
+
 @router.post("/retomar_conversas")
 async def executar_retomar_conversa():
-    process = multiprocessing.Process(target=rodar_retomar_conversa)
-    process.start()
-
+    if not gerenciador_trabalhos.iniciar("retomar_conversas", retomar_conversa):
+        return {"status": "Trabalho [retomar_conversas] já está em execução"}
     return {"status": "Trabalho [retomar_conversas] iniciado com sucesso"}
 
 @router.post("/confirmar_agendamentos")
 async def executar_confirmar_agendamento():
-    process = multiprocessing.Process(target=rodar_confirmar_agendamento)
-    process.start()
-
+    if not gerenciador_trabalhos.iniciar("confirmar_agendamentos", confirmar_agendamento):
+        return {"status": "Trabalho [confirmar_agendamentos] já está em execução"}
     return {"status": "Trabalho [confirmar_agendamentos] iniciado com sucesso"}
 
 @router.post("/avisar_vencimentos")
 async def executar_avisar_vencimento():
-    process = multiprocessing.Process(target=rodar_avisar_vencimento)
-    process.start()
-
+    if not gerenciador_trabalhos.iniciar("avisar_vencimentos", avisar_vencimento):
+        return {"status": "Trabalho [avisar_vencimentos] já está em execução"}
     return {"status": "Trabalho [avisar_vencimentos] iniciado com sucesso"}
 
 @router.post("/cobrar_inadimplentes")
 async def executar_cobrar_inadimplente():
-    process = multiprocessing.Process(target=rodar_cobrar_inadimplentes)
-    process.start()
-
+    if not gerenciador_trabalhos.iniciar("cobrar_inadimplentes", cobrar_inadimplentes):
+        return {"status": "Trabalho [cobrar_inadimplentes] já está em execução"}
     return {"status": "Trabalho [cobrar_inadimplentes] iniciado com sucesso"}
 
 @router.post("/agradecer_pagamento/asaas/{slug}/{token}/{client_number}")
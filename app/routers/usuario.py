@@ -3,10 +3,12 @@ import jwt
 from fastapi import APIRouter, Form, HTTPException, Response, Query
 from fastapi.params import Depends, Cookie
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from app.db.database import obter_sessao
+from app.db.database import obter_sessao, obter_sessao_async
 from app.db.models import Usuario, Empresa
 from app.schemas.atualizacao_empresa_schema import InformacoesUsuario
 from app.schemas.empresa_schema import ListaUsuariosSchema, UsuarioSchema
@@ -16,7 +18,7 @@ from app.utils.password_utils import SECRET_KEY, ALGORITHM
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/usuario/login")
 
-async def obter_usuario_logado(token: str = Cookie(None, alias="access_token"), db: Session = Depends(obter_sessao)):
+async def obter_usuario_logado(token: str = Cookie(None, alias="access_token"), db: AsyncSession = Depends(obter_sessao_async)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -31,7 +33,7 @@ async def obter_usuario_logado(token: str = Cookie(None, alias="access_token"),
             detail="Não autenticado"
         )
 
-    user = db.query(Usuario).filter(Usuario.email == email).first()
+    user = (await db.execute(select(Usuario).where(Usuario.email == email))).scalars().first()
     if user is None:
         raise HTTPException(
             status_code=401,
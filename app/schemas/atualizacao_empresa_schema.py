@@ -2,6 +2,8 @@ from fastapi import Form
 from pydantic import BaseModel, field_validator, Field
 from typing import List, Optional, Literal
 
+from app.utils.extracao_evento import validar_regra_extracao, validar_modelo_confirmacao
+
 
 class InformacoesCriarEmpresa(BaseModel):
     nome: str
@@ -77,12 +79,20 @@ class InformacoesMensagens(BaseModel):
     ativar_recall: bool
     ativar_recall_confirmacao: bool
     mensagem_erro_ia: Optional[str] = None
+    janela_agrupamento_segundos: Optional[int] = None
 
     @field_validator("mensagem_erro_ia", mode="before")
     @classmethod
     def string_vazia(cls, valor):
         return valor or None
 
+    @field_validator("janela_agrupamento_segundos", mode="before")
+    @classmethod
+    def int_vazio(cls, valor):
+        if isinstance(valor, str) and valor.strip() == "":
+            return None
+        return valor
+
 
 class InformacoesAgenda(BaseModel):
     tipo_cliente: Optional[Literal["outlook", "google_calendar"]]
@@ -91,12 +101,57 @@ class InformacoesAgenda(BaseModel):
     duracao_evento: int
     hora_inicio_agenda: str
     hora_final_agenda: str
+    regras_extracao_evento: Optional[List[str]] = None
+    modelo_confirmacao: Optional[str] = None
 
     @field_validator("tipo_cliente", mode="before")
     @classmethod
     def string_vazia(cls, valor):
         return valor if valor.strip() else None
 
+    @field_validator("modelo_confirmacao", mode="before")
+    @classmethod
+    def modelo_vazio(cls, valor):
+        return valor if valor and valor.strip() else None
+
+    @field_validator("modelo_confirmacao")
+    @classmethod
+    def validar_modelo(cls, valor):
+        if valor is not None:
+            validar_modelo_confirmacao(valor)
+        return valor
+
+    @field_validator("regras_extracao_evento")
+    @classmethod
+    def validar_regras(cls, valor):
+        if not valor:
+            return None
+        for regra in valor:
+            validar_regra_extracao(regra)
+        return valor
+
+
+class InformacoesRetentativa(BaseModel):
+    base_segundos: Optional[float] = None
+    max_segundos: Optional[float] = None
+    limite_taxa_max: Optional[int] = None
+    falha_max: Optional[int] = None
+    erro_max: Optional[int] = None
+
+    @field_validator("base_segundos", "max_segundos", "limite_taxa_max", "falha_max", "erro_max", mode="before")
+    @classmethod
+    def numero_vazio(cls, valor):
+        if isinstance(valor, str) and valor.strip() == "":
+            return None
+        return valor
+
+    @field_validator("base_segundos", "max_segundos", "limite_taxa_max", "falha_max", "erro_max")
+    @classmethod
+    def numero_negativo(cls, valor):
+        if valor is not None and valor < 0:
+            raise ValueError("Os valores de retentativa não podem ser negativos")
+        return valor
+
 
 class InformacoesFusoHorario(BaseModel):
     fuso_horario: str
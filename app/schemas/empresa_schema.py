@@ -131,6 +131,7 @@ class EmpresaSchema(BaseModel):
     recall_quant: Optional[int]
     recall_ativo: Optional[bool]
     recall_confirmacao_ativo: Optional[bool]
+    janela_agrupamento_segundos: Optional[int] = None
     confirmar_agendamentos_ativo: Optional[bool]
     lembrar_vencimentos_ativo: Optional[bool]
     enviar_boleto_lembrar_vencimento: Optional[bool]
@@ -140,6 +141,13 @@ class EmpresaSchema(BaseModel):
     duracao_evento: Optional[int]
     hora_inicio_agenda: Optional[str]
     hora_final_agenda: Optional[str]
+    regras_extracao_evento: Optional[List[str]] = None
+    modelo_confirmacao: Optional[str] = None
+    retry_base_segundos: Optional[float] = None
+    retry_max_segundos: Optional[float] = None
+    retry_limite_taxa_max: Optional[int] = None
+    retry_falha_max: Optional[int] = None
+    retry_erro_max: Optional[int] = None
     assistentes: List[AssistenteSchema]
     colaboradores: List[ColaboradorSchema]
     midias: List[MidiaSchema]
@@ -1,13 +1,24 @@
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 import pytz
 import json
+import re
+import time
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db.models import Contato, Assistente, Empresa, OutlookClient, GoogleCalendarClient
+from app.db.database import executar, confirmar
+from app.db.models import Contato, Assistente, Empresa, OutlookClient, GoogleCalendarClient, EventoAgendado, \
+    ConfirmacaoEnviada
 from app.utils.agenda_client import AgendaClient, EventoTituloAgenda, EventoTituloAgendaDataNova
-from app.utils.assistant import Assistant, Instrucao, RespostaDataSugerida, RespostaAgendamento, RespostaConfirmacao
+from app.utils.assistant import AsyncAssistant, Instrucao, RespostaDataSugerida, RespostaAgendamento, RespostaConfirmacao, \
+    Resposta
+from app.utils.disponibilidade import calcular_disponibilidade, resumir_disponibilidade, AGENDA_JANELA_DIAS
+from app.utils.extracao_evento import extrair_por_regras
 from app.utils.google_calendar import GoogleCalendar
+from app.utils.metricas import metricas
 from app.utils.outlook import Outlook
+from app.utils.retentativa import PoliticaRetentativa
 
 
 async def verificar_data_sugerida(
@@ -15,7 +26,7 @@ async def verificar_data_sugerida(
         contato: Contato,
         endereco_agenda: str,
         empresa: Empresa,
-        db: Session
+        db: Session | AsyncSession
 ):
     timezone = pytz.timezone(empresa.fuso_horario)
     hoje = datetime.now(timezone)
@@ -25,51 +36,70 @@ async def verificar_data_sugerida(
     numero_semana = hoje.strftime("%U")
     semana_par_impar = "PAR" if int(numero_semana) % 2 == 0 else "ÍMPAR"
 
+    # Os horários livres dos próximos dias vão calculados junto da instrução, assim o assistente
+    # já responde com os horários e a segunda execução só é feita para datas fora dos dias resumidos
+    dias_agenda = await calcular_disponibilidade(agenda_client, endereco_agenda, hoje.date(), AGENDA_JANELA_DIAS, timezone)
+    disponibilidade = resumir_disponibilidade(dias_agenda)
+
     instrucao = Instrucao(
         acao="verificar_data_sugerida",
         dados={
             "hoje": hoje_formatado,
             "sugestao_inicial": amanha_formatado,
             "numero_semana": numero_semana,
-            "semana_par_impar": semana_par_impar
+            "semana_par_impar": semana_par_impar,
+            "horario_inicial": agenda_client.hora_inicio_agenda,
+            "horario_final": agenda_client.hora_final_agenda,
+            "intervalo_tempo": agenda_client.duracao_evento,
+            "disponibilidade": disponibilidade
         }
     )
 
-    assistente_db = db.query(Assistente).filter_by(proposito="agendar", id_empresa=empresa.id).first()
+    assistente_db = (await executar(db, select(Assistente).filter_by(proposito="agendar", id_empresa=empresa.id))).scalars().first()
 
     if assistente_db is not None:
-        assistente = Assistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key)
-        assistente.adicionar_mensagens(mensagens=[instrucao.__str__()], id_arquivos=[], thread_id=contato.threadId)
+        assistente = AsyncAssistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key, proposito=assistente_db.proposito, politica=PoliticaRetentativa.from_empresa(empresa))
+        await assistente.adicionar_mensagens(mensagens=[instrucao.__str__()], id_arquivos=[], thread_id=contato.threadId)
 
-        resposta, _ = assistente.criar_rodar_thread(thread_id=contato.threadId)
+        resposta, _ = await assistente.criar_rodar_thread(thread_id=contato.threadId)
         resposta = RespostaDataSugerida.from_dict(json.loads(resposta))
 
         if resposta.tag == "DATA VÁLIDA":
-            agendas = await agenda_client.obter_horarios(agendas=[endereco_agenda], data=resposta.data_sugerida)
-            if agendas:
-                agenda_disponivel = agendas[0]
-                if agenda_disponivel is not None:
-                    if set(agenda_disponivel.availability_view) == {"2"}:
-                        dados_agenda = {
-                            "titulo": agenda_disponivel.schedule_items[0]["subject"] or "",
-                            "disponibilidade": agenda_disponivel.availability_view or ""
-                        }
-                        instrucao.acao = "agenda_fechada"
-                    else:
-                        dados_agenda = {
-                            "data_sugerida": resposta.data_sugerida,
-                            "disponibilidade": agenda_disponivel.availability_view,
-                            "horario_inicial": agenda_client.hora_inicio_agenda,
-                            "horario_final": agenda_client.hora_final_agenda,
-                            "intervalo_tempo": agenda_client.duracao_evento
-                        }
-                        instrucao.acao = "agenda_disponivel"
-                    instrucao.dados = dados_agenda
-                    assistente.adicionar_mensagens(mensagens=[instrucao.__str__()], id_arquivos=[], thread_id=contato.threadId)
-
-                    resposta, _ = assistente.criar_rodar_thread(thread_id=contato.threadId)
-                    resposta = RespostaDataSugerida.from_dict(json.loads(resposta))
-                    return resposta.mensagem
+            # Só os dias resumidos na instrução já tiveram os horários vistos pelo assistente
+            if resposta.data_sugerida in {dia["data"] for dia in disponibilidade}:
+                return resposta.mensagem
+
+            dia = dias_agenda.get(resposta.data_sugerida)
+            if dia is None:
+                try:
+                    data_sugerida = date.fromisoformat(resposta.data_sugerida)
+                except ValueError:
+                    print(f"Data sugerida em formato inválido: {resposta.data_sugerida}")
+                    return None
+
+                # A agenda só é consultada de novo para datas fora da janela já calculada
+                dias_sugeridos = await calcular_disponibilidade(agenda_client, endereco_agenda, data_sugerida, 1, timezone)
+                dia = dias_sugeridos.get(resposta.data_sugerida)
+
+            if dia is not None:
+                if dia.fechado:
+                    dados_agenda = {
+                        "data_sugerida": resposta.data_sugerida,
+                        "titulo": dia.titulo or ""
+                    }
+                    instrucao.acao = "agenda_fechada"
+                else:
+                    dados_agenda = {
+                        "data_sugerida": resposta.data_sugerida,
+                        "horarios": dia.horarios
+                    }
+                    instrucao.acao = "agenda_disponivel"
+                instrucao.dados = dados_agenda
+                await assistente.adicionar_mensagens(mensagens=[instrucao.__str__()], id_arquivos=[], thread_id=contato.threadId)
+
+                resposta, _ = await assistente.criar_rodar_thread(thread_id=contato.threadId)
+                resposta = RespostaDataSugerida.from_dict(json.loads(resposta))
+                return resposta.mensagem
         else:
             return resposta.mensagem
     return None
@@ -80,7 +110,7 @@ async def cadastrar_evento(
         contato: Contato,
         endereco_agenda: str,
         empresa: Empresa,
-        db: Session
+        db: Session | AsyncSession
 ):
     timezone = pytz.timezone(empresa.fuso_horario)
     hoje = datetime.now(timezone)
@@ -93,19 +123,22 @@ async def cadastrar_evento(
         }
     )
 
-    assistente_db = db.query(Assistente).filter_by(proposito="agendar", id_empresa=empresa.id).first()
+    assistente_db = (await executar(db, select(Assistente).filter_by(proposito="agendar", id_empresa=empresa.id))).scalars().first()
 
     if assistente_db is not None:
-        assistente = Assistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key)
-        assistente.adicionar_mensagens(mensagens=[instrucao.__str__()], id_arquivos=[], thread_id=contato.threadId)
+        assistente = AsyncAssistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key, proposito=assistente_db.proposito, politica=PoliticaRetentativa.from_empresa(empresa))
+        await assistente.adicionar_mensagens(mensagens=[instrucao.__str__()], id_arquivos=[], thread_id=contato.threadId)
 
-        resposta, _ = assistente.criar_rodar_thread(thread_id=contato.threadId)
+        resposta, _ = await assistente.criar_rodar_thread(thread_id=contato.threadId)
         resposta = RespostaAgendamento.from_dict(json.loads(resposta))
 
         if resposta.tag == "DATA VÁLIDA":
-            await agenda_client.cadastrar_evento(agenda=endereco_agenda, data=resposta.data_hora_agendamento,
-                                                 titulo=resposta.titulo_evento, descricao=resposta.descricao,
-                                                 localizacao=resposta.localizacao)
+            id_evento = await agenda_client.cadastrar_evento(agenda=endereco_agenda, data=resposta.data_hora_agendamento,
+                                                             titulo=resposta.titulo_evento, descricao=resposta.descricao,
+                                                             localizacao=resposta.localizacao)
+            if id_evento:
+                await registrar_evento_agendado(contato, contato.threadId, endereco_agenda, id_evento,
+                                                resposta.titulo_evento, resposta.data_hora_agendamento, db)
             return resposta.mensagem
         else:
             return resposta.mensagem
@@ -117,7 +150,7 @@ async def extrair_dados_evento(
         evento: dict,
         data_atual: str,
         empresa: Empresa,
-        db: Session
+        db: Session | AsyncSession
 ):
     instrucao = Instrucao(
         acao="extrair_dados_evento",
@@ -131,72 +164,180 @@ async def extrair_dados_evento(
         }
     )
 
-    assistente_db = db.query(Assistente).filter_by(proposito="agendar", id_empresa=empresa.id).first()
+    assistente_db = (await executar(db, select(Assistente).filter_by(proposito="agendar", id_empresa=empresa.id))).scalars().first()
 
+    inicio = time.perf_counter()
     try:
         if assistente_db is not None:
-            assistente = Assistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key)
-            assistente.adicionar_mensagens(mensagens=[instrucao.__str__()], id_arquivos=[], thread_id=None)
-            resposta, thread_id = assistente.criar_rodar_thread()
+            assistente = AsyncAssistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key, proposito=assistente_db.proposito, politica=PoliticaRetentativa.from_empresa(empresa))
+            await assistente.adicionar_mensagens(mensagens=[instrucao.__str__()], id_arquivos=[], thread_id=None)
+
+            # Quando as regras da empresa resolvem o evento a thread é criada já com a resposta, sem execução do assistente
+            try:
+                dados_regra = extrair_por_regras(evento, empresa.regras_extracao_evento, empresa.modelo_confirmacao)
+            except Exception as e:
+                print(f"Erro ao aplicar as regras de extração da empresa {empresa.id}: {e}")
+                dados_regra = None
+            if dados_regra:
+                cliente, telefone, mensagem = dados_regra
+                resposta_obj = RespostaConfirmacao(
+                    cliente=cliente,
+                    telefone=telefone,
+                    resposta_confirmacao=Resposta(atividade="R", departamento="", mensagem=mensagem, midia="", agenda="", assistente="")
+                )
+                thread_id = await assistente.criar_thread(respostas=[mensagem])
+                metricas.incrementar("extracao_evento", "regra")
+                metricas.registrar_tempo("extracao_evento", "regra", time.perf_counter() - inicio)
+                return resposta_obj, thread_id
+
+            resposta, thread_id = await assistente.criar_rodar_thread()
             resposta_obj = RespostaConfirmacao.from_dict(json.loads(resposta))
+            metricas.incrementar("extracao_evento", "assistente")
+            metricas.registrar_tempo("extracao_evento", "assistente", time.perf_counter() - inicio)
             return resposta_obj, thread_id
     except Exception as e:
         print(e)
+        metricas.incrementar("extracao_evento", "falha")
     return {}, None
 
 
+async def registrar_evento_agendado(
+        contato: Contato,
+        thread_id: str | None,
+        endereco_agenda: str,
+        id_evento: str | None,
+        titulo: str,
+        data_hora_inicio: str,
+        db: Session | AsyncSession
+):
+    if not thread_id:
+        return
+
+    db.add(EventoAgendado(
+        id_empresa=contato.id_empresa,
+        id_contato=contato.id,
+        thread_id=thread_id,
+        endereco_agenda=endereco_agenda,
+        id_evento=id_evento,
+        titulo=titulo,
+        data_hora_inicio=data_hora_inicio
+    ))
+    await confirmar(db)
+
+
+async def obter_evento_agendado(contato: Contato, db: Session | AsyncSession):
+    if not contato.threadId:
+        return None
+
+    consulta = (
+        select(EventoAgendado)
+        .filter_by(id_contato=contato.id, thread_id=contato.threadId)
+        .order_by(EventoAgendado.id.desc())
+        .limit(1)
+    )
+    return (await executar(db, consulta)).scalars().first()
+
+
+def obter_chave_evento_sem_id(evento: dict):
+    # O prefixo de status que a confirmação, o reagendamento e o cancelamento colocam no título não muda a chave
+    titulo = re.sub(r"^(?:(?:CONFIRMADO|REAGENDADO|CANCELADO) - )+", "", evento.get("subject") or "")
+    return f"{evento.get('start', {}).get('date_time', '')}|{titulo}"
+
+
+def obter_chave_evento(evento: dict):
+    return evento.get("id") or obter_chave_evento_sem_id(evento)
+
+
+async def obter_confirmacoes_enviadas(empresa: Empresa, data_inicio: str, data_fim: str, db: Session | AsyncSession):
+    consulta = (
+        select(ConfirmacaoEnviada.endereco_agenda, ConfirmacaoEnviada.chave_evento)
+        .where(ConfirmacaoEnviada.id_empresa == empresa.id)
+        .where(ConfirmacaoEnviada.data_evento.between(data_inicio, data_fim))
+    )
+    return {(endereco_agenda, chave_evento) for endereco_agenda, chave_evento in (await executar(db, consulta)).all()}
+
+
+async def registrar_confirmacao_enviada(
+        contato: Contato,
+        endereco_agenda: str,
+        chave_evento: str,
+        data_evento: str,
+        db: Session | AsyncSession
+):
+    db.add(ConfirmacaoEnviada(
+        id_empresa=contato.id_empresa,
+        id_contato=contato.id,
+        endereco_agenda=endereco_agenda,
+        chave_evento=chave_evento,
+        data_evento=data_evento
+    ))
+    await confirmar(db)
+
+
+def montar_dados_evento(endereco_agenda: str, titulo: str, start_datetime: str, data_nova: str | None, id_evento: str | None = None):
+    if not data_nova:
+        return EventoTituloAgenda(
+            endereco_agenda=endereco_agenda,
+            titulo=titulo,
+            start_datetime=start_datetime,
+            id_evento=id_evento
+        )
+    return EventoTituloAgendaDataNova(
+        endereco_agenda=endereco_agenda,
+        titulo=titulo,
+        start_datetime=start_datetime,
+        data_nova=data_nova,
+        id_evento=id_evento
+    )
+
+
 async def obter_titulo_agenda_evento(
-        assistente: Assistant,
+        assistente: AsyncAssistant,
         contato: Contato,
-        data_nova: str | None = None
+        data_nova: str | None,
+        db: Session | AsyncSession
 ):
-    mensagem = assistente.obter_mensagem_thread(contato.threadId, 0, "asc", 1)
+    # Eventos registrados na criação ou na confirmação são alterados direto pelo id
+    evento = await obter_evento_agendado(contato, db)
+    if evento:
+        return montar_dados_evento(evento.endereco_agenda, evento.titulo or "", evento.data_hora_inicio or "",
+                                   data_nova, evento.id_evento)
+
+    mensagem = await assistente.obter_mensagem_thread(contato.threadId, 0, "asc", 1)
     if mensagem:
         mensagem_dict = json.loads(mensagem)
         dados_dict = mensagem_dict.get("dados", {})
         if dados_dict:
-            if not data_nova:
-                dados = EventoTituloAgenda(
-                    endereco_agenda=dados_dict.get("email_agenda", ""),
-                    titulo=dados_dict.get("titulo", ""),
-                    start_datetime=dados_dict.get("data_hora_inicio", "")
-                )
-            else:
-                dados = EventoTituloAgendaDataNova(
-                    endereco_agenda=dados_dict.get("email_agenda", ""),
-                    titulo=dados_dict.get("titulo", ""),
-                    start_datetime=dados_dict.get("data_hora_inicio", ""),
-                    data_nova=data_nova
-                )
-            return dados
+            return montar_dados_evento(dados_dict.get("email_agenda", ""), dados_dict.get("titulo", ""),
+                                       dados_dict.get("data_hora_inicio", ""), data_nova)
     return None
 
 
 async def obter_nova_data_reagendamento(
         thread_id: str,
         empresa: Empresa,
-        db: Session
+        db: Session | AsyncSession
 ):
     instrucao = Instrucao(
         acao="obter_nova_data_reagendamento",
         dados=None
     )
 
-    assistente_db = db.query(Assistente).filter_by(proposito="agendar", id_empresa=empresa.id).first()
+    assistente_db = (await executar(db, select(Assistente).filter_by(proposito="agendar", id_empresa=empresa.id))).scalars().first()
 
     if assistente_db is not None:
-        assistente = Assistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key)
-        assistente.adicionar_mensagens(mensagens=[instrucao.__str__()], id_arquivos=[], thread_id=thread_id)
-        resposta, _ = assistente.criar_rodar_thread(thread_id)
+        assistente = AsyncAssistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key, proposito=assistente_db.proposito, politica=PoliticaRetentativa.from_empresa(empresa))
+        await assistente.adicionar_mensagens(mensagens=[instrucao.__str__()], id_arquivos=[], thread_id=thread_id)
+        resposta, _ = await assistente.criar_rodar_thread(thread_id)
 
         resposta_dict = json.loads(resposta)
         return resposta_dict.get("nova_data", "")
     return None
 
 
-def criar_agenda_client(empresa: Empresa, db: Session):
+async def criar_agenda_client(empresa: Empresa, db: Session | AsyncSession):
     if empresa.agenda_client_type == "outlook":
-        outlook_client_db = db.query(OutlookClient).filter_by(id_empresa=empresa.id).first()
+        outlook_client_db = (await executar(db, select(OutlookClient).filter_by(id_empresa=empresa.id))).scalars().first()
         if outlook_client_db:
             return Outlook(
                 access_token=outlook_client_db.access_token,
@@ -208,11 +349,10 @@ def criar_agenda_client(empresa: Empresa, db: Session):
                 horaInicioAgenda=empresa.hora_inicio_agenda,
                 horaFinalAgenda=empresa.hora_final_agenda,
                 timeZone=outlook_client_db.timeZone,
-                client_db=outlook_client_db,
-                db=db
+                id_client_db=outlook_client_db.id
             )
     elif empresa.agenda_client_type == "google_calendar":
-        googlecalendar_client_db = db.query(GoogleCalendarClient).filter_by(id_empresa=empresa.id).first()
+        googlecalendar_client_db = (await executar(db, select(GoogleCalendarClient).filter_by(id_empresa=empresa.id))).scalars().first()
         if googlecalendar_client_db:
             return GoogleCalendar(
                 access_token=googlecalendar_client_db.access_token,
@@ -221,6 +361,5 @@ def criar_agenda_client(empresa: Empresa, db: Session):
                 hora_inicio_agenda=empresa.hora_inicio_agenda,
                 hora_final_agenda=empresa.hora_final_agenda,
                 timezone=googlecalendar_client_db.timezone,
-                client_db=googlecalendar_client_db,
-                db=db
+                id_client_db=googlecalendar_client_db.id
             )
@@ -4,7 +4,8 @@ from sqlalchemy.orm import Session
 
 from app.db.models import Assistente, Empresa, AsaasClient
 from app.utils.asaas import Asaas
-from app.utils.assistant import Assistant, Instrucao, RespostaFinanceiro
+from app.utils.assistant import AsyncAssistant, Instrucao, RespostaFinanceiro
+from app.utils.retentativa import PoliticaRetentativa
 
 
 async def extrair_dados_cobranca(
@@ -32,9 +33,9 @@ async def extrair_dados_cobranca(
 
     try:
         if assistente_db is not None:
-            assistente = Assistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key)
-            assistente.adicionar_mensagens(mensagens=[instrucao.__str__()], id_arquivos=[], thread_id=None)
-            resposta, thread_id = assistente.criar_rodar_thread()
+            assistente = AsyncAssistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key, proposito=assistente_db.proposito, politica=PoliticaRetentativa.from_empresa(empresa))
+            await assistente.adicionar_mensagens(mensagens=[instrucao.__str__()], id_arquivos=[], thread_id=None)
+            resposta, thread_id = await assistente.criar_rodar_thread()
             resposta_obj = RespostaFinanceiro.from_dict(json.loads(resposta))
             return resposta_obj, thread_id
     except Exception as e:
@@ -1,18 +1,22 @@
 from datetime import datetime, timedelta
 
 import pytz
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.db.database import executar, confirmar, recarregar
 from app.db.models import Contato, Assistente, Empresa, Departamento
 from app.schemas.digisac_schema import DigisacRequest
 from app.schemas.evolutionapi_schema import EvolutionAPIRequest
-from app.utils.assistant import Assistant
+from app.utils.assistant import AsyncAssistant
 from app.utils.crm_client import CRMClient
 from app.utils.digisac import Digisac
 from app.utils.message_client import MessageClient
+from app.utils.retentativa import PoliticaRetentativa
 
 
-async def obter_criar_contato(request: DigisacRequest | EvolutionAPIRequest | None, contact_id: str | None, empresa: Empresa, message_client: MessageClient, crm_client: CRMClient | None, db: Session):
+async def obter_criar_contato(request: DigisacRequest | EvolutionAPIRequest | None, contact_id: str | None, empresa: Empresa, message_client: MessageClient, crm_client: CRMClient | None, db: Session | AsyncSession):
     if isinstance(request, DigisacRequest):
         contact_id = request.data.contactId
     elif isinstance(request, EvolutionAPIRequest):
@@ -25,17 +29,17 @@ async def obter_criar_contato(request: DigisacRequest | EvolutionAPIRequest | No
     timezone = pytz.timezone(empresa.fuso_horario)
     agora = datetime.now(timezone)
     dados_contato = None
-    contato = db.query(Contato).filter_by(contactId=contact_id, id_empresa=empresa.id).first()
+    contato = (await executar(db, select(Contato).filter_by(contactId=contact_id, id_empresa=empresa.id))).scalars().first()
 
     if contato is None:
         if request is not None:
-            dados_contato = message_client.obter_dados_contato(request=request)
+            dados_contato = await message_client.obter_dados_contato(request=request)
 
         id_negociacao = None
         if crm_client:
-            id_negociacao = crm_client.criar_lead(nome_negociacao=dados_contato.contact_name,
-                                                  nome_contato=dados_contato.contact_name,
-                                                  telefone_contato=dados_contato.phone_number)
+            id_negociacao = await crm_client.criar_lead(nome_negociacao=dados_contato.contact_name,
+                                                        nome_contato=dados_contato.contact_name,
+                                                        telefone_contato=dados_contato.phone_number)
 
         contato = await criar_contato(contact_id, id_negociacao, empresa, timezone, True, db)
     else:
@@ -48,22 +52,22 @@ async def obter_criar_contato(request: DigisacRequest | EvolutionAPIRequest | No
 
         contato.lastMessage = agora
         contato.recallCount = 0
-        db.commit()
+        await confirmar(db)
 
     if contato.assistenteAtual:
-        assistente_db = db.query(Assistente).filter_by(id=contato.assistenteAtual, id_empresa=empresa.id).first()
+        assistente_db = (await executar(db, select(Assistente).filter_by(id=contato.assistenteAtual, id_empresa=empresa.id))).scalars().first()
     else:
-        assistente_db = db.query(Assistente).filter_by(id=empresa.assistentePadrao, id_empresa=empresa.id).first()
+        assistente_db = (await executar(db, select(Assistente).filter_by(id=empresa.assistentePadrao, id_empresa=empresa.id))).scalars().first()
         await atualizar_assistente_atual_contato(contato, assistente_db.id, db)
-    assistente = Assistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key)
+    assistente = AsyncAssistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key, proposito=assistente_db.proposito, politica=PoliticaRetentativa.from_empresa(empresa))
     if not contato.threadId and dados_contato is None and request is not None:
-        dados_contato = message_client.obter_dados_contato(request=request)
+        dados_contato = await message_client.obter_dados_contato(request=request)
 
     return contato, assistente, dados_contato
 
 
-async def criar_contato(contact_id: str, id_negociacao: str | None, empresa: Empresa, timezone: pytz.timezone, receber_respostas_ia: bool, db: Session):
-    assistente_db = db.query(Assistente).filter_by(id=empresa.assistentePadrao, id_empresa=empresa.id).first()
+async def criar_contato(contact_id: str, id_negociacao: str | None, empresa: Empresa, timezone: pytz.timezone, receber_respostas_ia: bool, db: Session | AsyncSession):
+    assistente_db = (await executar(db, select(Assistente).filter_by(id=empresa.assistentePadrao, id_empresa=empresa.id))).scalars().first()
 
     if assistente_db is not None:
         contato = Contato(
@@ -79,41 +83,41 @@ async def criar_contato(contact_id: str, id_negociacao: str | None, empresa: Emp
             id_empresa=empresa.id
         )
         db.add(contato)
-        db.commit()
-        db.refresh(contato)
+        await confirmar(db)
+        await recarregar(db, contato)
         return contato
     return None
 
 
 async def obter_id_contato(message_client: MessageClient, telefone: str, nome_contato: str):
-    id_contato = message_client.obter_id_contato(telefone, nome_contato)
+    id_contato = await message_client.obter_id_contato(telefone, nome_contato)
     return id_contato
 
 
-async def atualizar_assistente_atual_contato(contato: Contato, id_assistente: int, db: Session):
+async def atualizar_assistente_atual_contato(contato: Contato, id_assistente: int, db: Session | AsyncSession):
     contato.assistenteAtual = id_assistente
-    db.commit()
+    await confirmar(db)
 
 
-async def atualizar_thread_contato(contato: Contato, thread_id: str, db: Session):
+async def atualizar_thread_contato(contato: Contato, thread_id: str, db: Session | AsyncSession):
     contato.threadId = thread_id
-    db.commit()
+    await confirmar(db)
 
 
-async def encerrar_contato(contato: Contato, message_client: MessageClient, db: Session):
+async def encerrar_contato(contato: Contato, message_client: MessageClient, db: Session | AsyncSession):
     if isinstance(message_client, Digisac):
-        message_client.encerrar_chamado(contactId=contato.contactId, ticketTopicIds=[], comments="", byUserId=None)
+        await message_client.encerrar_chamado(contactId=contato.contactId, ticketTopicIds=[], comments="", byUserId=None)
     await redefinir_contato(contato, db)
 
 
 async def transferir_contato(message_client: Digisac, contato: Contato, departamento: Departamento):
-    message_client.transferir(contactId=contato.contactId, departmentId=departamento.departmentId, userId=departamento.userId, byUserId=None, comments=departamento.comentario)
+    await message_client.transferir(contactId=contato.contactId, departmentId=departamento.departmentId, userId=departamento.userId, byUserId=None, comments=departamento.comentario)
     pass
 
 
-async def mudar_recebimento_ia(contato: Contato | str, empresa: Empresa, valor: bool, db: Session):
+async def mudar_recebimento_ia(contato: Contato | str, empresa: Empresa, valor: bool, db: Session | AsyncSession):
     if isinstance(contato, str):
-        contato_db = db.query(Contato).filter_by(contactId=contato, id_empresa=empresa.id).first()
+        contato_db = (await executar(db, select(Contato).filter_by(contactId=contato, id_empresa=empresa.id))).scalars().first()
         if not contato_db:
             timezone = pytz.timezone(empresa.fuso_horario)
             await criar_contato(contato, None, empresa, timezone, valor, db)
@@ -123,24 +127,24 @@ async def mudar_recebimento_ia(contato: Contato | str, empresa: Empresa, valor:
 
     if contato_db and contato_db.receber_respostas_ia != valor:
         contato_db.receber_respostas_ia = valor
-        db.commit()
+        await confirmar(db)
         return True
     return False
 
 
-async def mudar_aguardando_humano(contato: Contato, valor: bool, db: Session):
+async def mudar_aguardando_humano(contato: Contato, valor: bool, db: Session | AsyncSession):
     if contato:
         contato.aguardando_humano = valor
-        db.commit()
+        await confirmar(db)
         return True
     return False
 
 
-async def redefinir_contato(contato: Contato, db: Session):
+async def redefinir_contato(contato: Contato, db: Session | AsyncSession):
     contato.threadId = None
     contato.assistenteAtual = None
     contato.lastMessage = None
     contato.recallCount = 0
     contato.appointmentConfirmation = False
     contato.aguardando_humano = False
-    db.commit()
+    await confirmar(db)
@@ -1,15 +1,18 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.db.database import executar
 from app.db.models import Empresa, RDStationCRMClient, RDStationCRMDealStage, Contato
 from app.utils.crm_client import CRMClient
 from app.utils.rdstation_crm import RDStationCRM
 
 
-def criar_crm_client(empresa: Empresa, db: Session):
+async def criar_crm_client(empresa: Empresa, db: Session | AsyncSession):
     if empresa.crm_client_type == "rdstation":
-        rdstationcrm_client_db = db.query(RDStationCRMClient).filter_by(id_empresa=empresa.id).first()
+        rdstationcrm_client_db = (await executar(db, select(RDStationCRMClient).filter_by(id_empresa=empresa.id))).scalars().first()
         if rdstationcrm_client_db:
-            deal_stage_inicial = db.query(RDStationCRMDealStage).filter_by(deal_stage_inicial=True, id_rdstationcrm_client=rdstationcrm_client_db.id).first()
+            deal_stage_inicial = (await executar(db, select(RDStationCRMDealStage).filter_by(deal_stage_inicial=True, id_rdstationcrm_client=rdstationcrm_client_db.id))).scalars().first()
             if deal_stage_inicial:
                 return RDStationCRM(
                     token=rdstationcrm_client_db.token,
@@ -20,19 +23,19 @@ def criar_crm_client(empresa: Empresa, db: Session):
     return None
 
 
-async def mover_lead(crm_client: CRMClient, contato: Contato, empresa: Empresa, atalho: str, db: Session):
+async def mover_lead(crm_client: CRMClient, contato: Contato, empresa: Empresa, atalho: str, db: Session | AsyncSession):
     if crm_client and contato.deal_id:
-        deal_stage_db = (
-            db.query(RDStationCRMDealStage)
+        deal_stage_db = (await executar(
+            db,
+            select(RDStationCRMDealStage)
             .join(RDStationCRMClient, RDStationCRMDealStage.id_rdstationcrm_client == RDStationCRMClient.id)
-            .filter(
+            .where(
                 RDStationCRMDealStage.atalho == atalho,
                 RDStationCRMClient.id_empresa == empresa.id
             )
-            .first()
-        )
+        )).scalars().first()
 
         if deal_stage_db:
-            return crm_client.mudar_etapa(deal_id=contato.deal_id,
-                                          deal_stage_id=deal_stage_db.deal_stage_id,
-                                          user_id=deal_stage_db.user_id)
\ No newline at end of file
+            return await crm_client.mudar_etapa(deal_id=contato.deal_id,
+                                                deal_stage_id=deal_stage_db.deal_stage_id,
+                                                user_id=deal_stage_db.user_id)
\ No newline at end of file
@@ -1,50 +1,63 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.db.database import executar
 from app.db.models import Empresa, Assistente, Agenda, DigisacClient, Departamento, Colaborador
 from app.services.agendamento_service import criar_agenda_client
 from app.services.crm_service import criar_crm_client
 from app.services.mensagem_service import criar_message_client
-from app.utils.assistant import Assistant
+from app.utils.assistant import AsyncAssistant
+from app.utils.cache_empresa import cache_empresas
+from app.utils.retentativa import PoliticaRetentativa
 
 
-async def obter_empresa(slug: str, token: str, db: Session):
-    empresa: Empresa | None = db.query(Empresa).filter_by(slug=slug, token=token, empresa_ativa=True).first()
+async def obter_empresa(slug: str, token: str, db: Session | AsyncSession):
+    dados_empresa = cache_empresas.obter(slug, token)
+    if dados_empresa is not None:
+        return dados_empresa
+
+    empresa: Empresa | None = (await executar(db, select(Empresa).filter_by(slug=slug, token=token, empresa_ativa=True))).scalars().first()
 
     if empresa is not None:
-        message_client = criar_message_client(empresa, db)
-        agenda_client = criar_agenda_client(empresa, db)
-        crm_client = criar_crm_client(empresa, db)
-        return empresa, message_client, agenda_client, crm_client
+        message_client = await criar_message_client(empresa, db)
+        agenda_client = await criar_agenda_client(empresa, db)
+        crm_client = await criar_crm_client(empresa, db)
+        db.expunge(empresa)
+
+        dados_empresa = (empresa, message_client, agenda_client, crm_client)
+        cache_empresas.salvar(slug, token, dados_empresa)
+        return dados_empresa
     return None
 
 
-async def obter_endereco_agenda(empresa: Empresa, atalho: str, db: Session):
+async def obter_endereco_agenda(empresa: Empresa, atalho: str, db: Session | AsyncSession):
     if empresa is not None:
-        agenda = db.query(Agenda).filter_by(atalho=atalho, id_empresa=empresa.id).first()
+        agenda = (await executar(db, select(Agenda).filter_by(atalho=atalho, id_empresa=empresa.id))).scalars().first()
         return agenda
     return None
 
 
-async def obter_assistente(empresa: Empresa, proposito: str | None, atalho: str | None, db: Session):
+async def obter_assistente(empresa: Empresa, proposito: str | None, atalho: str | None, db: Session | AsyncSession):
     if empresa is not None:
         if proposito:
-            assistente_db = db.query(Assistente).filter_by(id_empresa=empresa.id, proposito=proposito).first()
+            assistente_db = (await executar(db, select(Assistente).filter_by(id_empresa=empresa.id, proposito=proposito))).scalars().first()
         else:
-            assistente_db = db.query(Assistente).filter_by(id_empresa=empresa.id, atalho=atalho).first()
+            assistente_db = (await executar(db, select(Assistente).filter_by(id_empresa=empresa.id, atalho=atalho))).scalars().first()
         if assistente_db:
-            assistente = Assistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key)
+            assistente = AsyncAssistant(nome=assistente_db.nome, id=assistente_db.assistantId, api_key=empresa.openai_api_key, proposito=assistente_db.proposito, politica=PoliticaRetentativa.from_empresa(empresa))
             return assistente, assistente_db.id
     return None, None
 
 
-async def obter_departamento(empresa: Empresa, atalho: str | None, dpt_confirmacao: bool, db: Session):
-    digisac_client_db = db.query(DigisacClient).filter_by(id_empresa=empresa.id).first()
+async def obter_departamento(empresa: Empresa, atalho: str | None, dpt_confirmacao: bool, db: Session | AsyncSession):
+    digisac_client_db = (await executar(db, select(DigisacClient).filter_by(id_empresa=empresa.id))).scalars().first()
 
     if digisac_client_db is not None:
         if dpt_confirmacao:
-            departamento = db.query(Departamento).filter_by(departamento_confirmacao=True, id_digisac_client=digisac_client_db.id).first()
+            departamento = (await executar(db, select(Departamento).filter_by(departamento_confirmacao=True, id_digisac_client=digisac_client_db.id))).scalars().first()
         else:
-            departamento = db.query(Departamento).filter_by(atalho=atalho, id_digisac_client=digisac_client_db.id).first()
+            departamento = (await executar(db, select(Departamento).filter_by(atalho=atalho, id_digisac_client=digisac_client_db.id))).scalars().first()
         if departamento is not None:
             return departamento
     return None
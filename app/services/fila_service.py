@@ -0,0 +1,171 @@
+import os
+from datetime import timedelta
+
+from sqlalchemy import text, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.database import executar, confirmar, desfazer
+from app.db.models import FilaMensagem, Empresa
+from app.schemas.digisac_schema import DigisacRequest
+from app.schemas.evolutionapi_schema import EvolutionAPIRequest
+
+
+MODO_INGESTAO = os.getenv("MODO_INGESTAO", "direto").lower()
+RESERVA_SEGUNDOS = int(os.getenv("FILA_RESERVA_SEGUNDOS", "120"))
+MAX_TENTATIVAS = int(os.getenv("FILA_MAX_TENTATIVAS", "5"))
+ESPERA_BASE_SEGUNDOS = int(os.getenv("FILA_ESPERA_BASE_SEGUNDOS", "10"))
+RETENCAO_DIAS = int(os.getenv("FILA_RETENCAO_DIAS", "7"))
+
+CONDICAO_PRONTA = """
+    (f.status = 'pendente' OR (f.status = 'processando' AND f.reservado_ate < now()))
+"""
+
+
+def condicao_bloqueada(chave: str):
+    return f"""
+        EXISTS (
+            SELECT 1 FROM fila_mensagens o
+            WHERE o.chave_contato = {chave}
+              AND ((o.status = 'processando' AND o.reservado_ate >= now())
+                   OR (o.status = 'pendente' AND o.processar_apos > now()))
+        )
+    """
+
+
+def identificar_mensagem(request: DigisacRequest | EvolutionAPIRequest, slug: str):
+    if isinstance(request, EvolutionAPIRequest):
+        return "evolution", request.data.key.id, f"{slug}:{request.data.key.remoteJid}"
+
+    id_mensagem = request.data.message.id if request.data.message and request.data.message.id else request.data.id
+    return "digisac", id_mensagem, f"{slug}:{request.data.contactId}"
+
+
+def reconstruir_requisicao(mensagem: FilaMensagem):
+    if mensagem.provedor == "evolution":
+        return EvolutionAPIRequest.model_validate(mensagem.payload)
+    return DigisacRequest.model_validate(mensagem.payload)
+
+
+async def enfileirar_mensagem(request: DigisacRequest | EvolutionAPIRequest, slug: str, token: str, db: Session | AsyncSession):
+    empresa = (await executar(db, select(Empresa).filter_by(slug=slug, token=token, empresa_ativa=True))).scalars().first()
+    if empresa is None:
+        return False
+
+    provedor, id_mensagem, chave_contato = identificar_mensagem(request, slug)
+
+    janela = empresa.janela_agrupamento_segundos
+    if janela is None:
+        janela = int(os.getenv("JANELA_AGRUPAMENTO_SEGUNDOS", "3"))
+
+    try:
+        await executar(
+            db,
+            insert(FilaMensagem).values(
+                provedor=provedor,
+                id_mensagem=id_mensagem,
+                chave_contato=chave_contato,
+                slug=slug,
+                token=token,
+                payload=request.model_dump(mode="json"),
+                status="pendente",
+                tentativas=0,
+                processar_apos=func.now() + timedelta(seconds=janela) if janela > 0 else None
+            ).on_conflict_do_nothing(constraint="uq_fila_mensagens_provedor_id_mensagem")
+        )
+        await confirmar(db)
+        return True
+    except Exception as e:
+        await desfazer(db)
+        print(f"Erro ao enfileirar mensagem {provedor}:{id_mensagem}: {e}")
+        raise
+
+
+def reservar_mensagens(db: Session):
+    try:
+        linha = db.execute(
+            text(f"""
+                SELECT f.chave_contato FROM fila_mensagens f
+                WHERE {CONDICAO_PRONTA}
+                  AND NOT {condicao_bloqueada('f.chave_contato')}
+                ORDER BY f.id
+                LIMIT 1
+                FOR UPDATE OF f SKIP LOCKED
+            """)
+        ).first()
+        if linha is None:
+            db.commit()
+            return []
+
+        chave = linha.chave_contato
+        bloqueio = db.execute(text("SELECT pg_try_advisory_xact_lock(hashtext(:chave))"), {"chave": chave}).scalar()
+        if not bloqueio or db.execute(text(f"SELECT {condicao_bloqueada(':chave')}"), {"chave": chave}).scalar():
+            db.commit()
+            return []
+
+        ids = db.execute(
+            text(f"""
+                UPDATE fila_mensagens f
+                SET status = 'processando',
+                    reservado_ate = now() + make_interval(secs => :reserva),
+                    tentativas = f.tentativas + 1,
+                    atualizado_em = now()
+                WHERE f.chave_contato = :chave AND {CONDICAO_PRONTA}
+                RETURNING f.id
+            """),
+            {"chave": chave, "reserva": RESERVA_SEGUNDOS}
+        ).scalars().all()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Erro ao reservar mensagens da fila: {e}")
+        return []
+
+    return db.query(FilaMensagem).filter(FilaMensagem.id.in_(ids)).order_by(FilaMensagem.id).all()
+
+
+def renovar_reserva(ids: list[int], db: Session):
+    db.query(FilaMensagem).filter(FilaMensagem.id.in_(ids), FilaMensagem.status == "processando").update(
+        {FilaMensagem.reservado_ate: func.now() + timedelta(seconds=RESERVA_SEGUNDOS)},
+        synchronize_session=False
+    )
+    db.commit()
+
+
+def marcar_respondidas(ids: list[int], db: Session):
+    db.query(FilaMensagem).filter(FilaMensagem.id.in_(ids)).update(
+        {FilaMensagem.respondida: True},
+        synchronize_session=False
+    )
+    db.commit()
+
+
+def concluir_mensagens(ids: list[int], db: Session):
+    db.query(FilaMensagem).filter(FilaMensagem.id.in_(ids)).update(
+        {FilaMensagem.status: "concluido", FilaMensagem.reservado_ate: None, FilaMensagem.erro: None},
+        synchronize_session=False
+    )
+    db.commit()
+
+
+def falhar_mensagens(mensagens: list[FilaMensagem], erro: str, db: Session):
+    for mensagem in mensagens:
+        if mensagem.tentativas >= MAX_TENTATIVAS:
+            mensagem.status = "erro"
+            mensagem.processar_apos = None
+        else:
+            mensagem.status = "pendente"
+            espera = ESPERA_BASE_SEGUNDOS * (2 ** (mensagem.tentativas - 1))
+            mensagem.processar_apos = func.now() + timedelta(seconds=espera)
+        mensagem.reservado_ate = None
+        mensagem.erro = erro[:1000]
+    db.commit()
+
+
+def limpar_fila(db: Session):
+    db.query(FilaMensagem).filter(
+        FilaMensagem.status.in_(["concluido", "erro"]),
+        FilaMensagem.atualizado_em < func.now() - timedelta(days=RETENCAO_DIAS)
+    ).delete(synchronize_session=False)
+    db.commit()
@@ -1,17 +1,24 @@
+import asyncio
 import os
+from typing import Callable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.db.database import executar
 from app.db.models import Contato, Voz, Assistente, Empresa, DigisacClient, EvolutionAPIClient, Midia
 from app.schemas.digisac_schema import DigisacRequest
 from app.schemas.evolutionapi_schema import EvolutionAPIRequest
-from app.utils.assistant import Assistant
+from app.utils.assistant import AsyncAssistant
 from app.utils.digisac import Digisac
 from app.utils.eleven_labs import ElevenLabs
 from app.utils.evolutionapi import EvolutionAPI
 from app.utils.message_client import MessageClient
+from app.utils.retentativa import PoliticaRetentativa
 
 
-async def enviar_mensagem(mensagem: str, audio: bool, midia: str | None, contato: Contato, empresa: Empresa | None, message_client: MessageClient, assistente: Assistant, db: Session):
+async def enviar_mensagem(mensagem: str, audio: bool, midia: str | None, contato: Contato, empresa: Empresa | None, message_client: MessageClient, assistente: AsyncAssistant, db: Session | AsyncSession, ao_enviar: Callable[[], None] | None = None):
     msg_audio = None
     mediatype = ""
 
@@ -20,33 +27,43 @@ async def enviar_mensagem(mensagem: str, audio: bool, midia: str | None, contato
             mediatype = "audio/mpeg"
         else:
             mediatype = "audio"
-        assistente_db = db.query(Assistente).filter_by(assistantId=assistente.id).first()
+        assistente_db = (await executar(db, select(Assistente).filter_by(assistantId=assistente.id))).scalars().first()
         if assistente_db is not None:
-            voz = db.query(Voz).filter_by(id=assistente_db.id_voz).first()
+            voz = (await executar(db, select(Voz).filter_by(id=assistente_db.id_voz))).scalars().first()
             if voz is not None:
                 if empresa.elevenlabs_api_key:
                     elevenlabs_client = ElevenLabs(empresa.elevenlabs_api_key)
-                    ass_reescrita_db = db.query(Assistente).filter_by(proposito="reescrever", id_empresa=empresa.id).first()
+                    ass_reescrita_db = (await executar(db, select(Assistente).filter_by(proposito="reescrever", id_empresa=empresa.id))).scalars().first()
                     if ass_reescrita_db:
-                        assistente_reescrita = Assistant(nome=ass_reescrita_db.nome, id=ass_reescrita_db.assistantId, api_key=empresa.openai_api_key)
-                        assistente_reescrita.adicionar_mensagens([mensagem], [], None)
-                        mensagem_reescrita, _ = assistente_reescrita.criar_rodar_thread(thread_id=None)
+                        assistente_reescrita = AsyncAssistant(nome=ass_reescrita_db.nome, id=ass_reescrita_db.assistantId, api_key=empresa.openai_api_key, proposito=ass_reescrita_db.proposito, politica=PoliticaRetentativa.from_empresa(empresa))
+                        await assistente_reescrita.adicionar_mensagens([mensagem], [], None)
+                        mensagem_reescrita, _ = await assistente_reescrita.criar_rodar_thread(thread_id=None)
                         msg_audio = await elevenlabs_client.gerar_audio(mensagem=mensagem_reescrita, id_voz=voz.voiceId, stability=voz.stability, similarity_boost=voz.similarity_boost, style=voz.style)
-    message_client.enviar_mensagem(mensagem=mensagem, base64=msg_audio, mediatype=mediatype, nome_arquivo=None, contact_id=contato.contactId, userId=None, origin="bot", nome_assistente=assistente.nome)
-
+    midias_db = []
+    downloads = []
     if midia and empresa:
-        midias_db = db.query(Midia).filter_by(atalho=midia, id_empresa=empresa.id).order_by(Midia.ordem).all()
-        for midia_db in midias_db:
-            conteudo = message_client.baixar_arquivo(midia_db.url)
+        midias_db = (await executar(db, select(Midia).filter_by(atalho=midia, id_empresa=empresa.id).order_by(Midia.ordem))).scalars().all()
+        downloads = [asyncio.create_task(message_client.baixar_arquivo(midia_db.url)) for midia_db in midias_db]
+
+    try:
+        await message_client.enviar_mensagem(mensagem=mensagem, base64=msg_audio, mediatype=mediatype, nome_arquivo=None, contact_id=contato.contactId, userId=None, origin="bot", nome_assistente=assistente.nome)
+        if ao_enviar is not None:
+            ao_enviar()
+
+        for midia_db, download in zip(midias_db, downloads):
+            conteudo = await download
             if conteudo:
-                message_client.enviar_mensagem(mensagem="", base64=conteudo, mediatype=midia_db.mediatype, nome_arquivo=midia_db.nome, contact_id=contato.contactId, userId=None, origin="bot", nome_assistente=assistente.nome)
+                await message_client.enviar_mensagem(mensagem="", base64=conteudo, mediatype=midia_db.mediatype, nome_arquivo=midia_db.nome, contact_id=contato.contactId, userId=None, origin="bot", nome_assistente=assistente.nome)
+    finally:
+        for download in downloads:
+            download.cancel()
 
 
-def criar_message_client(empresa: Empresa, db: Session):
-    nome_assistente_padrao = db.query(Assistente).filter_by(id=empresa.assistentePadrao).with_entities(Assistente.nome).scalar()
+async def criar_message_client(empresa: Empresa, db: Session | AsyncSession):
+    nome_assistente_padrao = (await executar(db, select(Assistente.nome).filter_by(id=empresa.assistentePadrao))).scalar()
 
     if empresa.message_client_type == "digisac":
-        digisac_client_db = db.query(DigisacClient).filter_by(id_empresa=empresa.id).first()
+        digisac_client_db = (await executar(db, select(DigisacClient).filter_by(id_empresa=empresa.id))).scalars().first()
         if digisac_client_db:
             return Digisac(
                 slug=digisac_client_db.digisacSlug,
@@ -56,7 +73,7 @@ def criar_message_client(empresa: Empresa, db: Session):
                 token=digisac_client_db.digisacToken
             )
     elif empresa.message_client_type == "evolution":
-        evolutionapi_client_db = db.query(EvolutionAPIClient).filter_by(id_empresa=empresa.id).first()
+        evolutionapi_client_db = (await executar(db, select(EvolutionAPIClient).filter_by(id_empresa=empresa.id))).scalars().first()
         if evolutionapi_client_db:
             return EvolutionAPI(
                 api_key=evolutionapi_client_db.apiKey,
@@ -68,7 +85,7 @@ def criar_message_client(empresa: Empresa, db: Session):
     return None
 
 
-async def obter_mensagem(request: DigisacRequest | EvolutionAPIRequest, message_client: MessageClient, assistente: Assistant):
+async def obter_mensagem(request: DigisacRequest | EvolutionAPIRequest, message_client: MessageClient, assistente: AsyncAssistant):
     audio = False
     mensagem = ""
     imagem = ""
@@ -79,7 +96,7 @@ async def obter_mensagem(request: DigisacRequest | EvolutionAPIRequest, message_
         else:
             mensagem = request.data.message.text or ""
             if request.data.message.type == "image":
-                imagem = message_client.obter_arquivo(request=request, apenas_url=True)
+                imagem = await message_client.obter_arquivo(request=request, apenas_url=True)
     elif isinstance(request, EvolutionAPIRequest):
         if request.data.message.audioMessage is not None:
             audio = True
@@ -93,7 +110,7 @@ async def obter_mensagem(request: DigisacRequest | EvolutionAPIRequest, message_
                 mensagem = request.data.message.conversation or ""
 
     if audio:
-        arquivo = message_client.obter_arquivo(request=request)
+        arquivo = await message_client.obter_arquivo(request=request)
         if arquivo is not None:
             transcricao = await assistente.transcrever_audio(arquivo)
             mensagem = transcricao
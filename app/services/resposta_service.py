@@ -0,0 +1,104 @@
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.models import Contato, Empresa
+from app.schemas.digisac_schema import DigisacRequest
+from app.schemas.evolutionapi_schema import EvolutionAPIRequest
+from app.services.contato_service import obter_criar_contato, mudar_recebimento_ia, redefinir_contato
+from app.services.direcionamento_service import direcionar
+from app.services.empresa_service import obter_empresa
+from app.services.mensagem_service import obter_mensagem, enviar_mensagem
+from app.services.thread_service import executar_thread
+from app.utils.agenda_client import AgendaClient
+from app.utils.agrupador_mensagens import agrupador_mensagens
+from app.utils.assistant import AsyncAssistant
+from app.utils.crm_client import CRMClient
+from app.utils.evolutionapi import EvolutionAPI
+from app.utils.message_client import MessageClient, DadosContato
+
+
+class ContextoResposta:
+    def __init__(self, empresa: Empresa, message_client: MessageClient, agenda_client: AgendaClient | None,
+                 crm_client: CRMClient | None, contato: Contato, assistente: AsyncAssistant,
+                 dados_contato: DadosContato | None, mensagem: str, audio: bool, imagem: str):
+        self.empresa = empresa
+        self.message_client = message_client
+        self.agenda_client = agenda_client
+        self.crm_client = crm_client
+        self.contato = contato
+        self.assistente = assistente
+        self.dados_contato = dados_contato
+        self.mensagem = mensagem
+        self.audio = audio
+        self.imagem = imagem
+
+
+async def preparar_resposta(request: DigisacRequest | EvolutionAPIRequest, slug: str, token: str, db: Session | AsyncSession):
+    if isinstance(request, EvolutionAPIRequest):
+        if request.data.key.fromMe:
+            dados_empresa = await obter_empresa(slug, token, db)
+            if dados_empresa is not None:
+                await mudar_recebimento_ia(request.data.key.remoteJid, dados_empresa[0], False, db)
+            return None
+
+    dados_empresa = await obter_empresa(slug, token, db)
+    if dados_empresa is None:
+        return None
+
+    empresa, message_client, agenda_client, crm_client = dados_empresa
+    contato, assistente, dados_contato = await obter_criar_contato(request, None, empresa, message_client, crm_client, db)
+
+    if isinstance(request, DigisacRequest):
+        if request.data.command == "reset":
+            await redefinir_contato(contato, db)
+            return None
+
+    if not contato.receber_respostas_ia:
+        return None
+
+    mensagem, audio, imagem = await obter_mensagem(request, message_client, assistente)
+
+    if isinstance(message_client, EvolutionAPI):
+        message_client.enviar_presenca(request.data.key.remoteJid, audio)
+
+    return ContextoResposta(empresa, message_client, agenda_client, crm_client, contato, assistente, dados_contato,
+                            mensagem, audio, imagem)
+
+
+async def responder_mensagens(contexto: ContextoResposta, mensagens: list[str], imagens: list[str], audio: bool, db: Session | AsyncSession,
+                              ao_enviar: Callable[[], None] | None = None):
+    resposta = await executar_thread(mensagens, imagens, contexto.contato, contexto.dados_contato, contexto.assistente, db)
+    await direcionar(resposta, audio, contexto.message_client, contexto.agenda_client, contexto.crm_client,
+                     contexto.empresa, contexto.contato, contexto.assistente, db, ao_enviar)
+
+
+async def notificar_erro_ia(request: DigisacRequest | EvolutionAPIRequest, slug: str, token: str, db: Session | AsyncSession,
+                            ao_enviar: Callable[[], None] | None = None):
+    dados_empresa = await obter_empresa(slug, token, db)
+    if dados_empresa is not None:
+        empresa, message_client, agenda_client, crm_client = dados_empresa
+        contato, assistente, _ = await obter_criar_contato(request, None, empresa, message_client, crm_client, db)
+        await enviar_mensagem(empresa.mensagem_erro_ia, False, None, contato, None, message_client, assistente, db, ao_enviar)
+
+
+async def processar_resposta(request: DigisacRequest | EvolutionAPIRequest, slug: str, token: str, db: Session | AsyncSession):
+    resultado = False
+    try:
+        contexto = await preparar_resposta(request, slug, token, db)
+        if contexto is None:
+            return resultado
+
+        lote = await agrupador_mensagens.agrupar(contexto.contato.id, contexto.mensagem, contexto.imagem, contexto.audio,
+                                                 contexto.empresa.janela_agrupamento_segundos)
+        if lote is None:
+            return True
+
+        await responder_mensagens(contexto, lote.mensagens, lote.imagens, lote.audio, db)
+        resultado = True
+    except Exception as e:
+        if "AIResponseError" in str(e):
+            await notificar_erro_ia(request, slug, token, db)
+        print(f"Ocorreu um erro: {e}")
+    return resultado
@@ -1,35 +1,40 @@
 import json
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.db.database import confirmar
 from app.db.models import Contato
-from app.utils.assistant import Assistant, Resposta
+from app.utils.assistant import AsyncAssistant, Resposta
 from app.utils.message_client import DadosContato
 
 
 async def executar_thread(
-        mensagem: str | None,
-        imagem: str | None,
+        mensagem: str | list[str] | None,
+        imagem: str | list[str] | None,
         contato: Contato,
         dados_contato: DadosContato | None,
-        assistente: Assistant,
-        db: Session
+        assistente: AsyncAssistant,
+        db: Session | AsyncSession
 ):
-    if mensagem:
-        assistente.adicionar_mensagens([mensagem], [], contato.threadId or None)
+    mensagens = [item for item in (mensagem if isinstance(mensagem, list) else [mensagem]) if item]
+    imagens = [item for item in (imagem if isinstance(imagem, list) else [imagem]) if item]
+
+    if mensagens:
+        await assistente.adicionar_mensagens(mensagens, [], contato.threadId or None)
 
     if dados_contato:
-        assistente.adicionar_mensagens([dados_contato.__str__()], [], contato.threadId or None)
+        await assistente.adicionar_mensagens([dados_contato.__str__()], [], contato.threadId or None)
 
-    if imagem:
-        id_imagens = assistente.subir_imagens([imagem])
-        assistente.adicionar_imagens(id_imagens, contato.threadId or None)
+    if imagens:
+        id_imagens = await assistente.subir_imagens(imagens)
+        await assistente.adicionar_imagens(id_imagens, contato.threadId or None)
 
-    resposta, thread_id = assistente.criar_rodar_thread(thread_id=contato.threadId)
+    resposta, thread_id = await assistente.criar_rodar_thread(thread_id=contato.threadId)
 
     if not contato.threadId:
         contato.threadId = thread_id
-        db.commit()
+        await confirmar(db)
 
     resposta = json.loads(resposta)
     resposta_obj = Resposta.from_dict(resposta)
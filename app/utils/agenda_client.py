@@ -1,32 +1,37 @@
+import asyncio
 from abc import ABC, abstractmethod
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from typing import List
 
 import pytz
+from msgraph.generated.models.event import Event
 from msgraph.generated.models.schedule_information import ScheduleInformation
 
 
 class EventoTituloAgenda:
-    def __init__(self, endereco_agenda: str, titulo: str, start_datetime: str):
+    def __init__(self, endereco_agenda: str, titulo: str, start_datetime: str, id_evento: str | None = None):
         self.endereco_agenda = endereco_agenda
         self.titulo = titulo
         self.start_datetime = start_datetime
+        self.id_evento = id_evento
 
     @classmethod
     def from_dict(cls, data: dict):
         return cls(
             endereco_agenda=data["endereco_agenda"],
             titulo=data["titulo"],
-            start_datetime=data["start_datetime"]
+            start_datetime=data["start_datetime"],
+            id_evento=data.get("id_evento")
         )
 
 
 class EventoTituloAgendaDataNova:
-    def __init__(self, endereco_agenda: str, titulo: str, start_datetime: str, data_nova: str):
+    def __init__(self, endereco_agenda: str, titulo: str, start_datetime: str, data_nova: str, id_evento: str | None = None):
         self.endereco_agenda = endereco_agenda
         self.titulo = titulo
         self.start_datetime = start_datetime
         self.data_nova = data_nova
+        self.id_evento = id_evento
 
     @classmethod
     def from_dict(cls, data: dict):
@@ -34,7 +39,8 @@ class EventoTituloAgendaDataNova:
             endereco_agenda=data["endereco_agenda"],
             titulo=data["titulo"],
             start_datetime=data["start_datetime"],
-            data_nova=data["data_nova"]
+            data_nova=data["data_nova"],
+            id_evento=data.get("id_evento")
         )
 
 
@@ -43,6 +49,14 @@ class AgendaClient(ABC):
     def obter_horarios(self, **kwargs):
         pass
 
+    async def obter_horarios_periodo(self, agendas: List[str], data_inicio: str, data_fim: str):
+        inicio = date.fromisoformat(data_inicio)
+        quantidade_dias = (date.fromisoformat(data_fim) - inicio).days + 1
+        datas = [(inicio + timedelta(days=i)).isoformat() for i in range(quantidade_dias)]
+
+        horarios = await asyncio.gather(*[self.obter_horarios(agendas=agendas, data=data) for data in datas])
+        return dict(zip(datas, horarios))
+
     @abstractmethod
     def cadastrar_evento(self, **kwargs):
         pass
@@ -68,8 +82,10 @@ class Schedule:
 
     @classmethod
     def from_object(cls, data: ScheduleInformation):
+        # O getSchedule do Graph não devolve o id dos eventos
         schedule_items = [
             {
+                "id": None,
                 "start": {
                     "date_time": item.start.date_time,
                     "time_zone": item.start.time_zone
@@ -93,15 +109,49 @@ class Schedule:
         )
 
     @classmethod
-    def from_dict(cls, data: dict, config: dict):
-        eventos = [
+    def from_dict_periodo(cls, data: dict, config: dict, data_inicio: str, data_fim: str):
+        eventos = cls.converter_eventos_google(data.get("items", []))
+        return cls.from_eventos_periodo(data.get("id") or data.get("summary", ""), eventos, config, data_inicio, data_fim)
+
+    @classmethod
+    def from_eventos_periodo(cls, schedule_id: str, eventos: List[dict], config: dict, data_inicio: str, data_fim: str):
+        timezone = config.get("timezone")
+
+        views = cls.gerar_availability_views(
+            eventos=eventos, intervalo=config.get("duracao_evento"),
+            hora_inicio=config.get("hora_inicio_agenda"), hora_final=config.get("hora_final_agenda"),
+            data_inicio=data_inicio, data_fim=data_fim, timezone=timezone
+        )
+
+        schedules = {}
+        for dia, availability_view in views.items():
+            inicio_janela = timezone.localize(datetime.strptime(f"{dia} {config.get('hora_inicio_agenda')}", "%Y-%m-%d %H:%M:%S"))
+            fim_janela = timezone.localize(datetime.strptime(f"{dia} {config.get('hora_final_agenda')}", "%Y-%m-%d %H:%M:%S"))
+            eventos_dia = [
+                evento for evento in eventos
+                if evento["start"]["date_time"] and evento["end"]["date_time"]
+                and cls.converter_data_evento(evento["start"]["date_time"], timezone) < fim_janela
+                and cls.converter_data_evento(evento["end"]["date_time"], timezone) > inicio_janela
+            ]
+            schedules[dia] = cls(
+                availability_view=availability_view,
+                schedule_id=schedule_id,
+                schedule_items=eventos_dia
+            )
+        return schedules
+
+    @staticmethod
+    def converter_eventos_google(itens: List[dict]):
+        # Eventos de dia inteiro vêm com "date" em vez de "dateTime"
+        return [
             {
+                "id": item.get("id"),
                 "start": {
-                    "date_time": item.get("start", {}).get("dateTime", ""),
+                    "date_time": item.get("start", {}).get("dateTime") or item.get("start", {}).get("date", ""),
                     "time_zone": item.get("start", {}).get("timeZone", "")
                 },
                 "end": {
-                    "date_time": item.get("end", {}).get("dateTime", ""),
+                    "date_time": item.get("end", {}).get("dateTime") or item.get("end", {}).get("date", ""),
                     "time_zone": item.get("end", {}).get("timeZone", "")
                 },
                 "location": item.get("location", ""),
@@ -109,41 +159,94 @@ class Schedule:
                 "status": item.get("status", ""),
                 "subject": item.get("summary", "")
             }
-            for item in data.get("items", [])
+            for item in itens
         ]
 
-        availability_view = cls.gerar_availability_view(
-            eventos=eventos, intervalo=config.get("duracao_evento"),
-            hora_inicio=config.get("hora_inicio_agenda"), hora_final=config.get("hora_final_agenda"),
-            timezone=config.get("timezone"), data=config.get("data_consulta")
-        )
-
-        return cls(
-            availability_view=availability_view,
-            schedule_id=data.get("summary", ""),
-            schedule_items=eventos
-        )
-
     @staticmethod
-    def gerar_availability_view(eventos: List[dict], intervalo: int, hora_inicio: str, hora_final: str, data: str, timezone: pytz.timezone):
-        hora_inicio_dt = timezone.localize(datetime.strptime(f"{data} {hora_inicio}", "%Y-%m-%d %H:%M:%S"))
-        hora_final_dt = timezone.localize(datetime.strptime(f"{data} {hora_final}", "%Y-%m-%d %H:%M:%S"))
+    def converter_eventos_outlook(itens: List[Event]):
+        # O calendarView devolve os horários com sete casas de fração de segundo
+        return [
+            {
+                "id": item.id,
+                "start": {
+                    "date_time": (item.start.date_time or "")[:19] if item.start else "",
+                    "time_zone": item.start.time_zone if item.start else ""
+                },
+                "end": {
+                    "date_time": (item.end.date_time or "")[:19] if item.end else "",
+                    "time_zone": item.end.time_zone if item.end else ""
+                },
+                "location": item.location.display_name if item.location else "",
+                "is_private": getattr(item.sensitivity, "value", None) == "private",
+                "status": "cancelled" if item.is_cancelled else getattr(item.show_as, "value", ""),
+                "subject": item.subject or ""
+            }
+            for item in itens
+        ]
 
-        total_minutos = int((hora_final_dt - hora_inicio_dt).total_seconds() // 60)
-        total_blocos = total_minutos // intervalo
-        blocks = ["0"] * total_blocos
+    @staticmethod
+    def converter_data_evento(valor: str, timezone: pytz.timezone):
+        if len(valor) == 10:
+            return timezone.localize(datetime.strptime(valor, "%Y-%m-%d"))
 
-        for evento in eventos:
-            inicio_evento = datetime.fromisoformat(evento["start"]["date_time"])
-            fim_evento = datetime.fromisoformat(evento["end"]["date_time"])
+        data = datetime.fromisoformat(valor)
+        if data.tzinfo is None:
+            data = timezone.localize(data)
+        return data
 
-            offset = int((inicio_evento - hora_inicio_dt).total_seconds() // 60)
-            index_inicial_bloco = offset // intervalo
+    @staticmethod
+    def mesclar_intervalos(eventos: List[dict], timezone: pytz.timezone):
+        # Trabalha com timestamps para não comparar datetimes com fusos diferentes a cada passo
+        intervalos = sorted(
+            (Schedule.converter_data_evento(evento["start"]["date_time"], timezone).timestamp(),
+             Schedule.converter_data_evento(evento["end"]["date_time"], timezone).timestamp())
+            for evento in eventos
+            if evento.get("status") not in ("cancelled", "free") and evento["start"]["date_time"] and evento["end"]["date_time"]
+        )
 
-            duracao_evento = int((fim_evento - inicio_evento).total_seconds() // 60)
+        mesclados = []
+        for inicio, fim in intervalos:
+            if mesclados and inicio <= mesclados[-1][1]:
+                if fim > mesclados[-1][1]:
+                    mesclados[-1][1] = fim
+            else:
+                mesclados.append([inicio, fim])
+        return mesclados
 
-            for i in range(index_inicial_bloco, index_inicial_bloco + (duracao_evento // intervalo) + 1):
-                if i < total_blocos:
-                    blocks[i] = "2"
+    @staticmethod
+    def gerar_availability_views(eventos: List[dict], intervalo: int, hora_inicio: str, hora_final: str,
+                                 data_inicio: str, data_fim: str, timezone: pytz.timezone):
+        intervalos = Schedule.mesclar_intervalos(eventos, timezone)
+        passo = intervalo * 60
+
+        views = {}
+        primeiro = 0
+        data = date.fromisoformat(data_inicio)
+        while data <= date.fromisoformat(data_fim):
+            inicio_janela = timezone.localize(datetime.strptime(f"{data.isoformat()} {hora_inicio}", "%Y-%m-%d %H:%M:%S")).timestamp()
+            fim_janela = timezone.localize(datetime.strptime(f"{data.isoformat()} {hora_final}", "%Y-%m-%d %H:%M:%S")).timestamp()
+            total_blocos = int((fim_janela - inicio_janela) // passo)
+            blocos = bytearray(b"0" * total_blocos)
+
+            # Intervalos que terminam antes desta janela não interessam aos dias seguintes
+            while primeiro < len(intervalos) and intervalos[primeiro][1] <= inicio_janela:
+                primeiro += 1
+
+            for indice in range(primeiro, len(intervalos)):
+                inicio, fim = intervalos[indice]
+                if inicio >= fim_janela:
+                    break
+
+                # Como no Outlook, um bloco parcialmente ocupado conta como ocupado
+                bloco_inicial = max(0, int((inicio - inicio_janela) // passo))
+                bloco_final = min(total_blocos, -int((inicio_janela - fim) // passo))
+                if bloco_final > bloco_inicial:
+                    blocos[bloco_inicial:bloco_final] = b"2" * (bloco_final - bloco_inicial)
+
+            views[data.isoformat()] = blocos.decode()
+            data += timedelta(days=1)
+        return views
 
-        return "".join(blocks)
+    @staticmethod
+    def gerar_availability_view(eventos: List[dict], intervalo: int, hora_inicio: str, hora_final: str, data: str, timezone: pytz.timezone):
+        return Schedule.gerar_availability_views(eventos, intervalo, hora_inicio, hora_final, data, data, timezone)[data]
@@ -0,0 +1,60 @@
+import asyncio
+import os
+
+
+JANELA_AGRUPAMENTO_PADRAO = float(os.getenv("JANELA_AGRUPAMENTO_SEGUNDOS", "3"))
+MULTIPLICADOR_ESPERA_MAXIMA = 3
+
+
+class LoteMensagens:
+    def __init__(self):
+        self.mensagens = []
+        self.imagens = []
+        self.audio = False
+        self.prazo = 0.0
+        self.limite = 0.0
+
+    def adicionar(self, mensagem: str | None, imagem: str | None, audio: bool):
+        if mensagem:
+            self.mensagens.append(mensagem)
+        if imagem:
+            self.imagens.append(imagem)
+        self.audio = audio
+
+
+class AgrupadorMensagens:
+    def __init__(self):
+        self.lotes = {}
+
+    async def agrupar(self, chave, mensagem: str | None, imagem: str | None, audio: bool, janela: float | None = None):
+        janela = JANELA_AGRUPAMENTO_PADRAO if janela is None else janela
+
+        lote = self.lotes.get(chave)
+        if lote is not None:
+            lote.adicionar(mensagem, imagem, audio)
+            lote.prazo = min(asyncio.get_running_loop().time() + janela, lote.limite)
+            return None
+
+        lote = LoteMensagens()
+        lote.adicionar(mensagem, imagem, audio)
+
+        if janela <= 0:
+            return lote
+
+        agora = asyncio.get_running_loop().time()
+        lote.prazo = agora + janela
+        lote.limite = agora + janela * MULTIPLICADOR_ESPERA_MAXIMA
+        self.lotes[chave] = lote
+
+        try:
+            while True:
+                restante = lote.prazo - asyncio.get_running_loop().time()
+                if restante <= 0:
+                    break
+                await asyncio.sleep(restante)
+        finally:
+            self.lotes.pop(chave, None)
+        return lote
+
+
+agrupador_mensagens = AgrupadorMensagens()
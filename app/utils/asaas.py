@@ -1,7 +1,7 @@
-import requests
 import json
 
 from app.utils.financial_client import FinancialClient
+from app.utils.http_client import cliente_http
 
 
 class Asaas(FinancialClient):
@@ -12,7 +12,7 @@ class Asaas(FinancialClient):
         }
         self.base_url = "https://api.asaas.com/v3"
 
-    def listar_cobrancas(self, due_date_le: str | None = None, due_date_ge: str | None = None, status: str | None = None, limit: str | None = None):
+    async def listar_cobrancas(self, due_date_le: str | None = None, due_date_ge: str | None = None, status: str | None = None, limit: str | None = None, offset: str | None = None):
         endpoint = f"{self.base_url}/payments"
         params = {}
 
@@ -24,14 +24,31 @@ class Asaas(FinancialClient):
             params["status"] = status
         if limit:
             params["limit"] = limit
+        if offset:
+            params["offset"] = offset
 
-        resposta = requests.get(endpoint, headers=self.headers, params=params)
+        resposta = await cliente_http.obter_async(self.base_url).get(endpoint, headers=self.headers, params=params)
         resposta = json.loads(resposta.content)
         return resposta
 
-    def obter_cliente(self, id_cliente: str):
+    async def iterar_cobrancas(self, due_date_le: str | None = None, due_date_ge: str | None = None, status: str | None = None, tamanho_pagina: int = 100):
+        offset = 0
+
+        while True:
+            resposta = await self.listar_cobrancas(due_date_le=due_date_le, due_date_ge=due_date_ge, status=status,
+                                                   limit=str(tamanho_pagina), offset=str(offset))
+            cobrancas = resposta.get("data", [])
+
+            for cobranca in cobrancas:
+                yield cobranca
+
+            if not resposta.get("hasMore", False) or not cobrancas:
+                break
+            offset += len(cobrancas)
+
+    async def obter_cliente(self, id_cliente: str):
         endpoint = f"{self.base_url}/customers/{id_cliente}"
 
-        resposta = requests.get(endpoint, headers=self.headers)
+        resposta = await cliente_http.obter_async(self.base_url).get(endpoint, headers=self.headers)
         resposta = json.loads(resposta.content)
         return resposta
\ No newline at end of file
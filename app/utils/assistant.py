@@ -1,23 +1,40 @@
 import io
+import os
 import base64
 import json
+import time
+from collections import defaultdict
 from typing import List
 
 from PIL import Image
 from fastapi import UploadFile
 import httpx
-from openai import OpenAI
-from openai.types.beta import FunctionToolParam
-import time
+from openai import AsyncOpenAI
+import asyncio
+
+from app.utils.cache_contexto_ferramentas import cache_contexto_ferramentas
+from app.utils.function_utils import carregar_contexto_ferramentas
+from app.utils.registro_ferramentas import registro_ferramentas
+from app.utils.metricas import metricas
+from app.utils.retentativa import PoliticaRetentativa
+
+
+class ErroRunAtivo(Exception):
+    pass
 
-from app.utils.function_utils import obter_data_hora_atual, obter_colaboradores
 
+STREAMING_PADRAO = os.getenv("ASSISTANT_STREAMING", "true").lower() == "true"
 
-class Assistant:
-    def __init__(self, nome: str, id: str, api_key: str):
-        self.client = OpenAI(http_client=CustomHTTPClient(), api_key=api_key)
+
+class AsyncAssistant:
+    def __init__(self, nome: str, id: str, api_key: str, proposito: str | None = None, streaming: bool = STREAMING_PADRAO,
+                 politica: PoliticaRetentativa | None = None):
+        self.client = AsyncOpenAI(http_client=CustomAsyncHTTPClient(), api_key=api_key)
         self.nome = nome
         self.id = id
+        self.proposito = proposito
+        self.streaming = streaming
+        self.politica = politica or PoliticaRetentativa()
         self.mensagens = []
         self.arquivos = []
         self.extensoes_audio = {
@@ -30,7 +47,7 @@ class Assistant:
             "application/octet-stream": "oga"
         }
 
-    def adicionar_mensagens(self, mensagens: list, id_arquivos: list, thread_id: str | None):
+    async def adicionar_mensagens(self, mensagens: list, id_arquivos: list, thread_id: str | None):
         for mensagem in mensagens:
             mensagem_base = {
                 "role": "user",
@@ -57,12 +74,12 @@ class Assistant:
             if thread_id is None:
                 self.mensagens.append(mensagem_base)
             else:
-                self.client.beta.threads.messages.create(
+                await self.client.beta.threads.messages.create(
                     thread_id=thread_id,
                     **mensagem_base
                 )
 
-    def adicionar_imagens(self, id_imagens: list[str], thread_id: str | None):
+    async def adicionar_imagens(self, id_imagens: list[str], thread_id: str | None):
         for imagem in id_imagens:
             if imagem.startswith("http"):
                 mensagem_base = {
@@ -93,12 +110,12 @@ class Assistant:
             if thread_id is None:
                 self.mensagens.append(mensagem_base)
             else:
-                self.client.beta.threads.messages.create(
+                await self.client.beta.threads.messages.create(
                     thread_id=thread_id,
                     **mensagem_base
                 )
 
-    def subir_imagens(self, imagens: list):
+    async def subir_imagens(self, imagens: list):
         id_imagens = []
 
         for i, imagem in enumerate(imagens):
@@ -115,7 +132,7 @@ class Assistant:
             img_bytes.seek(0)
             img_bytes.name = f'imagem_{i+1}.png'
 
-            response = self.client.files.create(
+            response = await self.client.files.create(
                 file=img_bytes,
                 purpose="vision"
             )
@@ -132,7 +149,7 @@ class Assistant:
             pdf_bytes.seek(0)
             pdf_bytes.name = f'arquivo_{i+1}.pdf'
 
-            response = self.client.files.create(
+            response = await self.client.files.create(
                 file=pdf_bytes,
                 purpose="assistants"
             )
@@ -147,7 +164,7 @@ class Assistant:
             audio_bytes.name = audio.get("filename")
 
             try:
-                transcricao = self.client.audio.transcriptions.create(
+                transcricao = await self.client.audio.transcriptions.create(
                     model="whisper-1",
                     file=audio_bytes
                 )
@@ -158,9 +175,9 @@ class Assistant:
         else:
             raise ValueError("O arquivo de áudio não é compatível")
 
-    def excluir_imagens(self, id_imagens: list):
+    async def excluir_imagens(self, id_imagens: list):
         for imagem in id_imagens:
-            self.client.files.delete(imagem)
+            await self.client.files.delete(imagem)
 
     def adicionar_arquivos(self, arquivos: List[UploadFile]):
         for arquivo in arquivos:
@@ -175,136 +192,247 @@ class Assistant:
                     await self.transcrever_audio(arquivo)
         return id_arquivos
 
-    def criar_rodar_thread(self, thread_id: str | None = None):
-        max_tentantivas = 5
-        tentativa = 0
+    async def criar_thread(self, respostas: list[str] | None = None):
+        mensagens = self.mensagens + [{"role": "assistant", "content": resposta} for resposta in respostas or []]
+        thread = await self.client.beta.threads.create(messages=mensagens)
+        self.mensagens = []
+        return thread.id
 
-        while tentativa < max_tentantivas:
-            tentativa += 1
+    async def criar_rodar_thread(self, thread_id: str | None = None):
+        tentativas = defaultdict(int)
 
+        while True:
             try:
                 if thread_id:
-                    runs = self.client.beta.threads.runs.list(
-                        thread_id=thread_id,
-                        limit=1,
-                        order="desc"
-                    )
+                    await self.aguardar_run_ativo(thread_id)
 
-                    if runs.data[0].status in ["queued", "in_progress", "cancelling"]:
-                        time.sleep(15)
-                        continue
+                inicio = time.perf_counter()
 
-                    run = self.client.beta.threads.runs.create(
-                        assistant_id=self.id,
-                        thread_id=thread_id,
-                        tool_choice="auto"
-                    )
+                if self.streaming:
+                    run, resposta = await self.rodar_thread_stream(thread_id, inicio)
                 else:
-                    run = self.client.beta.threads.create_and_run(
-                        assistant_id=self.id,
-                        thread={
-                            "messages": self.mensagens
-                        },
-                        tool_choice="auto"
-                    )
+                    run, resposta = await self.rodar_thread_polling(thread_id)
+
+                if run is not None and run.status == "completed" and resposta is not None:
+                    metricas.registrar_tempo("assistente_execucao", self.proposito, time.perf_counter() - inicio)
+                    return resposta, run.thread_id
+
+                classe = self.politica.classificar_run(run)
+                atraso_sugerido = self.politica.atraso_sugerido_run(run)
+                motivo = f"status: {run.status if run is not None else None}"
+            except ErroRunAtivo as e:
+                # aguardar_run_ativo já consumiu o orçamento de consultas da execução ativa
+                metricas.incrementar("assistente_retentativa", "run_ativo")
+                print(f"Erro na geração de resposta sem nova tentativa ({e})")
+                tentativas["run_ativo"] += 1
+                break
+            except Exception as e:
+                classe = self.politica.classificar_erro(e)
+                atraso_sugerido = self.politica.atraso_sugerido_erro(e, classe)
+                motivo = f"erro inesperado: {e}"
+
+            tentativas[classe] += 1
+            metricas.incrementar("assistente_retentativa", classe)
+
+            if classe == "nao_recuperavel":
+                print(f"Erro na geração de resposta sem nova tentativa ({motivo})")
+                break
+
+            if tentativas[classe] > self.politica.orcamento(classe):
+                break
+
+            espera = self.politica.tempo_espera(classe, tentativas[classe], atraso_sugerido)
+            print(f"Tentativa {tentativas[classe]} ({classe}): Erro na geração de resposta ({motivo}). Tentando novamente em {espera:.1f}s...")
+            await asyncio.sleep(espera)
+        raise Exception(f"AIResponseError: Falha ao gerar uma resposta após {sum(tentativas.values())} tentativas")
 
-                while run.status not in ["completed", "canceled", "failed", "expired"]:
-                    run = self.client.beta.threads.runs.retrieve(
+    async def aguardar_run_ativo(self, thread_id: str):
+        runs = await self.client.beta.threads.runs.list(
+            thread_id=thread_id,
+            limit=1,
+            order="desc"
+        )
+
+        if not runs.data:
+            return
+
+        run = runs.data[0]
+        tentativa = 0
+
+        while run.status in ["queued", "in_progress", "requires_action", "cancelling"]:
+            tentativa += 1
+            if tentativa > self.politica.orcamento("run_ativo"):
+                raise ErroRunAtivo(f"A thread {thread_id} continua com a execução {run.id} ativa")
+
+            await asyncio.sleep(self.politica.tempo_espera("run_ativo", tentativa))
+            run = await self.client.beta.threads.runs.retrieve(
+                thread_id=thread_id,
+                run_id=run.id
+            )
+
+    async def rodar_thread_polling(self, thread_id: str | None):
+        if thread_id:
+            run = await self.client.beta.threads.runs.create(
+                assistant_id=self.id,
+                thread_id=thread_id,
+                tool_choice="auto"
+            )
+        else:
+            run = await self.client.beta.threads.create_and_run(
+                assistant_id=self.id,
+                thread={
+                    "messages": self.mensagens
+                },
+                tool_choice="auto"
+            )
+
+        while run.status not in ["completed", "canceled", "failed", "expired"]:
+            run = await self.client.beta.threads.runs.retrieve(
+                thread_id=run.thread_id,
+                run_id=run.id
+            )
+
+            if run.required_action and run.required_action.type == "submit_tool_outputs":
+                function_outputs = await self.executar_ferramentas(run.required_action.submit_tool_outputs.tool_calls)
+
+                if function_outputs:
+                    await self.client.beta.threads.runs.submit_tool_outputs(
                         thread_id=run.thread_id,
-                        run_id=run.id
+                        run_id=run.id,
+                        tool_outputs=function_outputs
                     )
 
-                    if run.required_action and run.required_action.type == "submit_tool_outputs":
-                        tool_calls = run.required_action.submit_tool_outputs.tool_calls
+            await asyncio.sleep(2)
+
+        if run.status != "completed":
+            return run, None
+
+        resultado = await self.client.beta.threads.messages.list(
+            thread_id=run.thread_id
+        )
 
-                        function_outputs = []
-                        for tool_call in tool_calls:
-                            nome_funcao = tool_call.function.name
-                            argumentos = json.loads(tool_call.function.arguments)
+        return run, resultado.data[0].content[0].text.value
 
-                            try:
-                                resultado_funcao = self.executar_funcao(nome_funcao, argumentos)
+    async def rodar_thread_stream(self, thread_id: str | None, inicio: float):
+        if thread_id:
+            stream = await self.client.beta.threads.runs.create(
+                assistant_id=self.id,
+                thread_id=thread_id,
+                tool_choice="auto",
+                stream=True
+            )
+        else:
+            stream = await self.client.beta.threads.create_and_run(
+                assistant_id=self.id,
+                thread={
+                    "messages": self.mensagens
+                },
+                tool_choice="auto",
+                stream=True
+            )
 
-                                function_outputs.append({
-                                    "tool_call_id": tool_call.id,
-                                    "output": json.dumps(resultado_funcao)
-                                })
-                            except Exception as e:
-                                print(f"Erro ao executar {nome_funcao}: {e}")
+        run_final = None
+        resposta = None
+        primeiro_token = False
+
+        while stream is not None:
+            proximo_stream = None
+
+            async with stream:
+                async for evento in stream:
+                    if evento.event == "thread.message.delta":
+                        if not primeiro_token:
+                            primeiro_token = True
+                            metricas.registrar_tempo("assistente_primeiro_token", self.proposito, time.perf_counter() - inicio)
+                    elif evento.event == "thread.message.completed":
+                        resposta = evento.data.content[0].text.value
+                    elif evento.event == "thread.run.requires_action":
+                        run = evento.data
+                        function_outputs = await self.executar_ferramentas(run.required_action.submit_tool_outputs.tool_calls)
 
                         if function_outputs:
-                            self.client.beta.threads.runs.submit_tool_outputs(
+                            proximo_stream = await self.client.beta.threads.runs.submit_tool_outputs(
                                 thread_id=run.thread_id,
                                 run_id=run.id,
-                                tool_outputs=function_outputs
+                                tool_outputs=function_outputs,
+                                stream=True
                             )
+                        break
+                    elif evento.event in ["thread.run.completed", "thread.run.failed", "thread.run.cancelled", "thread.run.expired", "thread.run.incomplete"]:
+                        run_final = evento.data
+                    elif evento.event == "error":
+                        raise Exception(f"Erro no stream da execução: {evento.data.message}")
 
-                    time.sleep(2)
+            stream = proximo_stream
 
-                if run.status in ["canceled", "failed", "expired"]:
-                    print(f"Tentativa {tentativa}: Erro na geração de resposta (status: {run.status}). Tentando novamente...")
-                    time.sleep(10)
-                    continue
+        return run_final, resposta
 
-                resultado = self.client.beta.threads.messages.list(
-                    thread_id=run.thread_id
-                )
+    async def obter_contexto_ferramentas(self):
+        contexto = cache_contexto_ferramentas.obter(self.id)
+        if contexto is None:
+            contexto = await asyncio.to_thread(carregar_contexto_ferramentas, self.id)
+            cache_contexto_ferramentas.salvar(self.id, contexto)
+        return contexto
 
-                return resultado.data[0].content[0].text.value, run.thread_id
-            except Exception as e:
-                print(f"Tentantiva {tentativa}: Ocorreu um erro inesperado: {e}")
-                time.sleep(10)
-                continue
-        raise Exception(f"AIResponseError: Falha ao gerar uma resposta após {max_tentantivas} tentativas")
+    async def executar_ferramentas(self, tool_calls: list):
+        contexto = await self.obter_contexto_ferramentas()
+        return await asyncio.gather(*[self.executar_ferramenta(tool_call, contexto) for tool_call in tool_calls])
+
+    async def executar_ferramenta(self, tool_call, contexto):
+        nome_funcao = tool_call.function.name
+
+        try:
+            argumentos = json.loads(tool_call.function.arguments or "{}")
+        except json.JSONDecodeError:
+            argumentos = {}
+        resultado_funcao = await registro_ferramentas.executar(nome_funcao, argumentos, contexto)
+
+        # Toda chamada precisa de uma saída para o run seguir, mesmo quando a ferramenta falha
+        return {
+            "tool_call_id": tool_call.id,
+            "output": json.dumps(resultado_funcao)
+        }
 
-    def listar_mensagens_thread(self, thread_id: str, ordem: str, limite: int):
-        mensagens = self.client.beta.threads.messages.list(thread_id, order=ordem, limit=limite)
+    async def listar_mensagens_thread(self, thread_id: str, ordem: str, limite: int):
+        mensagens = await self.client.beta.threads.messages.list(thread_id, order=ordem, limit=limite)
         return mensagens
 
-    def obter_mensagem_thread(self, thread_id: str, index: int, ordem: str, limite: int):
+    async def obter_mensagem_thread(self, thread_id: str, index: int, ordem: str, limite: int):
         try:
-            mensagens = self.listar_mensagens_thread(thread_id, ordem, limite)
+            mensagens = await self.listar_mensagens_thread(thread_id, ordem, limite)
             if mensagens:
                 return mensagens.data[index].content[0].text.value
         except Exception as e:
             print(f"Erro ao obter mensagem da thread: {e}")
         return None
 
-    def obter_arquivo(self, file_id: str):
+    async def obter_arquivo(self, file_id: str):
         try:
-            conteudo = self.client.files.content(file_id)
+            conteudo = await self.client.files.content(file_id)
             return conteudo
         except:
             raise ValueError("Não foi possível baixar o arquivo")
-        
-    def rodar_instrucao(self, thread_id: str, instrucoes: str):
-        run = self.client.beta.threads.runs.create(
+
+    async def rodar_instrucao(self, thread_id: str, instrucoes: str):
+        run = await self.client.beta.threads.runs.create(
             assistant_id=self.id,
             thread_id=thread_id,
             instructions=instrucoes
         )
 
         while run.status != "completed":
-            run = self.client.beta.threads.runs.retrieve(
+            run = await self.client.beta.threads.runs.retrieve(
                 thread_id=run.thread_id,
                 run_id=run.id
             )
-            time.sleep(2)
+            await asyncio.sleep(2)
 
-        resultado = self.client.beta.threads.messages.list(
+        resultado = await self.client.beta.threads.messages.list(
             thread_id=run.thread_id
         )
 
         return resultado.data[0].content[0].text.value
 
-    def executar_funcao(self, nome_funcao, argumentos):
-        if nome_funcao == "get_current_datetime":
-            return obter_data_hora_atual(self.id)
-        if nome_funcao == "get_employees":
-            return obter_colaboradores(self.id)
-        else:
-            raise ValueError(f"Função desconhecida chamada: {nome_funcao}")
-
 
 class Resposta:
     def __init__(self, atividade: str, departamento: str, mensagem: str, midia: str, agenda: str, assistente: str):
@@ -414,44 +542,13 @@ class CustomHTTPClient(httpx.Client):
         super().__init__(*args, **kwargs)
 
 
-class Ferramentas:
-    @staticmethod
-    def get_current_datetime():
-        return FunctionToolParam(
-            function={
-                "name": "get_current_datetime",
-                "description": "A function to extract current date and time",
-                "strict": True,
-                "parameters": {
-                    "type": "object",
-                    "properties": {},
-                    "additionalProperties": False,
-                    "required": []
-                }
-            },
-            type="function"
-        )
+class CustomAsyncHTTPClient(httpx.AsyncClient):
+    def __init__(self, *args, **kwargs):
+        kwargs.pop("proxies", None)
+        super().__init__(*args, **kwargs)
 
-    @staticmethod
-    def get_employees():
-        return FunctionToolParam(
-            function={
-                "name": "get_employees",
-                "description": "A function to return a list of employees",
-                "strict": True,
-                "parameters": {
-                    "type": "object",
-                    "properties": {},
-                    "additionalProperties": False,
-                    "required": []
-                }
-            },
-            type="function"
-        )
 
+class Ferramentas:
     @staticmethod
     def get_all_tools():
-        return [
-            Ferramentas.get_employees(),
-            Ferramentas.get_current_datetime()
-        ]
+        return registro_ferramentas.listar()
@@ -0,0 +1,47 @@
+import os
+import threading
+
+from cachetools import TTLCache
+
+from app.utils.function_utils import ContextoFerramentas
+from app.utils.metricas import metricas
+
+
+CACHE_CONTEXTO_FERRAMENTAS_TTL_SEGUNDOS = int(os.getenv("CACHE_CONTEXTO_FERRAMENTAS_TTL_SEGUNDOS", "300"))
+CACHE_CONTEXTO_FERRAMENTAS_TAMANHO = int(os.getenv("CACHE_CONTEXTO_FERRAMENTAS_TAMANHO", "1024"))
+
+
+class CacheContextoFerramentas:
+    def __init__(self, tamanho: int = CACHE_CONTEXTO_FERRAMENTAS_TAMANHO, ttl: int = CACHE_CONTEXTO_FERRAMENTAS_TTL_SEGUNDOS):
+        self.lock = threading.Lock()
+        self.cache = TTLCache(maxsize=tamanho, ttl=ttl)
+
+    def obter(self, id_assistente: str):
+        with self.lock:
+            contexto = self.cache.get(id_assistente)
+
+        metricas.incrementar("cache_contexto_ferramentas", "acerto" if contexto is not None else "falha")
+        return contexto
+
+    def salvar(self, id_assistente: str, contexto: ContextoFerramentas):
+        # Assistentes ainda não cadastrados não ficam em cache até o TTL expirar
+        if contexto.id_empresa is None:
+            return
+        with self.lock:
+            self.cache[id_assistente] = contexto
+
+    def invalidar(self, id_empresa: int):
+        with self.lock:
+            chaves = [chave for chave, contexto in self.cache.items() if contexto.id_empresa == id_empresa]
+            for chave in chaves:
+                self.cache.pop(chave, None)
+
+        if chaves:
+            metricas.incrementar("cache_contexto_ferramentas", "invalidacao")
+
+    def limpar(self):
+        with self.lock:
+            self.cache.clear()
+
+
+cache_contexto_ferramentas = CacheContextoFerramentas()
@@ -0,0 +1,43 @@
+import os
+import threading
+
+from cachetools import TTLCache
+
+from app.utils.metricas import metricas
+
+
+CACHE_EMPRESA_TTL_SEGUNDOS = int(os.getenv("CACHE_EMPRESA_TTL_SEGUNDOS", "300"))
+CACHE_EMPRESA_TAMANHO = int(os.getenv("CACHE_EMPRESA_TAMANHO", "256"))
+
+
+class CacheEmpresa:
+    def __init__(self, tamanho: int = CACHE_EMPRESA_TAMANHO, ttl: int = CACHE_EMPRESA_TTL_SEGUNDOS):
+        self.lock = threading.Lock()
+        self.cache = TTLCache(maxsize=tamanho, ttl=ttl)
+
+    def obter(self, slug: str, token: str):
+        with self.lock:
+            dados_empresa = self.cache.get((slug, token))
+
+        metricas.incrementar("cache_empresa", "acerto" if dados_empresa is not None else "falha")
+        return dados_empresa
+
+    def salvar(self, slug: str, token: str, dados_empresa: tuple):
+        with self.lock:
+            self.cache[(slug, token)] = dados_empresa
+
+    def invalidar(self, id_empresa: int):
+        with self.lock:
+            chaves = [chave for chave, dados_empresa in self.cache.items() if dados_empresa[0].id == id_empresa]
+            for chave in chaves:
+                self.cache.pop(chave, None)
+
+        if chaves:
+            metricas.incrementar("cache_empresa", "invalidacao")
+
+    def limpar(self):
+        with self.lock:
+            self.cache.clear()
+
+
+cache_empresas = CacheEmpresa()
@@ -3,9 +3,9 @@ from abc import ABC, abstractmethod
 
 class CRMClient(ABC):
     @abstractmethod
-    def criar_lead(self, **kwargs):
+    async def criar_lead(self, **kwargs):
         pass
 
     @abstractmethod
-    def mudar_etapa(self, **kwargs):
+    async def mudar_etapa(self, **kwargs):
         pass
\ No newline at end of file
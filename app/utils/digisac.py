@@ -1,13 +1,12 @@
+import asyncio
 import json
 import os
 import mimetypes
 from io import BytesIO
-from time import sleep
 from typing import List
 
-import requests
-
 from app.schemas.digisac_schema import DigisacRequest
+from app.utils.http_client import cliente_http
 from app.utils.message_client import MessageClient, DadosContato
 
 
@@ -19,11 +18,12 @@ class Digisac(MessageClient):
         }
         self.slug = slug
         self.base_url = f"https://{slug}.digisac.me/api/v1"
+        self.http = cliente_http.obter(self.base_url)
         self.service_id = service_id
         self.defaultUserId = defaultUserId
         self.defaultAssistantName = defaultAssistantName
 
-    def enviar_mensagem(
+    async def enviar_mensagem(
             self,
             mensagem: str | None,
             base64: str | None,
@@ -53,10 +53,10 @@ class Digisac(MessageClient):
             request["file"] = file
             request["text"] = ""
 
-        resposta = requests.post(endpoint, headers=self.headers, json=request)
+        resposta = await cliente_http.obter_async(self.base_url).post(endpoint, headers=self.headers, json=request)
         return resposta
 
-    def transferir(self, contactId: str, departmentId: str, userId: str | None, byUserId: str | None, comments: str | None):
+    async def transferir(self, contactId: str, departmentId: str, userId: str | None, byUserId: str | None, comments: str | None):
         endpoint = f"{self.base_url}/contacts/{contactId}/ticket/transfer"
 
         request = {
@@ -68,20 +68,20 @@ class Digisac(MessageClient):
         if userId is not None:
             request["userId"] = userId
 
-        resposta = requests.post(endpoint, headers=self.headers, json=request)
+        resposta = await cliente_http.obter_async(self.base_url).post(endpoint, headers=self.headers, json=request)
         return resposta
 
-    def adicionar_tag(self, contactId: str, tagIds: List[str]):
+    async def adicionar_tag(self, contactId: str, tagIds: List[str]):
         endpoint = f"{self.base_url}/contacts/{contactId}"
 
         request = {
             "tagIds": tagIds
         }
 
-        resposta = requests.put(endpoint, headers=self.headers, json=request)
+        resposta = await cliente_http.obter_async(self.base_url).put(endpoint, headers=self.headers, json=request)
         return resposta
 
-    def encerrar_chamado(self, contactId: str, ticketTopicIds: List[str], comments: str | None, byUserId: str | None):
+    async def encerrar_chamado(self, contactId: str, ticketTopicIds: List[str], comments: str | None, byUserId: str | None):
         endpoint = f"{self.base_url}/contacts/{contactId}/ticket/close"
 
         request = {
@@ -90,25 +90,25 @@ class Digisac(MessageClient):
             "byUserId": byUserId or self.defaultUserId
         }
 
-        resposta = requests.post(endpoint, headers=self.headers, json=request)
+        resposta = await cliente_http.obter_async(self.base_url).post(endpoint, headers=self.headers, json=request)
         return resposta
 
-    def obter_arquivo(self, request: DigisacRequest, apenas_url: bool = False):
+    async def obter_arquivo(self, request: DigisacRequest, apenas_url: bool = False):
         tentativas = 0
         url = ""
         endpoint = f"{self.base_url}/messages/{request.data.message.id}?include=file"
 
         while url == "" and tentativas < 5:
             try:
-                resposta = requests.get(endpoint, headers=self.headers)
+                resposta = await cliente_http.obter_async(self.base_url).get(endpoint, headers=self.headers)
             except:
-                sleep(10)
+                await asyncio.sleep(10)
                 tentativas+=1
                 break
 
             if resposta.status_code == 200:
                 if resposta.json().get("file", {}).get("url", "") == "":
-                    sleep(10)
+                    await asyncio.sleep(10)
                     tentativas+=1
                 else:
                     url = resposta.json().get("file", {}).get("url", "")
@@ -119,7 +119,7 @@ class Digisac(MessageClient):
             if apenas_url:
                 return url
 
-            arquivo = requests.get(url)
+            arquivo = await cliente_http.obter_async(url).get(url)
 
             if arquivo.status_code == 200:
                 file_name = arquivo.headers.get("Content-Disposition", "").split("filename=")[-1].strip('"')
@@ -138,12 +138,12 @@ class Digisac(MessageClient):
             return None
         return None
 
-    def baixar_arquivo(self, url: str):
-        return super().baixar_arquivo(url)
+    async def baixar_arquivo(self, url: str):
+        return await super().baixar_arquivo(url)
 
-    def obter_dados_contato(self, request: DigisacRequest):
+    async def obter_dados_contato(self, request: DigisacRequest):
         endpoint = f"{self.base_url}/contacts/{request.data.contactId}"
-        resposta = requests.get(endpoint, headers=self.headers)
+        resposta = await cliente_http.obter_async(self.base_url).get(endpoint, headers=self.headers)
 
         if resposta.status_code == 200:
             resposta_obj = json.loads(resposta.content)
@@ -151,11 +151,11 @@ class Digisac(MessageClient):
             return dados_contato
         return None
 
-    def obter_id_contato(self, telefone: str, nome_contato: str):
+    async def obter_id_contato(self, telefone: str, nome_contato: str):
         id_contato = None
 
         endpoint = f"{self.base_url}/contacts"
-        resposta = requests.get(endpoint, headers=self.headers, params={
+        resposta = await cliente_http.obter_async(self.base_url).get(endpoint, headers=self.headers, params={
             "where[data.number]": telefone,
             "where[serviceId]": self.service_id
         })
@@ -168,7 +168,7 @@ class Digisac(MessageClient):
                     id_contato = data[0].get("id", None)
 
         if id_contato is None:
-            resposta_cadastro = requests.post(endpoint, headers=self.headers, json={
+            resposta_cadastro = await cliente_http.obter_async(self.base_url).post(endpoint, headers=self.headers, json={
                 "serviceId": self.service_id,
                 "internalName": nome_contato,
                 "alternativeName": nome_contato,
@@ -180,18 +180,18 @@ class Digisac(MessageClient):
                 id_contato = resposta_cadastro_obj.get("id", None)
         return id_contato
 
-    def obter_ticket_ultima_mensagem(self, contact_id: str):
+    async def obter_ticket_ultima_mensagem(self, contact_id: str):
         endpoint = f"{self.base_url}/contacts/{contact_id}"
-        resposta = requests.get(endpoint, headers=self.headers)
+        resposta = await cliente_http.obter_async(self.base_url).get(endpoint, headers=self.headers)
 
         if resposta.status_code == 200:
             resposta_obj = json.loads(resposta.content)
             return resposta_obj.get("currentTicketId", None), resposta_obj.get("lastMessageId", None)
         return None
 
-    def obter_origem_mensagem(self, message_id: str):
+    async def obter_origem_mensagem(self, message_id: str):
         endpoint = f"{self.base_url}/messages/{message_id}"
-        resposta = requests.get(endpoint, headers=self.headers)
+        resposta = await cliente_http.obter_async(self.base_url).get(endpoint, headers=self.headers)
 
         if resposta.status_code == 200:
             resposta_obj = json.loads(resposta.content)
@@ -218,7 +218,7 @@ class Digisac(MessageClient):
             "query": json.dumps(query_param)
         }
 
-        response = requests.get(endpoint, headers=self.headers, params=params)
+        response = self.http.get(endpoint, headers=self.headers, params=params)
         return response.json()
 
     def listar_departamentos(self, pagina: int, nome: str | None, id: str | None = None):
@@ -241,7 +241,7 @@ class Digisac(MessageClient):
             "query": json.dumps(query_param)
         }
 
-        response = requests.get(endpoint, headers=self.headers, params=params)
+        response = self.http.get(endpoint, headers=self.headers, params=params)
         return response.json()
 
     def listar_servicos(self, pagina: int, nome: str | None, id: str | None = None):
@@ -265,5 +265,5 @@ class Digisac(MessageClient):
             "query": json.dumps(query_param)
         }
 
-        response = requests.get(endpoint, headers=self.headers, params=params)
+        response = self.http.get(endpoint, headers=self.headers, params=params)
         return response.json()
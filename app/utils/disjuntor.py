@@ -0,0 +1,86 @@
+import threading
+import time
+
+from app.utils.metricas import metricas
+
+
+class ErroCircuitoAberto(Exception):
+    def __init__(self, nome: str, tempo_restante: float):
+        super().__init__(f"Circuito [{nome}] aberto, nova tentativa em {tempo_restante:.0f}s")
+        self.nome = nome
+        self.tempo_restante = tempo_restante
+
+
+class Disjuntor:
+    def __init__(self, nome: str, limite_falhas: int, aberto_segundos: float, aberto_max_segundos: float):
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.aberto_segundos = aberto_segundos
+        self.aberto_max_segundos = aberto_max_segundos
+        self.lock = threading.Lock()
+        self.estado = "fechado"
+        self.falhas = 0
+        self.aberturas = 0
+        self.aberto_ate = 0.0
+        self.teste_em_andamento = False
+        self.teste_iniciado_em = 0.0
+
+    def verificar(self):
+        with self.lock:
+            if self.estado == "fechado":
+                return
+
+            agora = time.monotonic()
+            if self.estado == "aberto" and agora >= self.aberto_ate:
+                self.estado = "meio_aberto"
+                self.teste_em_andamento = False
+
+            # No estado meio aberto apenas uma requisição de teste passa até o banco responder
+            if self.estado == "meio_aberto" and (not self.teste_em_andamento or agora - self.teste_iniciado_em >= self.aberto_segundos):
+                self.teste_em_andamento = True
+                self.teste_iniciado_em = agora
+                return
+
+            tempo_restante = max(0.0, self.aberto_ate - agora)
+
+        metricas.incrementar(f"disjuntor_{self.nome}", "rejeitada")
+        raise ErroCircuitoAberto(self.nome, tempo_restante)
+
+    def registrar_sucesso(self):
+        with self.lock:
+            if self.estado == "fechado" and self.falhas == 0:
+                return
+            if self.estado != "fechado":
+                print(f"Circuito [{self.nome}] fechado novamente")
+            self.estado = "fechado"
+            self.falhas = 0
+            self.aberturas = 0
+            self.teste_em_andamento = False
+
+    def registrar_falha(self):
+        with self.lock:
+            self.falhas += 1
+            if self.estado == "meio_aberto" or self.falhas >= self.limite_falhas:
+                # A espera dobra a cada reabertura seguida, até o limite configurado
+                espera = min(self.aberto_max_segundos, self.aberto_segundos * (2 ** self.aberturas))
+                self.aberturas += 1
+                self.estado = "aberto"
+                self.aberto_ate = time.monotonic() + espera
+                self.teste_em_andamento = False
+                print(f"Circuito [{self.nome}] aberto por {espera:.1f}s após {self.falhas} falhas")
+                metricas.incrementar(f"disjuntor_{self.nome}", "aberto")
+
+    def tempo_restante(self):
+        with self.lock:
+            if self.estado != "aberto":
+                return 0.0
+            return max(0.0, self.aberto_ate - time.monotonic())
+
+    def resumo(self):
+        with self.lock:
+            return {
+                "estado": self.estado,
+                "falhas": self.falhas,
+                "aberturas": self.aberturas,
+                "tempo_restante": round(max(0.0, self.aberto_ate - time.monotonic()), 1) if self.estado == "aberto" else 0.0
+            }
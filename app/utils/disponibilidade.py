@@ -0,0 +1,87 @@
+import os
+from datetime import datetime, date, timedelta
+
+import pytz
+
+from app.utils.agenda_client import AgendaClient, Schedule
+
+
+AGENDA_JANELA_DIAS = int(os.getenv("AGENDA_JANELA_DIAS", "7"))
+AGENDA_DIAS_DISPONIVEIS = int(os.getenv("AGENDA_DIAS_DISPONIVEIS", "5"))
+AGENDA_ANTECEDENCIA_MINUTOS = int(os.getenv("AGENDA_ANTECEDENCIA_MINUTOS", "0"))
+
+
+class DiaAgenda:
+    def __init__(self, data: str, horarios: list[str], titulo: str | None = None):
+        self.data = data
+        self.horarios = horarios
+        self.titulo = titulo
+
+    @property
+    def fechado(self):
+        return not self.horarios
+
+    def to_dict(self):
+        return {
+            "data": self.data,
+            "dia_semana": date.fromisoformat(self.data).strftime("%A"),
+            "horarios": self.horarios
+        }
+
+
+def converter_hora(hora: str):
+    formato = "%H:%M:%S" if hora.count(":") == 2 else "%H:%M"
+    return datetime.strptime(hora, formato).time()
+
+
+def calcular_horarios_livres(schedule: Schedule, data: str, hora_inicio: str, intervalo: int,
+                             timezone: pytz.timezone, agora: datetime | None = None):
+    inicio_dia = timezone.localize(datetime.combine(date.fromisoformat(data), converter_hora(hora_inicio)))
+    limite = None
+    if agora is not None:
+        limite = agora + timedelta(minutes=AGENDA_ANTECEDENCIA_MINUTOS)
+
+    horarios = []
+    for indice, estado in enumerate(schedule.availability_view or ""):
+        # Na availability_view apenas "0" é livre (1 provisório, 2 ocupado, 3 ausente, 4 em outro local)
+        if estado != "0":
+            continue
+
+        inicio_bloco = inicio_dia + timedelta(minutes=indice * intervalo)
+        if limite is not None and inicio_bloco <= limite:
+            continue
+        horarios.append(inicio_bloco.strftime("%H:%M"))
+    return horarios
+
+
+def montar_dia(schedule: Schedule, data: str, agenda_client: AgendaClient, timezone: pytz.timezone, agora: datetime):
+    horarios = calcular_horarios_livres(schedule, data, agenda_client.hora_inicio_agenda,
+                                        agenda_client.duracao_evento, timezone, agora)
+    titulo = None
+    if not horarios and schedule.schedule_items:
+        titulo = schedule.schedule_items[0].get("subject") or ""
+    return DiaAgenda(data=data, horarios=horarios, titulo=titulo)
+
+
+async def calcular_disponibilidade(agenda_client: AgendaClient, endereco_agenda: str, data_inicio: date,
+                                   quantidade_dias: int, timezone: pytz.timezone):
+    data_fim = data_inicio + timedelta(days=quantidade_dias - 1)
+    agora = datetime.now(timezone)
+
+    horarios_periodo = await agenda_client.obter_horarios_periodo(
+        agendas=[endereco_agenda],
+        data_inicio=data_inicio.isoformat(),
+        data_fim=data_fim.isoformat()
+    )
+
+    dias = {}
+    for data, agendas in horarios_periodo.items():
+        # Dias cuja consulta falhou ficam de fora e seguem o fluxo sem pré-cálculo
+        if agendas and agendas[0] is not None:
+            dias[data] = montar_dia(agendas[0], data, agenda_client, timezone, agora)
+    return dias
+
+
+def resumir_disponibilidade(dias: dict[str, DiaAgenda], quantidade: int = AGENDA_DIAS_DISPONIVEIS):
+    disponiveis = [dia for dia in sorted(dias.values(), key=lambda dia: dia.data) if not dia.fechado]
+    return [dia.to_dict() for dia in disponiveis[:quantidade]]
@@ -1,16 +1,20 @@
+import asyncio
 import os
 import re
 import base64
 import mimetypes
-import threading
-
-import requests
 from io import BytesIO
 
+import httpx
+
 from app.schemas.evolutionapi_schema import EvolutionAPIRequest
+from app.utils.http_client import cliente_http
 from app.utils.message_client import MessageClient, DadosContato
 
 
+tarefas_presenca = set()
+
+
 class EvolutionAPI(MessageClient):
     def __init__(self, api_key: str, instance: str, defaultAssistantName: str):
         self.headers = {
@@ -19,9 +23,10 @@ class EvolutionAPI(MessageClient):
         }
         self.instance = instance
         self.base_url = os.getenv("EVOLUTIONAPI_SERVER")
+        self.http = cliente_http.obter(self.base_url)
         self.defaultAssistantName = defaultAssistantName
 
-    def enviar_mensagem(self, **kwargs):
+    async def enviar_mensagem(self, **kwargs):
         contact_id = kwargs.get("contact_id", "")
         mensagem = kwargs.get("mensagem")
         base64 = kwargs.get("base64", None)
@@ -58,7 +63,7 @@ class EvolutionAPI(MessageClient):
             endpoint = f"{self.base_url}/message/sendText/{self.instance}"
             request["textMessage"] = {"text": f"*{nome_assistente}:*\n{mensagem or ''}"}
 
-        resposta = requests.post(endpoint, headers=self.headers, json=request)
+        resposta = await cliente_http.obter_async(self.base_url).post(endpoint, headers=self.headers, json=request)
         return resposta
 
     def enviar_presenca(self, contact_id: str, audio: bool):
@@ -72,17 +77,24 @@ class EvolutionAPI(MessageClient):
             }
         }
 
-        funcao = lambda url, json, headers : requests.post(url, json=json, headers=headers)
-        threading.Thread(target=funcao, args=(endpoint, request, self.headers), daemon=True).start()
+        tarefa = asyncio.get_running_loop().create_task(self.postar_presenca(endpoint, request))
+        tarefas_presenca.add(tarefa)
+        tarefa.add_done_callback(tarefas_presenca.discard)
+
+    async def postar_presenca(self, endpoint: str, request: dict):
+        try:
+            await cliente_http.obter_async(self.base_url).post(endpoint, headers=self.headers, json=request, timeout=120)
+        except httpx.HTTPError as e:
+            print(f"Erro ao enviar presença: {e}")
 
-    def obter_dados_contato(self, request: EvolutionAPIRequest):
+    async def obter_dados_contato(self, request: EvolutionAPIRequest):
         return DadosContato(contact_name=request.data.pushName,
                             phone_number=re.match(r"(\d+)@", request.data.key.remoteJid).group(1))
 
-    def obter_id_contato(self, telefone: str, nome_contato: str):
+    async def obter_id_contato(self, telefone: str, nome_contato: str):
         return f"{telefone}@s.whatsapp.net"
 
-    def obter_arquivo(self, request: EvolutionAPIRequest):
+    async def obter_arquivo(self, request: EvolutionAPIRequest):
         audio_bytes = base64.b64decode(request.data.message.base64)
         file_stream = BytesIO(audio_bytes)
         mimetype = request.data.message.audioMessage.mimetype or request.data.message.imageMessage.mimetype
@@ -91,8 +103,8 @@ class EvolutionAPI(MessageClient):
 
         return {"filename": arquivo_nome, "mimetype": mimetype, "file_stream": file_stream}
 
-    def baixar_arquivo(self, url: str):
-        return super().baixar_arquivo(url)
+    async def baixar_arquivo(self, url: str):
+        return await super().baixar_arquivo(url)
 
     def criar_instancia(self, global_api_key: str, nome_instancia: str):
         endpoint = f"{self.base_url}/instance/create"
@@ -107,34 +119,34 @@ class EvolutionAPI(MessageClient):
             "Content-Type": "application/json"
         }
 
-        resposta = requests.post(endpoint, headers=headers, json=request)
+        resposta = self.http.post(endpoint, headers=headers, json=request)
         return resposta
 
     def retornar_instancia(self):
         endpoint = f"{self.base_url}/instance/fetchInstances"
-        resposta = requests.get(endpoint, headers=self.headers, params={
+        resposta = self.http.get(endpoint, headers=self.headers, params={
             "instanceName": self.instance
         })
         return resposta
 
     def conectar_instancia(self):
         endpoint = f"{self.base_url}/instance/connect/{self.instance}"
-        resposta = requests.get(endpoint, headers=self.headers)
+        resposta = self.http.get(endpoint, headers=self.headers)
         return resposta
 
     def reiniciar_instancia(self):
         endpoint = f"{self.base_url}/instance/restart/{self.instance}"
-        resposta = requests.put(endpoint, headers=self.headers)
+        resposta = self.http.put(endpoint, headers=self.headers)
         return resposta
 
     def desligar_instancia(self):
         endpoint = f"{self.base_url}/instance/logout/{self.instance}"
-        resposta = requests.delete(endpoint, headers=self.headers)
+        resposta = self.http.delete(endpoint, headers=self.headers)
         return resposta
 
     def checar_conexao(self):
         endpoint = f"{self.base_url}/instance/connectionState/{self.instance}"
-        resposta = requests.get(endpoint, headers=self.headers)
+        resposta = self.http.get(endpoint, headers=self.headers)
         return resposta
 
     def adicionar_webhook(self, webhook_url: str, habilitado: bool):
@@ -149,10 +161,10 @@ class EvolutionAPI(MessageClient):
             "enabled": habilitado
         }
 
-        resposta = requests.post(endpoint, headers=self.headers, json=request)
+        resposta = self.http.post(endpoint, headers=self.headers, json=request)
         return resposta
 
     def listar_webhooks(self):
         endpoint = f"{self.base_url}/webhook/find/{self.instance}"
-        resposta = requests.get(endpoint, headers=self.headers)
+        resposta = self.http.get(endpoint, headers=self.headers)
         return resposta
@@ -0,0 +1,115 @@
+import os
+import re
+from datetime import datetime
+from string import Formatter
+
+
+EXTRACAO_DDI_PADRAO = os.getenv("EXTRACAO_DDI_PADRAO", "55")
+
+# Nas regras da empresa o marcador {telefone} é trocado por este padrão (DDD válido, celular iniciado em 9 ou fixo
+# iniciado em 2 a 5), que não aceita dígitos colados
+TELEFONE_PADRAO = r"(?<!\d)(?P<telefone>(?:\+?\d{2}\s?)?\(?[1-9]{2}\)?\s?(?:9\d{4}|[2-5]\d{3})[\s.-]?\d{4})(?!\d)"
+MARCADOR_TELEFONE = "{telefone}"
+CAMPOS_MODELO_CONFIRMACAO = ("cliente", "data", "hora", "titulo", "local")
+
+
+def compilar_regra(regra: str):
+    padrao = re.compile(regra.replace(MARCADOR_TELEFONE, TELEFONE_PADRAO))
+    if "telefone" not in padrao.groupindex or "cliente" not in padrao.groupindex:
+        raise ValueError(f"A regra de extração ({regra}) precisa dos grupos nomeados 'cliente' e 'telefone'")
+    return padrao
+
+
+def validar_regra_extracao(regra: str):
+    try:
+        compilar_regra(regra)
+    except re.error as e:
+        raise ValueError(f"Regra de extração inválida ({regra}): {e}")
+
+
+def validar_modelo_confirmacao(modelo: str):
+    try:
+        campos = [campo for _, campo, _, _ in Formatter().parse(modelo) if campo is not None]
+    except ValueError as e:
+        raise ValueError(f"Modelo de confirmação inválido: {e}")
+
+    for campo in campos:
+        if campo not in CAMPOS_MODELO_CONFIRMACAO:
+            raise ValueError(f"Campo desconhecido no modelo de confirmação: {{{campo}}}. "
+                             f"Use apenas {', '.join(CAMPOS_MODELO_CONFIRMACAO)}")
+
+    try:
+        modelo.format(**{campo: "" for campo in CAMPOS_MODELO_CONFIRMACAO})
+    except (ValueError, IndexError, KeyError, AttributeError) as e:
+        raise ValueError(f"Modelo de confirmação inválido: {e}")
+
+
+def compilar_regras(regras: list[str]):
+    compiladas = []
+    for regra in regras:
+        try:
+            compiladas.append(compilar_regra(regra))
+        except (re.error, ValueError) as e:
+            print(f"Regra de extração ignorada ({regra}): {e}")
+    return compiladas
+
+
+def normalizar_telefone(telefone: str):
+    digitos = re.sub(r"\D", "", telefone)
+    if len(digitos) in (10, 11) and EXTRACAO_DDI_PADRAO:
+        digitos = f"{EXTRACAO_DDI_PADRAO}{digitos}"
+    return digitos if 10 <= len(digitos) <= 13 else None
+
+
+def aplicar_regras(texto: str, regras: list):
+    for padrao in regras:
+        encontrado = padrao.search(texto)
+        if encontrado is None:
+            continue
+
+        # O telefone precisa estar isolado, senão é parte de outro número (CPF, data, protocolo)
+        inicio, fim = encontrado.span("telefone")
+        if (inicio > 0 and texto[inicio - 1].isdigit()) or (fim < len(texto) and texto[fim].isdigit()):
+            continue
+
+        telefone = normalizar_telefone(encontrado.group("telefone"))
+        cliente = " ".join((encontrado.group("cliente") or "").split())
+        if telefone and cliente:
+            return cliente, telefone
+    return None
+
+
+def montar_mensagem(modelo: str, cliente: str, evento: dict):
+    inicio = datetime.fromisoformat(evento.get("start", {}).get("date_time", ""))
+    return modelo.format(
+        cliente=cliente,
+        data=inicio.strftime("%d/%m/%Y"),
+        hora=inicio.strftime("%H:%M"),
+        titulo=evento.get("subject") or "",
+        local=evento.get("location") or ""
+    )
+
+
+def extrair_por_regras(evento: dict, regras: list[str] | None, modelo_confirmacao: str | None):
+    # Só empresas com regras e modelo próprios usam a extração sem o assistente
+    if not regras or not modelo_confirmacao:
+        return None
+
+    padroes = compilar_regras(regras)
+    for campo in ("subject", "location"):
+        texto = evento.get(campo)
+        if not isinstance(texto, str) or not texto:
+            continue
+
+        dados = aplicar_regras(texto, padroes)
+        if dados is None:
+            continue
+
+        cliente, telefone = dados
+        try:
+            mensagem = montar_mensagem(modelo_confirmacao, cliente, evento)
+        except (ValueError, IndexError, KeyError, AttributeError) as e:
+            print(f"Erro ao montar a mensagem de confirmação: {e}")
+            return None
+        return cliente, telefone, mensagem
+    return None
@@ -3,9 +3,13 @@ from abc import ABC, abstractmethod
 
 class FinancialClient(ABC):
     @abstractmethod
-    def listar_cobrancas(self, **kwargs):
+    async def listar_cobrancas(self, **kwargs):
         pass
 
     @abstractmethod
-    def obter_cliente(self, **kwargs):
+    def iterar_cobrancas(self, **kwargs):
+        pass
+
+    @abstractmethod
+    async def obter_cliente(self, **kwargs):
         pass
\ No newline at end of file
@@ -4,35 +4,53 @@ import pytz
 
 from app.db.database import retornar_sessao
 from app.db.models import Assistente, Empresa, Colaborador
+from app.utils.registro_ferramentas import registro_ferramentas
 
 
-def obter_data_hora_atual(id_assistente: str):
-    timezone = "UTC"
+class ContextoFerramentas:
+    def __init__(self, id_empresa: int | None, fuso_horario: str, colaboradores: list[dict] | None):
+        self.id_empresa = id_empresa
+        self.fuso_horario = fuso_horario
+        self.colaboradores = colaboradores
 
-    with retornar_sessao() as db:
-        assistente_db = db.query(Assistente).filter_by(assistantId=id_assistente).first()
-        if assistente_db:
-            empresa = db.query(Empresa).filter_by(id=assistente_db.id_empresa).first()
-            if empresa:
-                timezone = empresa.fuso_horario
 
-    tz = pytz.timezone(timezone)
+def carregar_contexto_ferramentas(id_assistente: str):
+    with retornar_sessao() as db:
+        empresa = (
+            db.query(Empresa.id, Empresa.fuso_horario)
+            .join(Assistente, Assistente.id_empresa == Empresa.id)
+            .filter(Assistente.assistantId == id_assistente)
+            .first()
+        )
+        if empresa is None:
+            return ContextoFerramentas(None, "UTC", None)
+
+        colaboradores = (
+            db.query(Colaborador.nome, Colaborador.apelido, Colaborador.departamento)
+            .filter_by(id_empresa=empresa.id)
+            .all()
+        )
+
+    return ContextoFerramentas(
+        id_empresa=empresa.id,
+        fuso_horario=empresa.fuso_horario or "UTC",
+        colaboradores=[
+            {"nome": colab.nome, "apelido": colab.apelido, "departamento": colab.departamento}
+            for colab in colaboradores
+        ]
+    )
+
+
+@registro_ferramentas.registrar("get_current_datetime", "A function to extract current date and time")
+def obter_data_hora_atual(contexto: ContextoFerramentas):
+    tz = pytz.timezone(contexto.fuso_horario)
     now = datetime.now(tz).strftime("%Y-%m-%dT%H:%M:%S")
 
     return {"current_datetime": now}
 
 
-def obter_colaboradores(id_assistente: str):
-    with retornar_sessao() as db:
-        assistente_db = db.query(Assistente).filter_by(assistantId=id_assistente).first()
-        if assistente_db:
-            empresa = db.query(Empresa).filter_by(id=assistente_db.id_empresa).first()
-            if empresa:
-                colaboradores = db.query(Colaborador).filter_by(id_empresa=empresa.id).all()
-                data = [
-                    {"nome": colab.nome, "apelido": colab.apelido, "departamento": colab.departamento}
-                    for colab in colaboradores
-                ]
-
-                return {"employees": data}
-    return {"employees": ""}
+@registro_ferramentas.registrar("get_employees", "A function to return a list of employees")
+def obter_colaboradores(contexto: ContextoFerramentas):
+    if contexto.colaboradores is None:
+        return {"employees": ""}
+    return {"employees": contexto.colaboradores}
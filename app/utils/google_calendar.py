@@ -1,81 +1,207 @@
+import asyncio
 import os
+import threading
+import time
 from datetime import datetime, timedelta
+from urllib.parse import quote
 
 import pytz
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from sqlalchemy.orm import Session
 
+from app.db.database import retornar_sessao
 from app.db.models import GoogleCalendarClient
 from app.utils.agenda_client import AgendaClient, Schedule, EventoTituloAgenda, EventoTituloAgendaDataNova
+from app.utils.http_client import cliente_http
+
+
+GOOGLE_CALENDAR_URL = "https://www.googleapis.com/calendar/v3"
+GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+GOOGLE_EVENTOS_POR_PAGINA = 2500
+GOOGLE_RENOVACAO_ANTECEDENCIA_SEGUNDOS = int(os.getenv("GOOGLE_RENOVACAO_ANTECEDENCIA_SEGUNDOS", "300"))
+
+
+class CredencialGoogle:
+    def __init__(self, id_client_db: int, access_token: str, refresh_token: str):
+        self.id_client_db = id_client_db
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.expira_em = None
+        self.lock = asyncio.Lock()
+        self.renovacao = None
+
+    async def obter_token(self):
+        if self.expira_em is not None:
+            restante = self.expira_em - time.time()
+            if restante <= 0:
+                await self.renovar(self.access_token)
+            elif restante <= GOOGLE_RENOVACAO_ANTECEDENCIA_SEGUNDOS and self.renovacao is None:
+                # Perto de expirar o token é renovado em segundo plano e a chamada atual segue com o token vigente
+                self.renovacao = asyncio.create_task(self.renovar_em_segundo_plano(self.access_token))
+        return self.access_token
+
+    async def renovar_em_segundo_plano(self, token_atual: str):
+        try:
+            await self.renovar(token_atual)
+        except Exception as e:
+            print(f"Erro ao renovar o token do Google Calendar de ID {self.id_client_db}: {e}")
+        finally:
+            self.renovacao = None
 
+    async def renovar(self, token_atual: str):
+        async with self.lock:
+            # Outra chamada já renovou o token enquanto esta aguardava
+            if self.access_token != token_atual:
+                return
 
-class GoogleCalendar(AgendaClient):
-    def __init__(self, access_token: str, refresh_token: str, duracao_evento: int, hora_inicio_agenda: str, hora_final_agenda: str, timezone: str, client_db: GoogleCalendarClient, db: Session):
-        creds = Credentials.from_authorized_user_info(
-            info={
-                "access_token": access_token,
-                "refresh_token": refresh_token,
+            resposta = await cliente_http.obter_async(GOOGLE_TOKEN_URL).post(GOOGLE_TOKEN_URL, data={
                 "client_id": os.getenv("GOOGLE_CLIENT_ID"),
                 "client_secret": os.getenv("GOOGLE_CLIENT_SECRET"),
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "scopes": ["https://www.googleapis.com/auth/calendar"]
-            }
-        )
+                "refresh_token": self.refresh_token,
+                "grant_type": "refresh_token"
+            })
+            resposta.raise_for_status()
+            dados = resposta.json()
+
+            self.access_token = dados["access_token"]
+            self.refresh_token = dados.get("refresh_token") or self.refresh_token
+            self.expira_em = time.time() + int(dados.get("expires_in", 3600))
+            await asyncio.to_thread(self.salvar, int(dados.get("expires_in", 3600)))
+
+    def salvar(self, expires_in: int):
+        with retornar_sessao() as db:
+            db.query(GoogleCalendarClient).filter_by(id=self.id_client_db).update({
+                GoogleCalendarClient.refresh_token: self.refresh_token,
+                GoogleCalendarClient.access_token: self.access_token,
+                GoogleCalendarClient.expires_in: expires_in
+            })
+            db.commit()
 
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
 
-            if creds.token != access_token:
-                access_token = creds.token
-                refresh_token = creds.refresh_token if creds.refresh_token else refresh_token
+class RegistroCredenciaisGoogle:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.credenciais = {}
 
-                client_db.refresh_token = refresh_token,
-                client_db.access_token = access_token,
-                db.commit()
+    def obter(self, id_client_db: int, access_token: str, refresh_token: str):
+        with self.lock:
+            credencial = self.credenciais.get(id_client_db)
+            if credencial is None:
+                credencial = CredencialGoogle(id_client_db, access_token, refresh_token)
+                self.credenciais[id_client_db] = credencial
+        return credencial
 
-        self.service = build("calendar", "v3", credentials=creds)
+    def invalidar(self, id_client_db: int):
+        with self.lock:
+            self.credenciais.pop(id_client_db, None)
+
+
+credenciais_google = RegistroCredenciaisGoogle()
+
+
+class GoogleCalendar(AgendaClient):
+    def __init__(self, access_token: str, refresh_token: str, duracao_evento: int, hora_inicio_agenda: str, hora_final_agenda: str, timezone: str, id_client_db: int):
+        self.credencial = credenciais_google.obter(id_client_db, access_token, refresh_token)
         self.hora_inicio_agenda = hora_inicio_agenda
         self.hora_final_agenda = hora_final_agenda
         self.timezone = pytz.timezone(timezone)
         self.duracao_evento = duracao_evento
 
+    async def requisitar(self, metodo: str, caminho: str, **kwargs):
+        url = f"{GOOGLE_CALENDAR_URL}{caminho}"
+        cliente = cliente_http.obter_async(url)
+
+        token = await self.credencial.obter_token()
+        resposta = await cliente.request(metodo, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        if resposta.status_code == 401:
+            await self.credencial.renovar(token)
+            resposta = await cliente.request(metodo, url, headers={"Authorization": f"Bearer {self.credencial.access_token}"}, **kwargs)
+
+        resposta.raise_for_status()
+        return resposta.json() if resposta.content else None
+
+    @staticmethod
+    def caminho_eventos(agenda: str, id_evento: str | None = None):
+        caminho = f"/calendars/{quote(agenda, safe='')}/events"
+        if id_evento:
+            caminho = f"{caminho}/{quote(id_evento, safe='')}"
+        return caminho
+
+    async def listar_eventos(self, agenda: str, time_min: str, time_max: str):
+        resultado = {"id": agenda, "summary": "", "items": []}
+        parametros = {
+            "timeMin": time_min,
+            "timeMax": time_max,
+            "timeZone": str(self.timezone),
+            "singleEvents": "true",
+            "orderBy": "startTime",
+            "maxResults": GOOGLE_EVENTOS_POR_PAGINA
+        }
+
+        while True:
+            resposta = await self.requisitar("GET", GoogleCalendar.caminho_eventos(agenda), params=parametros)
+            resultado["summary"] = resposta.get("summary", resultado["summary"])
+            resultado["items"].extend(resposta.get("items", []))
+            if not resposta.get("nextPageToken"):
+                return resultado
+            parametros["pageToken"] = resposta["nextPageToken"]
+
+    async def obter_id_evento(self, dados: EventoTituloAgenda):
+        if dados.id_evento:
+            return dados.id_evento
+
+        # Sem o id registrado o evento é procurado pelo título a partir do horário de início
+        eventos = await self.requisitar("GET", GoogleCalendar.caminho_eventos(dados.endereco_agenda), params={
+            "q": dados.titulo,
+            "timeMin": dados.start_datetime
+        })
+        return eventos.get("items")[0]["id"] if eventos.get("items") else None
+
+    async def atualizar_evento(self, agenda: str, id_evento: str, alteracoes: dict):
+        return await self.requisitar("PATCH", GoogleCalendar.caminho_eventos(agenda, id_evento), json=alteracoes)
+
     async def obter_horarios(self, agendas: [str], data: str):
-        responses = []
+        horarios = await self.obter_horarios_periodo(agendas=agendas, data_inicio=data, data_fim=data)
+        return horarios.get(data)
 
-        for agenda in agendas:
-            response = self.service.events().list(
-                calendarId=agenda,
-                timeMin=f"{data}T{self.hora_inicio_agenda}Z",
-                timeMax=f"{data}T{self.hora_final_agenda}Z"
-            ).execute()
-            responses.append(response)
+    async def obter_horarios_periodo(self, agendas: [str], data_inicio: str, data_fim: str):
+        inicio = self.timezone.localize(datetime.strptime(f"{data_inicio} {self.hora_inicio_agenda}", "%Y-%m-%d %H:%M:%S"))
+        fim = self.timezone.localize(datetime.strptime(f"{data_fim} {self.hora_final_agenda}", "%Y-%m-%d %H:%M:%S"))
+
+        # As agendas são consultadas em paralelo sobre as conexões reaproveitadas do cliente HTTP
+        respostas = await asyncio.gather(
+            *[self.listar_eventos(agenda, inicio.isoformat(), fim.isoformat()) for agenda in agendas],
+            return_exceptions=True
+        )
 
         config = {
             "duracao_evento": self.duracao_evento,
             "hora_inicio_agenda": self.hora_inicio_agenda,
             "hora_final_agenda": self.hora_final_agenda,
-            "timezone": self.timezone,
-            "data_consulta": data
+            "timezone": self.timezone
         }
 
-        return [Schedule.from_dict(data=item, config=config) for item in responses]
+        horarios = {}
+        for agenda, resposta in zip(agendas, respostas):
+            if isinstance(resposta, Exception):
+                print(f"Erro ao listar eventos da agenda {agenda}: {resposta}")
+                continue
+            for dia, schedule in Schedule.from_dict_periodo(resposta, config, data_inicio, data_fim).items():
+                horarios.setdefault(dia, []).append(schedule)
+        return horarios
+
+    def montar_periodo(self, data: str):
+        inicio = self.timezone.localize(datetime.strptime(data, '%Y-%m-%dT%H:%M:%S'))
+        fim = inicio + timedelta(minutes=self.duracao_evento)
+        return (
+            {"dateTime": inicio.isoformat(), "timeZone": str(self.timezone)},
+            {"dateTime": fim.isoformat(), "timeZone": str(self.timezone)}
+        )
 
     async def cadastrar_evento(self, agenda: str, data: str, titulo: str, descricao: str, localizacao: str):
-        data = datetime.strptime(data, '%Y-%m-%dT%H:%M:%S').astimezone(self.timezone)
-        data_final = data + timedelta(minutes=self.duracao_evento)
-
+        inicio, fim = self.montar_periodo(data)
         evento = {
             "summary": titulo,
-            "start": {
-                "dateTime": data.strftime("%Y-%m-%dT%H:%M:%S%z"),
-                "timeZone": str(self.timezone)
-            },
-            "end": {
-                "dateTime": data_final.strftime("%Y-%m-%dT%H:%M:%S%z"),
-                "timeZone": str(self.timezone)
-            }
+            "start": inicio,
+            "end": fim
         }
 
         if descricao:
@@ -84,26 +210,15 @@ class GoogleCalendar(AgendaClient):
         if localizacao:
             evento["location"] = localizacao
 
-        evento_cadastrado = self.service.events().insert(calendarId=agenda, body=evento).execute()
-        return evento_cadastrado
+        evento_cadastrado = await self.requisitar("POST", GoogleCalendar.caminho_eventos(agenda), json=evento)
+        return evento_cadastrado.get("id")
 
     async def confirmar_evento(self, dados: EventoTituloAgenda):
         try:
-            eventos = self.service.events().list(
-                calendarId=dados.endereco_agenda,
-                q=dados.titulo,
-                timeMin=dados.start_datetime
-            ).execute()
-
-            evento_obj = eventos.get("items")[0] if eventos.get("items") else None
-
-            if evento_obj:
-                evento_obj["summary"] = f"CONFIRMADO - {evento_obj["summary"]}"
-                self.service.events().update(
-                    calendarId=dados.endereco_agenda,
-                    eventId=evento_obj["id"],
-                    body=evento_obj
-                ).execute()
+            id_evento = await self.obter_id_evento(dados)
+
+            if id_evento:
+                await self.atualizar_evento(dados.endereco_agenda, id_evento, {"summary": f"CONFIRMADO - {dados.titulo}"})
                 return True
         except Exception as e:
             print(e)
@@ -111,33 +226,15 @@ class GoogleCalendar(AgendaClient):
 
     async def reagendar_evento(self, dados: EventoTituloAgendaDataNova):
         try:
-            eventos = self.service.events().list(
-                calendarId=dados.endereco_agenda,
-                q=dados.titulo,
-                timeMin=dados.start_datetime
-            ).execute()
-
-            evento_obj = eventos.get("items")[0] if eventos.get("items") else None
-
-            if evento_obj:
-                data = datetime.strptime(dados.data_nova, '%Y-%m-%dT%H:%M:%S').astimezone(self.timezone)
-                data_final = data + timedelta(minutes=self.duracao_evento)
-
-                evento_obj["summary"] = f"REAGENDADO - {evento_obj["summary"]}"
-                evento_obj["start"] = {
-                    "dateTime": data.strftime("%Y-%m-%dT%H:%M:%S%z"),
-                    "timeZone": str(self.timezone)
-                }
-                evento_obj["end"] = {
-                    "dateTime": data_final.strftime("%Y-%m-%dT%H:%M:%S%z"),
-                    "timeZone": str(self.timezone)
-                }
-
-                self.service.events().update(
-                    calendarId=dados.endereco_agenda,
-                    eventId=evento_obj["id"],
-                    body=evento_obj
-                ).execute()
+            id_evento = await self.obter_id_evento(dados)
+
+            if id_evento:
+                inicio, fim = self.montar_periodo(dados.data_nova)
+                await self.atualizar_evento(dados.endereco_agenda, id_evento, {
+                    "summary": f"REAGENDADO - {dados.titulo}",
+                    "start": inicio,
+                    "end": fim
+                })
                 return True
         except Exception as e:
             print(e)
@@ -145,27 +242,13 @@ class GoogleCalendar(AgendaClient):
 
     async def cancelar_evento(self, dados: EventoTituloAgenda, tipo_cancelamento: str):
         try:
-            eventos = self.service.events().list(
-                calendarId=dados.endereco_agenda,
-                q=dados.titulo,
-                timeMin=dados.start_datetime
-            ).execute()
-
-            evento_obj = eventos.get("items")[0] if eventos.get("items") else None
+            id_evento = await self.obter_id_evento(dados)
 
-            if evento_obj:
+            if id_evento:
                 if tipo_cancelamento == "excluir":
-                    self.service.events().delete(
-                        calendarId=dados.endereco_agenda,
-                        eventId=evento_obj["id"]
-                    ).execute()
+                    await self.requisitar("DELETE", GoogleCalendar.caminho_eventos(dados.endereco_agenda, id_evento))
                 elif tipo_cancelamento == "manter":
-                    evento_obj["summary"] = f"CANCELADO - {evento_obj["summary"]}"
-                    self.service.events().update(
-                        calendarId=dados.endereco_agenda,
-                        eventId=evento_obj["id"],
-                        body=evento_obj
-                    ).execute()
+                    await self.atualizar_evento(dados.endereco_agenda, id_evento, {"summary": f"CANCELADO - {dados.titulo}"})
                 return True
         except Exception as e:
             print(e)
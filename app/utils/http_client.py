@@ -0,0 +1,96 @@
+import asyncio
+import os
+import threading
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    import h2
+    HTTP2_DISPONIVEL = True
+except ImportError:
+    HTTP2_DISPONIVEL = False
+
+
+HTTP_MAX_CONEXOES = int(os.getenv("HTTP_MAX_CONEXOES", "100"))
+HTTP_MAX_CONEXOES_KEEPALIVE = int(os.getenv("HTTP_MAX_CONEXOES_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_SEGUNDOS = float(os.getenv("HTTP_KEEPALIVE_SEGUNDOS", "30"))
+HTTP_TIMEOUT_SEGUNDOS = float(os.getenv("HTTP_TIMEOUT_SEGUNDOS", "60"))
+HTTP_TIMEOUT_CONEXAO_SEGUNDOS = float(os.getenv("HTTP_TIMEOUT_CONEXAO_SEGUNDOS", "10"))
+HTTP2_ATIVO = os.getenv("HTTP2_ATIVO", "true").lower() == "true" and HTTP2_DISPONIVEL
+
+
+class ClienteHTTP:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clientes = {}
+        self.clientes_async = weakref.WeakKeyDictionary()
+
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.redefinir)
+
+    @staticmethod
+    def origem(url: str):
+        partes = urlsplit(url)
+        return f"{partes.scheme}://{partes.netloc}"
+
+    @staticmethod
+    def configuracao():
+        return {
+            "limits": httpx.Limits(
+                max_connections=HTTP_MAX_CONEXOES,
+                max_keepalive_connections=HTTP_MAX_CONEXOES_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_SEGUNDOS
+            ),
+            "timeout": httpx.Timeout(HTTP_TIMEOUT_SEGUNDOS, connect=HTTP_TIMEOUT_CONEXAO_SEGUNDOS),
+            "http2": HTTP2_ATIVO,
+            "follow_redirects": True
+        }
+
+    def obter(self, url: str):
+        origem = ClienteHTTP.origem(url)
+
+        with self.lock:
+            cliente = self.clientes.get(origem)
+            if cliente is None or cliente.is_closed:
+                cliente = httpx.Client(base_url=origem, **ClienteHTTP.configuracao())
+                self.clientes[origem] = cliente
+        return cliente
+
+    def obter_async(self, url: str):
+        origem = ClienteHTTP.origem(url)
+        loop = asyncio.get_running_loop()
+
+        with self.lock:
+            clientes = self.clientes_async.setdefault(loop, {})
+            cliente = clientes.get(origem)
+            if cliente is None or cliente.is_closed:
+                cliente = httpx.AsyncClient(base_url=origem, **ClienteHTTP.configuracao())
+                clientes[origem] = cliente
+        return cliente
+
+    def redefinir(self):
+        self.lock = threading.Lock()
+        self.clientes = {}
+        self.clientes_async = weakref.WeakKeyDictionary()
+
+    def fechar(self):
+        with self.lock:
+            clientes = list(self.clientes.values())
+            self.clientes = {}
+
+        for cliente in clientes:
+            cliente.close()
+
+    async def fechar_async(self):
+        loop = asyncio.get_running_loop()
+
+        with self.lock:
+            clientes = list(self.clientes_async.pop(loop, {}).values())
+
+        for cliente in clientes:
+            await cliente.aclose()
+
+
+cliente_http = ClienteHTTP()
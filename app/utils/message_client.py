@@ -1,35 +1,37 @@
 import base64
 from abc import ABC, abstractmethod
 
-import requests
+import httpx
+
+from app.utils.http_client import cliente_http
 
 
 class MessageClient(ABC):
     @abstractmethod
-    def enviar_mensagem(self, **kwargs):
+    async def enviar_mensagem(self, **kwargs):
         pass
 
     @abstractmethod
-    def obter_dados_contato(self, **kwargs):
+    async def obter_dados_contato(self, **kwargs):
         pass
 
     @abstractmethod
-    def obter_id_contato(self, telefone: str, nome_contato: str):
+    async def obter_id_contato(self, telefone: str, nome_contato: str):
         pass
 
     @abstractmethod
-    def obter_arquivo(self, **kwargs):
+    async def obter_arquivo(self, **kwargs):
         pass
 
     @abstractmethod
-    def baixar_arquivo(self, url: str):
+    async def baixar_arquivo(self, url: str):
         try:
-            resposta = requests.get(url)
+            resposta = await cliente_http.obter_async(url).get(url)
             resposta.raise_for_status()
 
             conteudo = base64.b64encode(resposta.content).decode('utf-8')
             return conteudo
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"Erro ao baixar o arquivo: {e}")
             return None
 
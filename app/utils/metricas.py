@@ -0,0 +1,47 @@
+import threading
+from collections import defaultdict
+
+
+class Metricas:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.contadores = defaultdict(int)
+        self.tempos = {}
+
+    def incrementar(self, nome: str, rotulo: str | None = None, valor: int = 1):
+        with self.lock:
+            self.contadores[(nome, rotulo or "")] += valor
+
+    def registrar_tempo(self, nome: str, rotulo: str | None, segundos: float):
+        chave = (nome, rotulo or "")
+
+        with self.lock:
+            tempo = self.tempos.get(chave)
+            if tempo is None:
+                tempo = {"quantidade": 0, "total": 0.0, "maximo": 0.0, "ultimo": 0.0}
+                self.tempos[chave] = tempo
+
+            tempo["quantidade"] += 1
+            tempo["total"] += segundos
+            tempo["maximo"] = max(tempo["maximo"], segundos)
+            tempo["ultimo"] = segundos
+
+    def resumo(self):
+        with self.lock:
+            contadores = defaultdict(dict)
+            for (nome, rotulo), valor in self.contadores.items():
+                contadores[nome][rotulo] = valor
+
+            tempos = defaultdict(dict)
+            for (nome, rotulo), tempo in self.tempos.items():
+                tempos[nome][rotulo] = {
+                    "quantidade": tempo["quantidade"],
+                    "media": tempo["total"] / tempo["quantidade"],
+                    "maximo": tempo["maximo"],
+                    "ultimo": tempo["ultimo"]
+                }
+
+        return {"contadores": dict(contadores), "tempos": dict(tempos)}
+
+
+metricas = Metricas()
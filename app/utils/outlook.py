@@ -1,10 +1,16 @@
+import asyncio
 import os
-from datetime import datetime, timedelta, timezone
+import threading
+from datetime import datetime, date, timedelta, timezone
 
+import httpx
 import msal
-from azure.core.credentials import TokenCredential, AccessToken
-from azure.identity import ClientSecretCredential
+import pytz
+from azure.core.credentials import AccessToken
+from kiota_authentication_azure.azure_identity_authentication_provider import AzureIdentityAuthenticationProvider
 from msgraph import GraphServiceClient
+from msgraph.graph_request_adapter import GraphRequestAdapter, options as opcoes_graph
+from msgraph_core import GraphClientFactory
 from msgraph.generated.models.body_type import BodyType
 from msgraph.generated.models.free_busy_status import FreeBusyStatus
 from msgraph.generated.models.item_body import ItemBody
@@ -14,63 +20,136 @@ from msgraph.generated.models.event import Event
 from msgraph.generated.models.date_time_time_zone import DateTimeTimeZone
 from kiota_abstractions.base_request_configuration import RequestConfiguration
 from msgraph.generated.users.item.events.events_request_builder import EventsRequestBuilder
-from sqlalchemy.orm import Session
+from msgraph.generated.users.item.calendar_view.calendar_view_request_builder import CalendarViewRequestBuilder
 
+from app.db.database import retornar_sessao
 from app.db.models import OutlookClient
 from app.utils.agenda_client import AgendaClient, Schedule, EventoTituloAgenda, EventoTituloAgendaDataNova
+from app.utils.http_client import ClienteHTTP
 
 
-class AccessTokenCredential(TokenCredential):
-    def __init__(self, access_token: str, refresh_token: str, expires_in: int, expires_at: float, client_db: OutlookClient, db: Session):
-        self.client_id = os.getenv("MICROSOFT_CLIENT_ID")
-        self.client_secret = os.getenv("MICROSOFT_CLIENT_SECRET")
+OUTLOOK_RENOVACAO_ANTECEDENCIA_SEGUNDOS = int(os.getenv("OUTLOOK_RENOVACAO_ANTECEDENCIA_SEGUNDOS", "300"))
+GRAPH_SCOPES = ["https://graph.microsoft.com/.default"]
+OUTLOOK_EVENTOS_POR_PAGINA = 500
+
+
+class AccessTokenCredential:
+    def __init__(self, access_token: str, refresh_token: str, expires_in: int, expires_at: float, id_client_db: int, app: msal.ConfidentialClientApplication):
         self.access_token = access_token
         self.refresh_token = refresh_token
-        self.expires_at = expires_at
+        self.expires_at = expires_at or 0
         self.expires_in = expires_in
-        self.client_db = client_db
-        self.db_session = db
-
-        self.app = msal.ConfidentialClientApplication(
-            client_id=self.client_id,
-            client_credential=self.client_secret,
-            authority=f"https://login.microsoftonline.com/common"
-        )
-
-    def is_token_expired(self):
-        return datetime.now(timezone.utc).timestamp() >= self.client_db.expires_at - 60
-
-    def get_token(self, *scopes, **kwargs):
-        if not self.is_token_expired():
-            return AccessToken(self.access_token, self.expires_in)
-
-        result = self.app.acquire_token_by_refresh_token(
-            refresh_token=self.refresh_token,
-            scopes=["https://graph.microsoft.com/.default"]
-        )
-
-        if "access_token" in result:
-            access_token = result.get("access_token")
-            refresh_token = result.get("refresh_token", self.refresh_token)
-            expires_in = result.get("expires_in")
-
-            self.client_db.access_token = access_token
-            self.client_db.refresh_token = refresh_token
-            self.client_db.expires_in = expires_in
-            self.client_db.expires_at = datetime.now(timezone.utc).timestamp() + expires_in
-            self.db_session.commit()
+        self.id_client_db = id_client_db
+        self.app = app
+        self.lock = asyncio.Lock()
+        self.renovacao = None
+
+    def tempo_restante(self):
+        return self.expires_at - datetime.now(timezone.utc).timestamp()
+
+    async def get_token(self, *scopes, **kwargs):
+        restante = self.tempo_restante()
+        if restante <= 60:
+            await self.renovar(self.access_token)
+        elif restante <= OUTLOOK_RENOVACAO_ANTECEDENCIA_SEGUNDOS and self.renovacao is None:
+            # Perto de expirar o token é renovado em segundo plano e a chamada atual segue com o token vigente
+            self.renovacao = asyncio.create_task(self.renovar_em_segundo_plano(self.access_token))
+        return AccessToken(self.access_token, int(self.expires_at))
+
+    async def close(self):
+        pass
+
+    async def renovar_em_segundo_plano(self, token_atual: str):
+        try:
+            await self.renovar(token_atual)
+        except Exception as e:
+            print(f"Erro ao renovar o token do Outlook de ID {self.id_client_db}: {e}")
+        finally:
+            self.renovacao = None
+
+    async def renovar(self, token_atual: str):
+        async with self.lock:
+            # Outra chamada já renovou o token enquanto esta aguardava
+            if self.access_token != token_atual:
+                return
+
+            result = await asyncio.to_thread(
+                self.app.acquire_token_by_refresh_token,
+                refresh_token=self.refresh_token,
+                scopes=GRAPH_SCOPES
+            )
 
-            return AccessToken(self.access_token, result["expires_in"])
-        else:
-            raise Exception(f"Erro ao renovar token: {result.get('error_description', 'Erro desconhecido')}")
+            if "access_token" not in result:
+                raise Exception(f"Erro ao renovar token: {result.get('error_description', 'Erro desconhecido')}")
+
+            self.access_token = result.get("access_token")
+            self.refresh_token = result.get("refresh_token", self.refresh_token)
+            self.expires_in = result.get("expires_in")
+            self.expires_at = datetime.now(timezone.utc).timestamp() + self.expires_in
+            await asyncio.to_thread(self.salvar)
+
+    def salvar(self):
+        with retornar_sessao() as db:
+            db.query(OutlookClient).filter_by(id=self.id_client_db).update({
+                OutlookClient.access_token: self.access_token,
+                OutlookClient.refresh_token: self.refresh_token,
+                OutlookClient.expires_in: self.expires_in,
+                OutlookClient.expires_at: self.expires_at
+            })
+            db.commit()
+
+
+class RegistroClientesGraph:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clientes = {}
+        self.app = None
+        self.http_client = None
+
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.redefinir)
+
+    def obter(self, access_token: str, refresh_token: str, expires_in: int, expires_at: float, id_client_db: int):
+        with self.lock:
+            graph_client = self.clientes.get(id_client_db)
+            if graph_client is None:
+                if self.app is None:
+                    self.app = msal.ConfidentialClientApplication(
+                        client_id=os.getenv("MICROSOFT_CLIENT_ID"),
+                        client_credential=os.getenv("MICROSOFT_CLIENT_SECRET"),
+                        authority="https://login.microsoftonline.com/common"
+                    )
+                if self.http_client is None or self.http_client.is_closed:
+                    # Todos os tenants compartilham o mesmo pool de conexões; a autenticação fica em cada adapter
+                    configuracao = ClienteHTTP.configuracao()
+                    configuracao["follow_redirects"] = False
+                    self.http_client = GraphClientFactory.create_with_default_middleware(
+                        client=httpx.AsyncClient(**configuracao),
+                        options=opcoes_graph
+                    )
+
+                credential = AccessTokenCredential(access_token, refresh_token, expires_in, expires_at, id_client_db, self.app)
+                auth_provider = AzureIdentityAuthenticationProvider(credential, scopes=GRAPH_SCOPES)
+                graph_client = GraphServiceClient(request_adapter=GraphRequestAdapter(auth_provider, client=self.http_client))
+                self.clientes[id_client_db] = graph_client
+        return graph_client
+
+    def invalidar(self, id_client_db: int):
+        with self.lock:
+            self.clientes.pop(id_client_db, None)
+
+    def redefinir(self):
+        self.lock = threading.Lock()
+        self.clientes = {}
+        self.http_client = None
+
+
+clientes_graph = RegistroClientesGraph()
 
 
 class Outlook(AgendaClient):
-    def __init__(self, access_token: str, refresh_token: str, expires_in: int, expires_at: float, usuarioPadrao: str, duracaoEvento: int, horaInicioAgenda: str, horaFinalAgenda: str, timeZone: str, client_db: OutlookClient, db: Session):
-        credential = AccessTokenCredential(access_token, refresh_token, expires_in, expires_at, client_db, db)
-        scopes = ["https://graph.microsoft.com/.default"]
-
-        self.graph_client = GraphServiceClient(credentials=credential, scopes=scopes)
+    def __init__(self, access_token: str, refresh_token: str, expires_in: int, expires_at: float, usuarioPadrao: str, duracaoEvento: int, horaInicioAgenda: str, horaFinalAgenda: str, timeZone: str, id_client_db: int):
+        self.graph_client = clientes_graph.obter(access_token, refresh_token, expires_in, expires_at, id_client_db)
         self.duracao_evento = duracaoEvento
         self.usuario_padrao = usuarioPadrao
         self.hora_inicio_agenda = horaInicioAgenda
@@ -94,7 +173,68 @@ class Outlook(AgendaClient):
             return [Schedule.from_object(item) for item in response.value]
         except Exception as e:
             print(e)
-    
+
+    def obter_fuso(self):
+        try:
+            return pytz.timezone(self.timezone)
+        except pytz.UnknownTimeZoneError:
+            # Fusos no formato do Windows: os horários já chegam no fuso da agenda e são comparados como horário local
+            return pytz.utc
+
+    async def listar_eventos(self, agenda: str, inicio: str, fim: str):
+        query_params = CalendarViewRequestBuilder.CalendarViewRequestBuilderGetQueryParameters(
+            start_date_time=inicio,
+            end_date_time=fim,
+            select=["id", "subject", "start", "end", "location", "showAs", "isCancelled", "sensitivity"],
+            top=OUTLOOK_EVENTOS_POR_PAGINA
+        )
+
+        request_config = RequestConfiguration(query_parameters=query_params)
+        request_config.headers.try_add("Prefer", f'outlook.timezone="{self.timezone}"')
+
+        # As próximas páginas já trazem os parâmetros na URL, só o fuso precisa ser repetido
+        proxima_config = RequestConfiguration()
+        proxima_config.headers.try_add("Prefer", f'outlook.timezone="{self.timezone}"')
+
+        calendar_view = self.graph_client.users.by_user_id(agenda).calendar_view
+        response = await calendar_view.get(request_configuration=request_config)
+
+        eventos = []
+        while response is not None:
+            eventos.extend(response.value or [])
+            if not response.odata_next_link:
+                break
+            response = await calendar_view.with_url(response.odata_next_link).get(request_configuration=proxima_config)
+        return eventos
+
+    async def obter_horarios_periodo(self, agendas: [str], data_inicio: str, data_fim: str):
+        # O calendarView recebe o período em UTC; a margem de um dia cobre qualquer fuso e os eventos
+        # de cada dia são recortados pela janela da agenda ao montar os Schedules
+        inicio = (date.fromisoformat(data_inicio) - timedelta(days=1)).isoformat()
+        fim = (date.fromisoformat(data_fim) + timedelta(days=2)).isoformat()
+
+        respostas = await asyncio.gather(
+            *[self.listar_eventos(agenda, f"{inicio}T00:00:00", f"{fim}T00:00:00") for agenda in agendas],
+            return_exceptions=True
+        )
+
+        config = {
+            "duracao_evento": self.duracao_evento,
+            "hora_inicio_agenda": self.hora_inicio_agenda,
+            "hora_final_agenda": self.hora_final_agenda,
+            "timezone": self.obter_fuso()
+        }
+
+        horarios = {}
+        for agenda, resposta in zip(agendas, respostas):
+            if isinstance(resposta, Exception):
+                print(f"Erro ao listar eventos da agenda {agenda}: {resposta}")
+                continue
+            eventos = Schedule.converter_eventos_outlook(resposta)
+            for dia, schedule in Schedule.from_eventos_periodo(agenda, eventos, config, data_inicio, data_fim).items():
+                horarios.setdefault(dia, []).append(schedule)
+        return horarios
+
     async def cadastrar_evento(self, agenda: str, data: str, titulo: str, descricao: str | None = None, localizacao: str | None = None):
         try:
             data_final = datetime.strptime(data, "%Y-%m-%dT%H:%M:%S") + timedelta(minutes=self.duracao_evento)
@@ -115,28 +255,35 @@ class Outlook(AgendaClient):
                     display_name=localizacao
                 )
 
-            await self.graph_client.users.by_user_id(agenda).events.post(body=request_body)
-            return True
+            evento = await self.graph_client.users.by_user_id(agenda).events.post(body=request_body)
+            return evento.id
         except Exception as e:
             print(e)
-            return False
+            return None
 
-    async def confirmar_evento(self, dados: EventoTituloAgenda):
-        try:
-            query_params = EventsRequestBuilder.EventsRequestBuilderGetQueryParameters(
-                select=["start", "end", "subject", "id", "location"],
-                filter=f"start/datetime eq '{dados.start_datetime}' and subject eq '{dados.titulo}'"
-            )
+    async def obter_id_evento(self, dados: EventoTituloAgenda):
+        if dados.id_evento:
+            return dados.id_evento
 
-            request_config = RequestConfiguration(
-                query_parameters=query_params
-            )
-            request_config.headers.try_add("Prefer", f'outlook.timezone="{self.timezone}"')
+        # Sem o id registrado o evento é procurado pelo início e pelo título
+        query_params = EventsRequestBuilder.EventsRequestBuilderGetQueryParameters(
+            select=["id"],
+            filter=f"start/datetime eq '{dados.start_datetime}' and subject eq '{dados.titulo}'"
+        )
 
-            response = await self.graph_client.users.by_user_id(dados.endereco_agenda).events.get(request_configuration=request_config)
+        request_config = RequestConfiguration(
+            query_parameters=query_params
+        )
+        request_config.headers.try_add("Prefer", f'outlook.timezone="{self.timezone}"')
+
+        response = await self.graph_client.users.by_user_id(dados.endereco_agenda).events.get(request_configuration=request_config)
+        return response.value[0].id if response.value else None
+
+    async def confirmar_evento(self, dados: EventoTituloAgenda):
+        try:
+            id = await self.obter_id_evento(dados)
 
-            if len(response.value) > 0:
-                id = response.value[0].id
+            if id:
                 request_body = Event()
                 request_body.subject = f"CONFIRMADO - {dados.titulo}"
 
@@ -148,22 +295,11 @@ class Outlook(AgendaClient):
 
     async def reagendar_evento(self, dados: EventoTituloAgendaDataNova):
         try:
-            query_params = EventsRequestBuilder.EventsRequestBuilderGetQueryParameters(
-                select=["start", "end", "subject", "id", "location"],
-                filter=f"start/datetime eq '{dados.start_datetime}' and subject eq '{dados.titulo}'"
-            )
-
-            request_config = RequestConfiguration(
-                query_parameters=query_params
-            )
-            request_config.headers.try_add("Prefer", f'outlook.timezone="{self.timezone}"')
-
-            response = await self.graph_client.users.by_user_id(dados.endereco_agenda).events.get(request_configuration=request_config)
+            id = await self.obter_id_evento(dados)
 
-            if len(response.value) > 0:
+            if id:
                 data_final = datetime.strptime(dados.data_nova, "%Y-%m-%dT%H:%M:%S") + timedelta(minutes=self.duracao_evento)
 
-                id = response.value[0].id
                 request_body = Event()
                 request_body.subject = f"REAGENDADO - {dados.titulo}"
                 request_body.start = DateTimeTimeZone(date_time=f"{dados.data_nova}", time_zone=self.timezone)
@@ -177,21 +313,9 @@ class Outlook(AgendaClient):
 
     async def cancelar_evento(self, dados: EventoTituloAgenda, tipo_cancelamento: str):
         try:
-            query_params = EventsRequestBuilder.EventsRequestBuilderGetQueryParameters(
-                select=["start", "end", "subject", "id", "location"],
-                filter=f"start/datetime eq '{dados.start_datetime}' and subject eq '{dados.titulo}'"
-            )
-
-            request_config = RequestConfiguration(
-                query_parameters=query_params
-            )
-            request_config.headers.try_add("Prefer", f'outlook.timezone="{self.timezone}"')
-
-            response = await self.graph_client.users.by_user_id(dados.endereco_agenda).events.get(request_configuration=request_config)
-
-            if len(response.value) > 0:
-                id = response.value[0].id
+            id = await self.obter_id_evento(dados)
 
+            if id:
                 if tipo_cancelamento == "excluir":
                     await self.graph_client.users.by_user_id(dados.endereco_agenda).events.by_event_id(id).delete()
                 elif tipo_cancelamento == "manter":
@@ -1,8 +1,7 @@
 import json
 
-import requests
-
 from app.utils.crm_client import CRMClient
+from app.utils.http_client import cliente_http
 
 
 class RDStationCRM(CRMClient):
@@ -17,7 +16,7 @@ class RDStationCRM(CRMClient):
         self.deal_stage_inicial_id = deal_stage_id
         self.deal_source_id = deal_source_id
 
-    def criar_lead(self, nome_negociacao: str, nome_contato: str, telefone_contato: str):
+    async def criar_lead(self, nome_negociacao: str, nome_contato: str, telefone_contato: str):
         endpoint = f"{self.base_url}/deals?token={self.token}"
 
         request = {
@@ -43,11 +42,11 @@ class RDStationCRM(CRMClient):
             ]
         }
 
-        resposta = requests.post(endpoint, headers=self.headers, json=request)
+        resposta = await cliente_http.obter_async(self.base_url).post(endpoint, headers=self.headers, json=request)
         resposta = json.loads(resposta.content)
         return resposta.get("id", None)
 
-    def mudar_etapa(self, deal_id: str, deal_stage_id: str, user_id: str | None):
+    async def mudar_etapa(self, deal_id: str, deal_stage_id: str, user_id: str | None):
         endpoint = f"{self.base_url}/deals/{deal_id}?token={self.token}"
 
         request = {
@@ -59,7 +58,7 @@ class RDStationCRM(CRMClient):
                 "user_id": user_id
             }
 
-        resposta = requests.put(endpoint, headers=self.headers, json=request)
+        resposta = await cliente_http.obter_async(self.base_url).put(endpoint, headers=self.headers, json=request)
 
         if resposta.status_code == 200:
             return True
@@ -0,0 +1,90 @@
+import asyncio
+import inspect
+import os
+import time
+
+from openai.types.beta import FunctionToolParam
+
+from app.utils.metricas import metricas
+
+
+FERRAMENTA_TIMEOUT_SEGUNDOS = float(os.getenv("FERRAMENTA_TIMEOUT_SEGUNDOS", "10"))
+
+PARAMETROS_VAZIOS = {
+    "type": "object",
+    "properties": {},
+    "additionalProperties": False,
+    "required": []
+}
+
+
+class Ferramenta:
+    def __init__(self, nome: str, descricao: str, parametros: dict, funcao, timeout_segundos: float):
+        self.nome = nome
+        self.descricao = descricao
+        self.parametros = parametros
+        self.funcao = funcao
+        self.timeout_segundos = timeout_segundos
+        self.assincrona = inspect.iscoroutinefunction(funcao)
+
+    def to_param(self):
+        return FunctionToolParam(
+            function={
+                "name": self.nome,
+                "description": self.descricao,
+                "strict": True,
+                "parameters": self.parametros
+            },
+            type="function"
+        )
+
+    async def executar(self, contexto, argumentos: dict):
+        if self.assincrona:
+            chamada = self.funcao(contexto, **argumentos)
+        else:
+            # Funções síncronas rodam no pool de threads para não bloquear o loop
+            chamada = asyncio.to_thread(self.funcao, contexto, **argumentos)
+        return await asyncio.wait_for(chamada, timeout=self.timeout_segundos)
+
+
+class RegistroFerramentas:
+    def __init__(self):
+        self.ferramentas = {}
+
+    def registrar(self, nome: str, descricao: str, parametros: dict | None = None, timeout_segundos: float | None = None):
+        def decorador(funcao):
+            self.ferramentas[nome] = Ferramenta(
+                nome=nome,
+                descricao=descricao,
+                parametros=parametros or PARAMETROS_VAZIOS,
+                funcao=funcao,
+                timeout_segundos=timeout_segundos or FERRAMENTA_TIMEOUT_SEGUNDOS
+            )
+            return funcao
+        return decorador
+
+    def listar(self):
+        return [ferramenta.to_param() for ferramenta in self.ferramentas.values()]
+
+    async def executar(self, nome: str, argumentos: dict, contexto):
+        ferramenta = self.ferramentas.get(nome)
+        if ferramenta is None:
+            metricas.incrementar("ferramenta_erro", nome)
+            return {"error": f"Função desconhecida chamada: {nome}"}
+
+        inicio = time.perf_counter()
+        try:
+            return await ferramenta.executar(contexto, argumentos)
+        except asyncio.TimeoutError:
+            print(f"Tempo limite excedido ao executar {nome} ({ferramenta.timeout_segundos}s)")
+            metricas.incrementar("ferramenta_timeout", nome)
+            return {"error": f"A função {nome} excedeu o tempo limite"}
+        except Exception as e:
+            print(f"Erro ao executar {nome}: {e}")
+            metricas.incrementar("ferramenta_erro", nome)
+            return {"error": f"Erro ao executar a função {nome}"}
+        finally:
+            metricas.registrar_tempo("ferramenta", nome, time.perf_counter() - inicio)
+
+
+registro_ferramentas = RegistroFerramentas()
@@ -0,0 +1,137 @@
+import random
+import re
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import openai
+
+
+class PoliticaRetentativa:
+    # Erros 4xx que ainda podem se resolver repetindo a chamada; os demais (chave, permissão,
+    # recurso ou requisição inválidos) encerram as tentativas
+    STATUS_RECUPERAVEIS = (408, 409, 429)
+
+    ORCAMENTOS_PADRAO = {
+        "limite_taxa": 6,
+        "run_ativo": 40,
+        "run_em_andamento": 1,
+        "run_falhou": 3,
+        "erro": 3
+    }
+
+    def __init__(self, base_segundos: float = 1.0, max_segundos: float = 30.0, fator: float = 2.0,
+                 max_espera_run_ativo: float = 4.0, max_retry_after: float = 120.0, orcamentos: dict | None = None):
+        self.base_segundos = base_segundos
+        self.max_segundos = max_segundos
+        self.fator = fator
+        self.max_espera_run_ativo = max_espera_run_ativo
+        self.max_retry_after = max_retry_after
+        self.orcamentos = {**PoliticaRetentativa.ORCAMENTOS_PADRAO, **(orcamentos or {})}
+
+    @classmethod
+    def from_empresa(cls, empresa):
+        orcamentos = {}
+        if empresa.retry_limite_taxa_max is not None:
+            orcamentos["limite_taxa"] = empresa.retry_limite_taxa_max
+        if empresa.retry_falha_max is not None:
+            orcamentos["run_falhou"] = empresa.retry_falha_max
+        if empresa.retry_erro_max is not None:
+            orcamentos["erro"] = empresa.retry_erro_max
+
+        return cls(
+            base_segundos=empresa.retry_base_segundos or 1.0,
+            max_segundos=empresa.retry_max_segundos or 30.0,
+            orcamentos=orcamentos
+        )
+
+    def orcamento(self, classe: str):
+        return self.orcamentos.get(classe, self.orcamentos["erro"])
+
+    def tempo_espera(self, classe: str, tentativa: int, atraso_sugerido: float | None = None):
+        if atraso_sugerido is not None:
+            return min(atraso_sugerido, self.max_retry_after) + random.uniform(0, self.base_segundos)
+
+        limite = self.max_espera_run_ativo if classe == "run_ativo" else self.max_segundos
+        espera = min(limite, self.base_segundos * (self.fator ** (tentativa - 1)))
+        return espera / 2 + random.uniform(0, espera / 2)
+
+    @staticmethod
+    def classificar_erro(erro: Exception):
+        if isinstance(erro, openai.RateLimitError):
+            return "limite_taxa"
+        if isinstance(erro, openai.APIStatusError) and erro.status_code == 429:
+            return "limite_taxa"
+        if isinstance(erro, openai.BadRequestError) and re.search(r"active run|while a run .* is active", str(erro)):
+            # A thread ainda tem uma execução ativa; a próxima tentativa aguarda ela terminar em aguardar_run_ativo,
+            # que já tem o próprio orçamento de consultas, por isso esta classe repete poucas vezes
+            return "run_em_andamento"
+        if isinstance(erro, openai.APIStatusError) and 400 <= erro.status_code < 500 \
+                and erro.status_code not in PoliticaRetentativa.STATUS_RECUPERAVEIS:
+            return "nao_recuperavel"
+        return "erro"
+
+    @staticmethod
+    def classificar_run(run):
+        last_error = getattr(run, "last_error", None) if run is not None else None
+        if last_error is not None and last_error.code == "rate_limit_exceeded":
+            return "limite_taxa"
+        return "run_falhou"
+
+    @staticmethod
+    def atraso_sugerido_erro(erro: Exception, classe: str):
+        resposta = getattr(erro, "response", None)
+        headers = getattr(resposta, "headers", None)
+        if not headers:
+            return None
+
+        if headers.get("retry-after-ms"):
+            try:
+                return float(headers["retry-after-ms"]) / 1000
+            except ValueError:
+                pass
+
+        if headers.get("retry-after"):
+            try:
+                return float(headers["retry-after"])
+            except ValueError:
+                try:
+                    data = parsedate_to_datetime(headers["retry-after"])
+                    return max(0.0, (data - datetime.now(timezone.utc)).total_seconds())
+                except (TypeError, ValueError):
+                    pass
+
+        # Os cabeçalhos de reinício da cota só indicam a espera quando o erro é de limite de taxa
+        if classe != "limite_taxa":
+            return None
+
+        atrasos = [
+            converter_duracao(headers.get(header))
+            for header in ["x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"]
+            if headers.get(header)
+        ]
+        atrasos = [atraso for atraso in atrasos if atraso is not None]
+        return max(atrasos) if atrasos else None
+
+    @staticmethod
+    def atraso_sugerido_run(run):
+        last_error = getattr(run, "last_error", None) if run is not None else None
+        if last_error is None or not last_error.message:
+            return None
+
+        resultado = re.search(r"try again in (\d+(?:\.\d+)?)(ms|s)", last_error.message)
+        if resultado:
+            valor = float(resultado.group(1))
+            return valor / 1000 if resultado.group(2) == "ms" else valor
+        return None
+
+
+def converter_duracao(valor: str | None):
+    if not valor:
+        return None
+
+    partes = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", valor)
+    if not partes:
+        return None
+
+    multiplicadores = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(numero) * multiplicadores[unidade] for numero, unidade in partes)
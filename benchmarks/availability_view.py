@@ -0,0 +1,221 @@
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+
+import pytz
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.agenda_client import Schedule
+
+
+QUANTIDADE_AGENDAS = int(os.getenv("BENCHMARK_AGENDAS", "50"))
+EVENTOS_POR_AGENDA = int(os.getenv("BENCHMARK_EVENTOS", "2000"))
+DIAS = int(os.getenv("BENCHMARK_DIAS", "30"))
+REPETICOES = int(os.getenv("BENCHMARK_REPETICOES", "3"))
+
+TIMEZONE = pytz.timezone("America/Sao_Paulo")
+HORA_INICIO = "08:00:00"
+HORA_FINAL = "18:00:00"
+INTERVALO = 30
+DATA_INICIO = datetime(2025, 3, 3)
+
+
+def gerar_availability_view_anterior(eventos: List[dict], intervalo: int, hora_inicio: str, hora_final: str, data: str, timezone: pytz.timezone):
+    hora_inicio_dt = timezone.localize(datetime.strptime(f"{data} {hora_inicio}", "%Y-%m-%d %H:%M:%S"))
+    hora_final_dt = timezone.localize(datetime.strptime(f"{data} {hora_final}", "%Y-%m-%d %H:%M:%S"))
+
+    total_minutos = int((hora_final_dt - hora_inicio_dt).total_seconds() // 60)
+    total_blocos = total_minutos // intervalo
+    blocks = ["0"] * total_blocos
+
+    for evento in eventos:
+        inicio_evento = datetime.fromisoformat(evento["start"]["date_time"])
+        fim_evento = datetime.fromisoformat(evento["end"]["date_time"])
+
+        offset = int((inicio_evento - hora_inicio_dt).total_seconds() // 60)
+        index_inicial_bloco = offset // intervalo
+
+        duracao_evento = int((fim_evento - inicio_evento).total_seconds() // 60)
+
+        for i in range(index_inicial_bloco, index_inicial_bloco + (duracao_evento // intervalo) + 1):
+            if i < total_blocos:
+                blocks[i] = "2"
+
+    return "".join(blocks)
+
+
+def gerar_availability_view_referencia(eventos: List[dict], intervalo: int, hora_inicio: str, hora_final: str, data: str, timezone: pytz.timezone):
+    # Referência bloco a bloco: o bloco fica ocupado se algum evento não cancelado cobre parte dele
+    inicio_janela = timezone.localize(datetime.strptime(f"{data} {hora_inicio}", "%Y-%m-%d %H:%M:%S"))
+    fim_janela = timezone.localize(datetime.strptime(f"{data} {hora_final}", "%Y-%m-%d %H:%M:%S"))
+    total_blocos = int((fim_janela - inicio_janela).total_seconds() // (intervalo * 60))
+
+    periodos = [
+        (Schedule.converter_data_evento(evento["start"]["date_time"], timezone),
+         Schedule.converter_data_evento(evento["end"]["date_time"], timezone))
+        for evento in eventos
+        if evento.get("status") != "cancelled"
+    ]
+
+    blocos = []
+    for indice in range(total_blocos):
+        inicio_bloco = inicio_janela + timedelta(minutes=indice * intervalo)
+        fim_bloco = inicio_bloco + timedelta(minutes=intervalo)
+        ocupado = any(inicio < fim_bloco and fim > inicio_bloco for inicio, fim in periodos)
+        blocos.append("2" if ocupado else "0")
+    return "".join(blocos)
+
+
+def montar_evento(inicio: str, fim: str, status: str = "confirmed"):
+    return {"start": {"date_time": inicio, "time_zone": ""}, "end": {"date_time": fim, "time_zone": ""}, "status": status}
+
+
+# Casos de borda que a implementação anterior também calculava (eventos dentro da janela)
+CASOS_BORDA = {
+    "limite_exato": [montar_evento("2025-03-10T09:00:00-03:00", "2025-03-10T10:00:00-03:00")],
+    "eventos_encostados": [
+        montar_evento("2025-03-10T10:00:00-03:00", "2025-03-10T10:30:00-03:00"),
+        montar_evento("2025-03-10T10:30:00-03:00", "2025-03-10T11:00:00-03:00")
+    ],
+    "bloco_parcial_inicio": [montar_evento("2025-03-10T11:10:00-03:00", "2025-03-10T11:25:00-03:00")],
+    "bloco_parcial_atravessando": [montar_evento("2025-03-10T11:45:00-03:00", "2025-03-10T12:15:00-03:00")],
+    "sobrepostos": [
+        montar_evento("2025-03-10T14:00:00-03:00", "2025-03-10T15:00:00-03:00"),
+        montar_evento("2025-03-10T14:30:00-03:00", "2025-03-10T15:30:00-03:00")
+    ]
+}
+
+# Casos que só a implementação atual trata; são conferidos apenas contra a referência bloco a bloco
+CASOS_REFERENCIA = {
+    "parcial_nos_dois_lados": [montar_evento("2025-03-10T12:20:00-03:00", "2025-03-10T13:05:00-03:00")],
+    "antes_da_janela": [montar_evento("2025-03-10T07:30:00-03:00", "2025-03-10T08:45:00-03:00")],
+    "depois_da_janela": [montar_evento("2025-03-10T17:45:00-03:00", "2025-03-10T19:00:00-03:00")],
+    "varios_dias": [montar_evento("2025-03-10T17:00:00-03:00", "2025-03-11T09:00:00-03:00")],
+    "dia_inteiro": [montar_evento("2025-03-11", "2025-03-12")],
+    "sem_fuso": [montar_evento("2025-03-10T16:00:00", "2025-03-10T16:30:00")],
+    "cancelado": [montar_evento("2025-03-10T09:00:00-03:00", "2025-03-10T12:00:00-03:00", "cancelled")]
+}
+
+
+def blocos_limite_exato(eventos: List[dict], data: str):
+    # Blocos que começam exatamente no fim de um evento: a implementação anterior os marcava a mais (+1)
+    inicio_janela = TIMEZONE.localize(datetime.strptime(f"{data} {HORA_INICIO}", "%Y-%m-%d %H:%M:%S"))
+    indices = set()
+    for evento in eventos:
+        minutos = (datetime.fromisoformat(evento["end"]["date_time"]) - inicio_janela).total_seconds() / 60
+        if minutos >= 0 and minutos % INTERVALO == 0:
+            indices.add(int(minutos // INTERVALO))
+    return indices
+
+
+def comparar_com_anterior(eventos: List[dict], data: str):
+    # Apenas eventos que começam dentro da janela: antes dela a versão anterior usava índices negativos
+    inicio_janela = TIMEZONE.localize(datetime.strptime(f"{data} {HORA_INICIO}", "%Y-%m-%d %H:%M:%S"))
+    eventos = [evento for evento in eventos if datetime.fromisoformat(evento["start"]["date_time"]) >= inicio_janela]
+
+    anterior = gerar_availability_view_anterior(eventos, INTERVALO, HORA_INICIO, HORA_FINAL, data, TIMEZONE)
+    atual = Schedule.gerar_availability_view(eventos, INTERVALO, HORA_INICIO, HORA_FINAL, data, TIMEZONE)
+
+    permitidos = blocos_limite_exato(eventos, data)
+    divergencias = []
+    removidos = 0
+    for indice, (bloco_anterior, bloco_atual) in enumerate(zip(anterior, atual)):
+        if bloco_anterior == bloco_atual:
+            continue
+        if bloco_anterior == "2" and bloco_atual == "0" and indice in permitidos:
+            removidos += 1
+            continue
+        divergencias.append(f"{data} bloco {indice}: anterior={anterior} atual={atual}")
+    return divergencias, removidos
+
+
+def verificar_equivalencia(agendas: list, datas: list):
+    divergencias = []
+    removidos = 0
+
+    for eventos in agendas:
+        views = Schedule.gerar_availability_views(eventos, INTERVALO, HORA_INICIO, HORA_FINAL, datas[0], datas[-1], TIMEZONE)
+        for data in datas:
+            eventos_dia = [evento for evento in eventos if evento["start"]["date_time"].startswith(data)]
+            # Os eventos gerados começam e terminam no mesmo dia, então a referência só precisa dos eventos do dia
+            referencia = gerar_availability_view_referencia(eventos_dia, INTERVALO, HORA_INICIO, HORA_FINAL, data, TIMEZONE)
+            if views[data] != referencia:
+                divergencias.append(f"{data}: referencia={referencia} atual={views[data]}")
+
+            divergencias_dia, removidos_dia = comparar_com_anterior(eventos_dia, data)
+            divergencias.extend(divergencias_dia)
+            removidos += removidos_dia
+
+    datas_casos = ["2025-03-10", "2025-03-11"]
+    for nome, eventos in {**CASOS_BORDA, **CASOS_REFERENCIA}.items():
+        views = Schedule.gerar_availability_views(eventos, INTERVALO, HORA_INICIO, HORA_FINAL, datas_casos[0], datas_casos[-1], TIMEZONE)
+        for data in datas_casos:
+            referencia = gerar_availability_view_referencia(eventos, INTERVALO, HORA_INICIO, HORA_FINAL, data, TIMEZONE)
+            if views[data] != referencia:
+                divergencias.append(f"[{nome}] {data}: referencia={referencia} atual={views[data]}")
+
+    for nome, eventos in CASOS_BORDA.items():
+        divergencias_caso, removidos_caso = comparar_com_anterior(eventos, datas_casos[0])
+        divergencias.extend(f"[{nome}] {divergencia}" for divergencia in divergencias_caso)
+        removidos += removidos_caso
+
+    return divergencias, removidos
+
+
+def gerar_eventos(semente: int):
+    aleatorio = random.Random(semente)
+    eventos = []
+    for _ in range(EVENTOS_POR_AGENDA):
+        dia = DATA_INICIO + timedelta(days=aleatorio.randrange(DIAS))
+        inicio = TIMEZONE.localize(dia.replace(hour=aleatorio.randrange(7, 18), minute=aleatorio.choice([0, 10, 15, 30, 45])))
+        fim = inicio + timedelta(minutes=aleatorio.choice([15, 30, 45, 60, 90, 120]))
+        eventos.append({
+            "start": {"date_time": inicio.isoformat(), "time_zone": ""},
+            "end": {"date_time": fim.isoformat(), "time_zone": ""},
+            "status": "confirmed"
+        })
+    return eventos
+
+
+def executar_anterior(agendas: list, datas: list):
+    # A implementação anterior percorre todos os eventos a cada dia consultado
+    for eventos in agendas:
+        for data in datas:
+            eventos_dia = [evento for evento in eventos if evento["start"]["date_time"].startswith(data)]
+            gerar_availability_view_anterior(eventos_dia, INTERVALO, HORA_INICIO, HORA_FINAL, data, TIMEZONE)
+
+
+def executar_atual(agendas: list, datas: list):
+    for eventos in agendas:
+        Schedule.gerar_availability_views(eventos, INTERVALO, HORA_INICIO, HORA_FINAL, datas[0], datas[-1], TIMEZONE)
+
+
+def main():
+    agendas = [gerar_eventos(semente) for semente in range(QUANTIDADE_AGENDAS)]
+    datas = [(DATA_INICIO + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(DIAS)]
+    total_eventos = QUANTIDADE_AGENDAS * EVENTOS_POR_AGENDA
+
+    print(f"{QUANTIDADE_AGENDAS} agendas x {EVENTOS_POR_AGENDA} eventos ({total_eventos} no total), {DIAS} dias")
+
+    # Um ganho de tempo só vale se o resultado for o mesmo da versão anterior, fora o bloco extra removido
+    divergencias, removidos = verificar_equivalencia(agendas, datas)
+    if divergencias:
+        print(f"equivalência: {len(divergencias)} divergências")
+        for divergencia in divergencias[:20]:
+            print(f"  {divergencia}")
+        sys.exit(1)
+    print(f"equivalência: ok ({removidos} blocos extras em limites exatos deixaram de ser marcados)")
+
+    tempo_anterior = min(timeit.repeat(lambda: executar_anterior(agendas, datas), number=1, repeat=REPETICOES))
+    tempo_atual = min(timeit.repeat(lambda: executar_atual(agendas, datas), number=1, repeat=REPETICOES))
+
+    print(f"anterior: {tempo_anterior:.3f}s")
+    print(f"atual:    {tempo_atual:.3f}s ({tempo_anterior / tempo_atual:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
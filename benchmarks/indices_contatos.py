@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine, text
+
+
+QUANTIDADE_CONTATOS = int(os.getenv("BENCHMARK_CONTATOS", "1000000"))
+QUANTIDADE_EMPRESAS = int(os.getenv("BENCHMARK_EMPRESAS", "200"))
+ESQUEMA = "benchmark_indices"
+
+CONSULTAS = {
+    "obter_criar_contato": """
+        SELECT * FROM {esquema}.contatos
+        WHERE "contactId" = 'contato-424242' AND id_empresa = 42
+    """,
+    "retomar_conversa": """
+        SELECT id FROM {esquema}.contatos
+        WHERE id_empresa = 42
+          AND (
+            ("lastMessage" <= now() - interval '60 minutes' AND "recallCount" < 2
+             AND receber_respostas_ia = true AND aguardando_humano = false)
+            OR
+            ("lastMessage" <= now() - interval '1440 minutes' AND "recallCount" = 2
+             AND receber_respostas_ia = true AND aguardando_humano = false)
+          )
+          AND "appointmentConfirmation" = false
+    """
+}
+
+INDICES = [
+    'CREATE INDEX "ix_contatos_contactId_id_empresa" ON {esquema}.contatos ("contactId", id_empresa)',
+    'CREATE INDEX "ix_contatos_id_empresa_lastMessage" ON {esquema}.contatos (id_empresa, "lastMessage")',
+    'CREATE INDEX ix_contatos_recall ON {esquema}.contatos (id_empresa, "recallCount", "lastMessage") '
+    'WHERE receber_respostas_ia = true AND aguardando_humano = false'
+]
+
+
+def preparar(conexao):
+    conexao.execute(text(f"DROP SCHEMA IF EXISTS {ESQUEMA} CASCADE"))
+    conexao.execute(text(f"CREATE SCHEMA {ESQUEMA}"))
+    conexao.execute(text(f"""
+        CREATE TABLE {ESQUEMA}.contatos (
+            id serial PRIMARY KEY,
+            "contactId" varchar,
+            "threadId" varchar,
+            "assistenteAtual" integer,
+            "lastMessage" timestamp,
+            "recallCount" integer,
+            "appointmentConfirmation" boolean,
+            deal_id varchar,
+            receber_respostas_ia boolean,
+            aguardando_humano boolean,
+            id_empresa integer
+        )
+    """))
+    conexao.execute(text(f'CREATE INDEX "ix_contatos_contactId" ON {ESQUEMA}.contatos ("contactId")'))
+
+    inicio = time.monotonic()
+    conexao.execute(text(f"""
+        INSERT INTO {ESQUEMA}.contatos
+            ("contactId", "threadId", "lastMessage", "recallCount", "appointmentConfirmation",
+             receber_respostas_ia, aguardando_humano, id_empresa)
+        SELECT
+            'contato-' || i,
+            'thread-' || i,
+            now() - (random() * interval '30 days'),
+            (random() * 3)::int,
+            random() < 0.1,
+            random() < 0.7,
+            random() < 0.05,
+            (i % :empresas) + 1
+        FROM generate_series(1, :contatos) AS i
+    """), {"empresas": QUANTIDADE_EMPRESAS, "contatos": QUANTIDADE_CONTATOS})
+    conexao.execute(text(f"ANALYZE {ESQUEMA}.contatos"))
+    print(f"{QUANTIDADE_CONTATOS} contatos inseridos em {time.monotonic() - inicio:.1f}s")
+
+
+def explicar(conexao, titulo: str):
+    print(f"\n===== {titulo} =====")
+    for nome, consulta in CONSULTAS.items():
+        plano = conexao.execute(
+            text(f"EXPLAIN (ANALYZE, BUFFERS) {consulta.format(esquema=ESQUEMA)}")
+        ).scalars().all()
+        print(f"\n--- {nome} ---")
+        print("\n".join(plano))
+
+
+def main():
+    url = os.getenv("BENCHMARK_DATABASE_URL")
+    if not url:
+        print("Defina BENCHMARK_DATABASE_URL com um banco descartável para executar o benchmark.")
+        sys.exit(1)
+
+    engine = create_engine(url)
+    with engine.begin() as conexao:
+        preparar(conexao)
+        explicar(conexao, "ANTES DOS ÍNDICES")
+
+        for indice in INDICES:
+            conexao.execute(text(indice.format(esquema=ESQUEMA)))
+        conexao.execute(text(f"ANALYZE {ESQUEMA}.contatos"))
+        explicar(conexao, "DEPOIS DOS ÍNDICES")
+
+        conexao.execute(text(f"DROP SCHEMA {ESQUEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,14 @@
-from app.db.database import Base, engine
-from app.db.models import *
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
 
+from app.db.database import engine
 
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+
+config = Config("alembic.ini")
+tabelas = inspect(engine).get_table_names()
+
+if "empresas" in tabelas and "alembic_version" not in tabelas:
+    command.stamp(config, "0001")
+
+command.upgrade(config, "head")
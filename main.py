@@ -1,11 +1,46 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
 
-from app.routers import resposta, trabalho, empresa, usuario, assistente, voz, evolutionapi, digisac, midia, agenda, microsoft, google, exemplo
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import OperationalError
+
+from app.jobs.processador_fila import processador_fila
+from app.jobs.runner import gerenciador_trabalhos
+from app.services.fila_service import MODO_INGESTAO
+from app.utils.disjuntor import ErroCircuitoAberto
+from app.utils.http_client import cliente_http
+from app.routers import resposta, trabalho, empresa, usuario, assistente, voz, evolutionapi, digisac, midia, agenda, microsoft, google, exemplo, metricas
 from fastapi.middleware.cors import CORSMiddleware
 import os
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MODO_INGESTAO == "fila":
+        await processador_fila.iniciar()
+    yield
+    await gerenciador_trabalhos.parar()
+    await processador_fila.parar()
+    await cliente_http.fechar_async()
+    cliente_http.fechar()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(ErroCircuitoAberto)
+async def tratar_circuito_aberto(request: Request, erro: ErroCircuitoAberto):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Serviço temporariamente indisponível"},
+        headers={"Retry-After": str(max(1, round(erro.tempo_restante)))}
+    )
+
+
+@app.exception_handler(OperationalError)
+async def tratar_erro_banco(request: Request, erro: OperationalError):
+    print(f"Erro de conexão com o banco: {erro}")
+    return JSONResponse(status_code=503, content={"detail": "Serviço temporariamente indisponível"})
 
 origins = os.getenv("ALLOWED_ORIGINS", "").split(",")
 
@@ -30,3 +65,4 @@ app.include_router(evolutionapi.router, prefix="/evolutionapi", tags=["Evolution
 app.include_router(digisac.router, prefix="/digisac", tags=["Digisac"])
 app.include_router(microsoft.router, prefix="/microsoft", tags=["Microsoft"])
 app.include_router(google.router, prefix="/google", tags=["Google"])
+app.include_router(metricas.router, prefix="/metricas", tags=["Métricas"])
@@ -0,0 +1,281 @@
+"""estrutura inicial
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-01-20 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('assistentes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('assistantId', sa.String(), nullable=True),
+    sa.Column('nome', sa.String(), nullable=True),
+    sa.Column('proposito', sa.String(), nullable=True),
+    sa.Column('atalho', sa.String(), nullable=True),
+    sa.Column('id_voz', sa.Integer(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_assistentes_id'), 'assistentes', ['id'], unique=False)
+    op.create_table('empresas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('slug', sa.String(), nullable=True),
+    sa.Column('nome', sa.String(), nullable=True),
+    sa.Column('token', sa.String(), nullable=False),
+    sa.Column('fuso_horario', sa.String(), nullable=True),
+    sa.Column('empresa_ativa', sa.Boolean(), nullable=True),
+    sa.Column('message_client_type', sa.String(), nullable=True),
+    sa.Column('agenda_client_type', sa.String(), nullable=True),
+    sa.Column('crm_client_type', sa.String(), nullable=True),
+    sa.Column('financial_client_type', sa.String(), nullable=True),
+    sa.Column('recall_timeout_minutes', sa.Integer(), nullable=True),
+    sa.Column('final_recall_timeout_minutes', sa.Integer(), nullable=True),
+    sa.Column('recall_quant', sa.Integer(), nullable=True),
+    sa.Column('recall_ativo', sa.Boolean(), nullable=True),
+    sa.Column('recall_confirmacao_ativo', sa.Boolean(), nullable=True),
+    sa.Column('confirmar_agendamentos_ativo', sa.Boolean(), nullable=True),
+    sa.Column('lembrar_vencimentos_ativo', sa.Boolean(), nullable=True),
+    sa.Column('enviar_boleto_lembrar_vencimento', sa.Boolean(), nullable=True),
+    sa.Column('cobrar_inadimplentes_ativo', sa.Boolean(), nullable=True),
+    sa.Column('tipo_cancelamento_evento', sa.String(), nullable=True),
+    sa.Column('mensagem_erro_ia', sa.String(), nullable=True),
+    sa.Column('duracao_evento', sa.Integer(), nullable=True),
+    sa.Column('hora_inicio_agenda', sa.String(), nullable=True),
+    sa.Column('hora_final_agenda', sa.String(), nullable=True),
+    sa.Column('openai_api_key', sa.String(), nullable=True),
+    sa.Column('elevenlabs_api_key', sa.String(), nullable=True),
+    sa.Column('assistentePadrao', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token')
+    )
+    op.create_index(op.f('ix_empresas_id'), 'empresas', ['id'], unique=False)
+    op.create_index(op.f('ix_empresas_slug'), 'empresas', ['slug'], unique=False)
+    op.create_table('exemplos_prompt',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tipo_assistente', sa.String(), nullable=True),
+    sa.Column('prompt', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_exemplos_prompt_id'), 'exemplos_prompt', ['id'], unique=False)
+    op.create_table('vozes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(), nullable=True),
+    sa.Column('voiceId', sa.String(), nullable=True),
+    sa.Column('stability', sa.Float(), nullable=True),
+    sa.Column('similarity_boost', sa.Float(), nullable=True),
+    sa.Column('style', sa.Float(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_vozes_id'), 'vozes', ['id'], unique=False)
+    op.create_table('agendas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('endereco', sa.String(), nullable=True),
+    sa.Column('atalho', sa.String(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_agendas_id'), 'agendas', ['id'], unique=False)
+    op.create_table('asaas_clients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.String(), nullable=True),
+    sa.Column('rotulo', sa.String(), nullable=True),
+    sa.Column('client_number', sa.Integer(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_asaas_clients_id'), 'asaas_clients', ['id'], unique=False)
+    op.create_table('colaboradores',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(), nullable=True),
+    sa.Column('apelido', sa.String(), nullable=True),
+    sa.Column('departamento', sa.String(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_colaboradores_id'), 'colaboradores', ['id'], unique=False)
+    op.create_table('contatos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('contactId', sa.String(), nullable=True),
+    sa.Column('threadId', sa.String(), nullable=True),
+    sa.Column('assistenteAtual', sa.Integer(), nullable=True),
+    sa.Column('lastMessage', sa.DateTime(), nullable=True),
+    sa.Column('recallCount', sa.Integer(), nullable=True),
+    sa.Column('appointmentConfirmation', sa.Boolean(), nullable=True),
+    sa.Column('deal_id', sa.String(), nullable=True),
+    sa.Column('receber_respostas_ia', sa.Boolean(), nullable=True),
+    sa.Column('aguardando_humano', sa.Boolean(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['assistenteAtual'], ['assistentes.id'], ),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_contatos_contactId'), 'contatos', ['contactId'], unique=False)
+    op.create_index(op.f('ix_contatos_id'), 'contatos', ['id'], unique=False)
+    op.create_table('digisac_clients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('digisacSlug', sa.String(), nullable=True),
+    sa.Column('service_id', sa.String(), nullable=True),
+    sa.Column('digisacToken', sa.String(), nullable=True),
+    sa.Column('digisacDefaultUser', sa.String(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_digisac_clients_id'), 'digisac_clients', ['id'], unique=False)
+    op.create_table('evolutionapi_clients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('apiKey', sa.String(), nullable=True),
+    sa.Column('instanceName', sa.String(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_evolutionapi_clients_id'), 'evolutionapi_clients', ['id'], unique=False)
+    op.create_table('googlecalendar_clients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('access_token', sa.String(), nullable=True),
+    sa.Column('refresh_token', sa.String(), nullable=True),
+    sa.Column('expires_in', sa.Integer(), nullable=True),
+    sa.Column('client_email', sa.String(), nullable=True),
+    sa.Column('timezone', sa.String(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_googlecalendar_clients_id'), 'googlecalendar_clients', ['id'], unique=False)
+    op.create_table('midias',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('url', sa.String(), nullable=True),
+    sa.Column('mediatype', sa.String(), nullable=True),
+    sa.Column('nome', sa.String(), nullable=True),
+    sa.Column('atalho', sa.String(), nullable=True),
+    sa.Column('ordem', sa.Integer(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_midias_id'), 'midias', ['id'], unique=False)
+    op.create_table('outlook_clients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('access_token', sa.String(), nullable=True),
+    sa.Column('refresh_token', sa.String(), nullable=True),
+    sa.Column('expires_in', sa.Integer(), nullable=True),
+    sa.Column('expires_at', sa.Float(), nullable=True),
+    sa.Column('usuarioPadrao', sa.String(), nullable=True),
+    sa.Column('timeZone', sa.String(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_outlook_clients_id'), 'outlook_clients', ['id'], unique=False)
+    op.create_table('rdstationcrm_clients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.String(), nullable=True),
+    sa.Column('id_fonte_padrao', sa.String(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_rdstationcrm_clients_id'), 'rdstationcrm_clients', ['id'], unique=False)
+    op.create_table('usuarios',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(), nullable=True),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('senha', sa.String(), nullable=True),
+    sa.Column('ativo', sa.Boolean(), nullable=True),
+    sa.Column('admin', sa.Boolean(), nullable=True),
+    sa.Column('id_empresa', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_usuarios_email'), 'usuarios', ['email'], unique=True)
+    op.create_index(op.f('ix_usuarios_id'), 'usuarios', ['id'], unique=False)
+    op.create_index(op.f('ix_usuarios_nome'), 'usuarios', ['nome'], unique=False)
+    op.create_table('departamentos',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('atalho', sa.String(), nullable=True),
+    sa.Column('comentario', sa.String(), nullable=True),
+    sa.Column('departmentId', sa.String(), nullable=True),
+    sa.Column('userId', sa.String(), nullable=True),
+    sa.Column('departamento_confirmacao', sa.Boolean(), nullable=True),
+    sa.Column('id_digisac_client', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_digisac_client'], ['digisac_clients.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_departamentos_id'), 'departamentos', ['id'], unique=False)
+    op.create_table('rdstationcrm_deal_stages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('atalho', sa.String(), nullable=True),
+    sa.Column('deal_stage_id', sa.String(), nullable=True),
+    sa.Column('user_id', sa.String(), nullable=True),
+    sa.Column('deal_stage_inicial', sa.Boolean(), nullable=True),
+    sa.Column('id_rdstationcrm_client', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['id_rdstationcrm_client'], ['rdstationcrm_clients.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_rdstationcrm_deal_stages_id'), 'rdstationcrm_deal_stages', ['id'], unique=False)
+    op.create_foreign_key('assistentes_id_empresa_fkey', 'assistentes', 'empresas', ['id_empresa'], ['id'])
+    op.create_foreign_key('assistentes_id_voz_fkey', 'assistentes', 'vozes', ['id_voz'], ['id'], ondelete='SET NULL')
+    op.create_foreign_key('empresas_assistentePadrao_fkey', 'empresas', 'assistentes', ['assistentePadrao'], ['id'])
+    op.create_foreign_key('vozes_id_empresa_fkey', 'vozes', 'empresas', ['id_empresa'], ['id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('assistentes_id_empresa_fkey', 'assistentes', type_='foreignkey')
+    op.drop_constraint('assistentes_id_voz_fkey', 'assistentes', type_='foreignkey')
+    op.drop_constraint('empresas_assistentePadrao_fkey', 'empresas', type_='foreignkey')
+    op.drop_constraint('vozes_id_empresa_fkey', 'vozes', type_='foreignkey')
+    op.drop_index(op.f('ix_rdstationcrm_deal_stages_id'), table_name='rdstationcrm_deal_stages')
+    op.drop_table('rdstationcrm_deal_stages')
+    op.drop_index(op.f('ix_departamentos_id'), table_name='departamentos')
+    op.drop_table('departamentos')
+    op.drop_index(op.f('ix_usuarios_nome'), table_name='usuarios')
+    op.drop_index(op.f('ix_usuarios_id'), table_name='usuarios')
+    op.drop_index(op.f('ix_usuarios_email'), table_name='usuarios')
+    op.drop_table('usuarios')
+    op.drop_index(op.f('ix_rdstationcrm_clients_id'), table_name='rdstationcrm_clients')
+    op.drop_table('rdstationcrm_clients')
+    op.drop_index(op.f('ix_outlook_clients_id'), table_name='outlook_clients')
+    op.drop_table('outlook_clients')
+    op.drop_index(op.f('ix_midias_id'), table_name='midias')
+    op.drop_table('midias')
+    op.drop_index(op.f('ix_googlecalendar_clients_id'), table_name='googlecalendar_clients')
+    op.drop_table('googlecalendar_clients')
+    op.drop_index(op.f('ix_evolutionapi_clients_id'), table_name='evolutionapi_clients')
+    op.drop_table('evolutionapi_clients')
+    op.drop_index(op.f('ix_digisac_clients_id'), table_name='digisac_clients')
+    op.drop_table('digisac_clients')
+    op.drop_index(op.f('ix_contatos_id'), table_name='contatos')
+    op.drop_index(op.f('ix_contatos_contactId'), table_name='contatos')
+    op.drop_table('contatos')
+    op.drop_index(op.f('ix_colaboradores_id'), table_name='colaboradores')
+    op.drop_table('colaboradores')
+    op.drop_index(op.f('ix_asaas_clients_id'), table_name='asaas_clients')
+    op.drop_table('asaas_clients')
+    op.drop_index(op.f('ix_agendas_id'), table_name='agendas')
+    op.drop_table('agendas')
+    op.drop_index(op.f('ix_vozes_id'), table_name='vozes')
+    op.drop_table('vozes')
+    op.drop_index(op.f('ix_exemplos_prompt_id'), table_name='exemplos_prompt')
+    op.drop_table('exemplos_prompt')
+    op.drop_index(op.f('ix_empresas_slug'), table_name='empresas')
+    op.drop_index(op.f('ix_empresas_id'), table_name='empresas')
+    op.drop_table('empresas')
+    op.drop_index(op.f('ix_assistentes_id'), table_name='assistentes')
+    op.drop_table('assistentes')
@@ -0,0 +1,88 @@
+"""retentativa, fila de mensagens e trabalhos
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-01-20 00:00:01
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('empresas', sa.Column('janela_agrupamento_segundos', sa.Integer(), nullable=True))
+    op.add_column('empresas', sa.Column('retry_base_segundos', sa.Float(), nullable=True))
+    op.add_column('empresas', sa.Column('retry_max_segundos', sa.Float(), nullable=True))
+    op.add_column('empresas', sa.Column('retry_limite_taxa_max', sa.Integer(), nullable=True))
+    op.add_column('empresas', sa.Column('retry_falha_max', sa.Integer(), nullable=True))
+    op.add_column('empresas', sa.Column('retry_erro_max', sa.Integer(), nullable=True))
+
+    op.create_table('fila_mensagens',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('provedor', sa.String(), nullable=False),
+    sa.Column('id_mensagem', sa.String(), nullable=False),
+    sa.Column('chave_contato', sa.String(), nullable=False),
+    sa.Column('slug', sa.String(), nullable=False),
+    sa.Column('token', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('tentativas', sa.Integer(), nullable=False),
+    sa.Column('erro', sa.String(), nullable=True),
+    sa.Column('processar_apos', sa.DateTime(), nullable=True),
+    sa.Column('reservado_ate', sa.DateTime(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('atualizado_em', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('provedor', 'id_mensagem', name='uq_fila_mensagens_provedor_id_mensagem')
+    )
+    op.create_index(op.f('ix_fila_mensagens_id'), 'fila_mensagens', ['id'], unique=False)
+    op.create_index(op.f('ix_fila_mensagens_chave_contato'), 'fila_mensagens', ['chave_contato'], unique=False)
+    op.create_index(op.f('ix_fila_mensagens_status'), 'fila_mensagens', ['status'], unique=False)
+
+    op.create_table('bloqueios_trabalho',
+    sa.Column('nome', sa.String(), nullable=False),
+    sa.Column('dono', sa.String(), nullable=False),
+    sa.Column('expira_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('nome')
+    )
+
+    op.create_table('execucoes_trabalho',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nome', sa.String(), nullable=False),
+    sa.Column('instancia', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('iniciado_em', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('finalizado_em', sa.DateTime(), nullable=True),
+    sa.Column('duracao_segundos', sa.Float(), nullable=True),
+    sa.Column('resumo', sa.JSON(), nullable=True),
+    sa.Column('erro', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_execucoes_trabalho_id'), 'execucoes_trabalho', ['id'], unique=False)
+    op.create_index(op.f('ix_execucoes_trabalho_nome'), 'execucoes_trabalho', ['nome'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_execucoes_trabalho_nome'), table_name='execucoes_trabalho')
+    op.drop_index(op.f('ix_execucoes_trabalho_id'), table_name='execucoes_trabalho')
+    op.drop_table('execucoes_trabalho')
+    op.drop_table('bloqueios_trabalho')
+    op.drop_index(op.f('ix_fila_mensagens_status'), table_name='fila_mensagens')
+    op.drop_index(op.f('ix_fila_mensagens_chave_contato'), table_name='fila_mensagens')
+    op.drop_index(op.f('ix_fila_mensagens_id'), table_name='fila_mensagens')
+    op.drop_table('fila_mensagens')
+
+    op.drop_column('empresas', 'retry_erro_max')
+    op.drop_column('empresas', 'retry_falha_max')
+    op.drop_column('empresas', 'retry_limite_taxa_max')
+    op.drop_column('empresas', 'retry_max_segundos')
+    op.drop_column('empresas', 'retry_base_segundos')
+    op.drop_column('empresas', 'janela_agrupamento_segundos')
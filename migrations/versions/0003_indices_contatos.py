@@ -0,0 +1,35 @@
+"""indices de contatos para webhook e retomada
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-01-20 00:00:02
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_contatos_contactId_id_empresa', 'contatos', ['contactId', 'id_empresa'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_contatos_id_empresa_lastMessage', 'contatos', ['id_empresa', 'lastMessage'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_contatos_recall', 'contatos', ['id_empresa', 'recallCount', 'lastMessage'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True,
+                        postgresql_where=sa.text('receber_respostas_ia = true AND aguardando_humano = false'))
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_contatos_recall', table_name='contatos', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_contatos_id_empresa_lastMessage', table_name='contatos', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_contatos_contactId_id_empresa', table_name='contatos', postgresql_concurrently=True, if_exists=True)
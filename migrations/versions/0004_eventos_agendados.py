@@ -0,0 +1,42 @@
+"""eventos agendados por contato e thread
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-01-20 00:00:03
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('eventos_agendados',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('id_empresa', sa.Integer(), nullable=False),
+    sa.Column('id_contato', sa.Integer(), nullable=False),
+    sa.Column('thread_id', sa.String(), nullable=False),
+    sa.Column('endereco_agenda', sa.String(), nullable=False),
+    sa.Column('id_evento', sa.String(), nullable=True),
+    sa.Column('titulo', sa.String(), nullable=True),
+    sa.Column('data_hora_inicio', sa.String(), nullable=True),
+    sa.Column('criado_em', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['id_contato'], ['contatos.id'], ),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_eventos_agendados_id'), 'eventos_agendados', ['id'], unique=False)
+    op.create_index('ix_eventos_agendados_id_contato_thread_id', 'eventos_agendados', ['id_contato', 'thread_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_eventos_agendados_id_contato_thread_id', table_name='eventos_agendados')
+    op.drop_index(op.f('ix_eventos_agendados_id'), table_name='eventos_agendados')
+    op.drop_table('eventos_agendados')
@@ -0,0 +1,41 @@
+"""confirmacoes de agendamento ja enviadas
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-01-20 00:00:04
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('confirmacoes_enviadas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('id_empresa', sa.Integer(), nullable=False),
+    sa.Column('id_contato', sa.Integer(), nullable=True),
+    sa.Column('endereco_agenda', sa.String(), nullable=False),
+    sa.Column('chave_evento', sa.String(), nullable=False),
+    sa.Column('data_evento', sa.String(), nullable=False),
+    sa.Column('criado_em', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['id_contato'], ['contatos.id'], ),
+    sa.ForeignKeyConstraint(['id_empresa'], ['empresas.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('id_empresa', 'endereco_agenda', 'chave_evento', name='uq_confirmacoes_enviadas_evento')
+    )
+    op.create_index(op.f('ix_confirmacoes_enviadas_id'), 'confirmacoes_enviadas', ['id'], unique=False)
+    op.create_index('ix_confirmacoes_enviadas_id_empresa_data_evento', 'confirmacoes_enviadas', ['id_empresa', 'data_evento'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_confirmacoes_enviadas_id_empresa_data_evento', table_name='confirmacoes_enviadas')
+    op.drop_index(op.f('ix_confirmacoes_enviadas_id'), table_name='confirmacoes_enviadas')
+    op.drop_table('confirmacoes_enviadas')
@@ -0,0 +1,27 @@
+"""regras de extracao e modelo de confirmacao por empresa
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-01-20 00:00:05
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('empresas', sa.Column('regras_extracao_evento', sa.JSON(), nullable=True))
+    op.add_column('empresas', sa.Column('modelo_confirmacao', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('empresas', 'modelo_confirmacao')
+    op.drop_column('empresas', 'regras_extracao_evento')
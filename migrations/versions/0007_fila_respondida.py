@@ -0,0 +1,25 @@
+"""progresso do envio da resposta na fila de mensagens
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-01-20 00:00:06
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('fila_mensagens', sa.Column('respondida', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('fila_mensagens', 'respondida')